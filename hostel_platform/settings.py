@@ -58,11 +58,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'hostels.middleware.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'hostels.middleware.PageCacheMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -217,3 +219,94 @@ GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY', '')
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID', '')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY', '')
 AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME', '')
+
+# Subscriptions (hostels.management.commands.process_subscriptions)
+SUBSCRIPTION_GATED_SEARCH = config('SUBSCRIPTION_GATED_SEARCH', default=False, cast=bool)
+SUBSCRIPTION_PERIOD_DAYS = 30
+SUBSCRIPTION_EXPIRY_NOTICE_DAYS = 7
+
+# Cache: Redis when CACHE_URL is set (needs the redis package), otherwise per-process memory
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Anonymous full-page cache (hostels.page_cache); pages are also invalidated on hostel,
+# review, room type and image changes, so with a shared cache the timeout bounds only derived
+# data. Invalidation only reaches the process that made the change when each process has its
+# own local-memory cache, so the page cache is off by default without CACHE_URL.
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=bool(CACHE_URL), cast=bool)
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Hostel list id lists per canonical search (hostels.search_cache); listing changes expire
+# them at once (in other processes too with CACHE_URL), so the timeout bounds only rank score
+# changes; 0 turns the cache off
+SEARCH_CACHE_TIMEOUT = config('SEARCH_CACHE_TIMEOUT', default=60, cast=int)
+SEARCH_CACHE_MAX_IDS = config('SEARCH_CACHE_MAX_IDS', default=1000, cast=int)
+
+# Seconds a local reverse proxy may serve public hostel pages and search results
+# without revalidating (hostels.conditional)
+PROXY_CACHE_MAX_AGE = config('PROXY_CACHE_MAX_AGE', default=60, cast=int)
+
+# Contact reveal rate limit per user or IP (hostels.throttling.TokenBucket)
+# Reverse proxies in front of the app that append to X-Forwarded-For; 0 keys the
+# limiter on REMOTE_ADDR
+NUM_PROXIES = config('NUM_PROXIES', default=0, cast=int)
+CONTACT_REVEAL_BURST = config('CONTACT_REVEAL_BURST', default=10, cast=int)
+CONTACT_REVEAL_PER_MINUTE = config('CONTACT_REVEAL_PER_MINUTE', default=5, cast=float)
+
+# Offline geocoder (hostels.geocoding)
+GEOCODER_GAZETTEER = config('GEOCODER_GAZETTEER', default=str(BASE_DIR / 'hostels' / 'data' / 'gazetteer.csv'))
+GEOCODER_DEFAULT_CITY = 'Lahore'
+
+# Hostel-to-landmark distances are stored up to this radius (hostels.landmarks)
+LANDMARK_DISTANCE_CUTOFF_KM = config('LANDMARK_DISTANCE_CUTOFF_KM', default=15, cast=float)
+
+# Buffered event writes (hostels.events)
+EVENT_BUFFER_SIZE = config('EVENT_BUFFER_SIZE', default=100, cast=int)
+EVENT_BUFFER_MAX_AGE = config('EVENT_BUFFER_MAX_AGE', default=5, cast=float)
+
+# Trending hostels (hostels.trending); stored scores double every half-life
+# after the epoch, so move the epoch forward and run rebuild_trending
+# within about 1000 half-lives of it
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=48, cast=float)
+TRENDING_EPOCH = config('TRENDING_EPOCH', default='2026-01-01')
+
+# Admin bulk actions (hostels.bulk_actions)
+BULK_ACTION_INLINE_LIMIT = 100
+BULK_ACTION_CHUNK_SIZE = 500
+# A running job without progress for this long is claimed again by run_bulk_actions
+BULK_ACTION_STALE_SECONDS = config('BULK_ACTION_STALE_SECONDS', default=300, cast=int)
+
+# Request timing instrumentation (hostels.middleware.RequestTimingMiddleware)
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=True, cast=bool)
+REQUEST_TIMING_SAMPLE_RATE = config('REQUEST_TIMING_SAMPLE_RATE', default=0.1, cast=float)
+REQUEST_TIMING_SLOW_MS = config('REQUEST_TIMING_SLOW_MS', default=1000, cast=int)
+REQUEST_TIMING_DUPLICATE_THRESHOLD = 3
+# Server-Timing exposes DB time and query counts to clients, so only in development
+REQUEST_TIMING_SERVER_TIMING_HEADER = config('REQUEST_TIMING_SERVER_TIMING_HEADER', default=DEBUG, cast=bool)
+REQUEST_TIMING_LOG_FILE = config('REQUEST_TIMING_LOG_FILE', default=str(BASE_DIR / 'request_timing.log'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message_only': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'request_timing_file': {
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': REQUEST_TIMING_LOG_FILE,
+            'formatter': 'message_only',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'hostels.request_timing': {
+            'handlers': ['request_timing_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
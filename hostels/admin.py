@@ -1,8 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Min
+from . import bulk_actions, page_cache
+from .admin_utils import EstimatedCountPaginator, HostelInputFilter
 from .models import (
     User, Hostel, Facility, HostelFacility, RoomType,
-    HostelImage, ContactReveal, HostelView, Favorite, Review, Report, HostelSubscription
+    HostelImage, ContactReveal, HostelView, Favorite, Review, Report, HostelSubscription, BulkActionJob,
+    Locality, Landmark, SavedSearch
 )
 
 
@@ -39,7 +43,7 @@ class HostelSubscriptionInline(admin.StackedInline):
     readonly_fields = ('created_at', 'updated_at')
     fieldsets = (
         ('Subscription Details', {
-            'fields': ('monthly_fee', 'status', 'subscription_start_date', 'subscription_end_date')
+            'fields': ('monthly_fee', 'status', 'subscription_start_date', 'subscription_end_date', 'auto_renew')
         }),
         ('Payment Information', {
             'fields': ('payment_method', 'payment_reference', 'notes')
@@ -58,8 +62,13 @@ class HostelAdmin(admin.ModelAdmin):
         'nearby_landmark', 'landmark_distance', 'subscription_status', 'min_price', 'created_at'
     )
     list_filter = ('is_featured', 'is_verified', 'is_active', 'created_at')
+    list_select_related = ('owner', 'subscription')
+    # Explicit, since Meta.ordering is dropped from the aggregated queryset
+    ordering = ('-is_featured', '-created_at')
     search_fields = ('name', 'address', 'nearby_landmark', 'owner__username')
+    show_full_result_count = False
     prepopulated_fields = {'slug': ('name',)}
+    autocomplete_fields = ('owner',)
     inlines = [RoomTypeInline, HostelImageInline, HostelFacilityInline, HostelSubscriptionInline]
     actions = ['mark_verified', 'mark_unverified', 'mark_featured', 'mark_unfeatured']
 
@@ -83,6 +92,14 @@ class HostelAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(lowest_room_price=Min('room_types__price'))
+
+    def min_price(self, obj):
+        return obj.lowest_room_price
+    min_price.short_description = 'Min price'
+    min_price.admin_order_field = 'lowest_room_price'
+
     def subscription_status(self, obj):
         try:
             return obj.subscription.get_status_display()
@@ -91,21 +108,25 @@ class HostelAdmin(admin.ModelAdmin):
     subscription_status.short_description = 'Subscription'
 
     def mark_verified(self, request, queryset):
-        queryset.update(is_verified=True)
+        bulk_actions.change_hostels(queryset.values_list('pk', flat=True), {'is_verified': True})
     mark_verified.short_description = "Mark selected hostels as verified"
 
     def mark_unverified(self, request, queryset):
-        queryset.update(is_verified=False)
+        bulk_actions.change_hostels(queryset.values_list('pk', flat=True), {'is_verified': False})
     mark_unverified.short_description = "Mark selected hostels as unverified"
 
     def mark_featured(self, request, queryset):
-        queryset.update(is_featured=True)
+        bulk_actions.change_hostels(queryset.values_list('pk', flat=True), {'is_featured': True})
     mark_featured.short_description = "Mark selected hostels as featured"
 
     def mark_unfeatured(self, request, queryset):
-        queryset.update(is_featured=False)
+        bulk_actions.change_hostels(queryset.values_list('pk', flat=True), {'is_featured': False})
     mark_unfeatured.short_description = "Remove featured status from selected hostels"
 
+    def delete_queryset(self, request, queryset):
+        # "Delete selected" would use queryset.delete(), which skips Hostel.delete()
+        bulk_actions.change_hostels(queryset.values_list('pk', flat=True), None)
+
 
 @admin.register(Facility)
 class FacilityAdmin(admin.ModelAdmin):
@@ -117,48 +138,72 @@ class FacilityAdmin(admin.ModelAdmin):
 class RoomTypeAdmin(admin.ModelAdmin):
     list_display = ('hostel', 'type', 'price', 'available_rooms')
     list_filter = ('type', 'price')
+    list_select_related = ('hostel',)
     search_fields = ('hostel__name',)
+    autocomplete_fields = ('hostel',)
 
 
 @admin.register(HostelImage)
 class HostelImageAdmin(admin.ModelAdmin):
     list_display = ('hostel', 'is_primary', 'created_at')
     list_filter = ('is_primary', 'created_at')
+    list_select_related = ('hostel',)
+    autocomplete_fields = ('hostel',)
 
 
 @admin.register(ContactReveal)
 class ContactRevealAdmin(admin.ModelAdmin):
     list_display = ('hostel', 'user', 'ip_address', 'timestamp')
-    list_filter = ('timestamp',)
+    list_filter = ('timestamp', HostelInputFilter)
+    list_select_related = ('hostel', 'user')
     readonly_fields = ('timestamp',)
+    autocomplete_fields = ('hostel', 'user')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(HostelView)
 class HostelViewAdmin(admin.ModelAdmin):
     list_display = ('hostel', 'user', 'ip_address', 'timestamp')
-    list_filter = ('timestamp', 'hostel')
+    list_filter = ('timestamp', HostelInputFilter)
+    list_select_related = ('hostel', 'user')
     readonly_fields = ('timestamp',)
     search_fields = ('hostel__name', 'user__username', 'ip_address')
+    autocomplete_fields = ('hostel', 'user')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'hostel', 'created_at')
-    list_filter = ('created_at',)
+    list_filter = ('created_at', HostelInputFilter)
+    list_select_related = ('user', 'hostel')
+    autocomplete_fields = ('user', 'hostel')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('hostel', 'user', 'rating', 'is_approved', 'created_at')
-    list_filter = ('rating', 'is_approved', 'created_at')
+    list_filter = ('rating', 'is_approved', 'created_at', HostelInputFilter)
+    list_select_related = ('hostel', 'user')
+    autocomplete_fields = ('hostel', 'user')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     actions = ['approve_reviews', 'disapprove_reviews']
 
     def approve_reviews(self, request, queryset):
+        hostel_ids = list(queryset.values_list('hostel_id', flat=True))
         queryset.update(is_approved=True)
+        page_cache.invalidate_after_commit(hostel_ids=hostel_ids)
     approve_reviews.short_description = "Approve selected reviews"
 
     def disapprove_reviews(self, request, queryset):
+        hostel_ids = list(queryset.values_list('hostel_id', flat=True))
         queryset.update(is_approved=False)
+        page_cache.invalidate_after_commit(hostel_ids=hostel_ids)
     disapprove_reviews.short_description = "Disapprove selected reviews"
 
 
@@ -166,6 +211,8 @@ class ReviewAdmin(admin.ModelAdmin):
 class ReportAdmin(admin.ModelAdmin):
     list_display = ('hostel', 'reporter', 'report_type', 'is_resolved', 'created_at')
     list_filter = ('report_type', 'is_resolved', 'created_at')
+    list_select_related = ('hostel', 'reporter')
+    autocomplete_fields = ('hostel', 'reporter')
     actions = ['mark_resolved']
 
     def mark_resolved(self, request, queryset):
@@ -177,11 +224,13 @@ class ReportAdmin(admin.ModelAdmin):
 class HostelSubscriptionAdmin(admin.ModelAdmin):
     list_display = (
         'hostel', 'status', 'monthly_fee', 'subscription_start_date',
-        'subscription_end_date', 'days_until_expiry', 'created_at'
+        'subscription_end_date', 'days_until_expiry', 'auto_renew', 'created_at'
     )
-    list_filter = ('status', 'created_at', 'subscription_start_date', 'subscription_end_date')
+    list_filter = ('status', 'auto_renew', 'created_at', 'subscription_start_date', 'subscription_end_date')
+    list_select_related = ('hostel',)
     search_fields = ('hostel__name', 'payment_reference', 'payment_method')
-    readonly_fields = ('created_at', 'updated_at', 'days_until_expiry', 'is_active')
+    autocomplete_fields = ('hostel',)
+    readonly_fields = ('created_at', 'updated_at', 'days_until_expiry', 'is_active', 'expiry_notice_sent_at')
     actions = ['activate_subscriptions', 'expire_subscriptions']
 
     fieldsets = (
@@ -189,13 +238,13 @@ class HostelSubscriptionAdmin(admin.ModelAdmin):
             'fields': ('hostel',)
         }),
         ('Subscription Details', {
-            'fields': ('monthly_fee', 'status', 'subscription_start_date', 'subscription_end_date')
+            'fields': ('monthly_fee', 'status', 'subscription_start_date', 'subscription_end_date', 'auto_renew')
         }),
         ('Payment Information', {
             'fields': ('payment_method', 'payment_reference')
         }),
         ('Status Information', {
-            'fields': ('is_active', 'days_until_expiry'),
+            'fields': ('is_active', 'days_until_expiry', 'expiry_notice_sent_at'),
             'classes': ('collapse',)
         }),
         ('Notes & Administration', {
@@ -208,11 +257,47 @@ class HostelSubscriptionAdmin(admin.ModelAdmin):
     )
 
     def activate_subscriptions(self, request, queryset):
-        queryset.update(status='active')
-        self.message_user(request, f'{queryset.count()} subscriptions activated.')
+        count = bulk_actions.change_subscriptions(queryset, relisted=True, status='active')
+        self.message_user(request, f'{count} subscriptions activated.')
     activate_subscriptions.short_description = "Activate selected subscriptions"
 
     def expire_subscriptions(self, request, queryset):
-        queryset.update(status='expired')
-        self.message_user(request, f'{queryset.count()} subscriptions expired.')
+        count = bulk_actions.change_subscriptions(queryset, status='expired')
+        self.message_user(request, f'{count} subscriptions expired.')
     expire_subscriptions.short_description = "Mark selected subscriptions as expired"
+
+
+@admin.register(BulkActionJob)
+class BulkActionJobAdmin(admin.ModelAdmin):
+    list_display = ('action', 'target', 'status', 'processed', 'total', 'affected', 'created_by', 'created_at')
+    list_filter = ('status', 'target', 'action')
+    list_select_related = ('created_by',)
+    readonly_fields = (
+        'target', 'action', 'selection', 'status', 'total', 'processed', 'affected',
+        'error', 'created_by', 'created_at', 'started_at', 'finished_at'
+    )
+
+
+@admin.register(Locality)
+class LocalityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'kind', 'city', 'hostel_count')
+    list_filter = ('kind', 'city')
+    search_fields = ('name', 'key')
+    readonly_fields = ('hostel_count',)
+
+
+@admin.register(Landmark)
+class LandmarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'city', 'latitude', 'longitude')
+    list_filter = ('city',)
+    search_fields = ('name', 'aliases')
+    prepopulated_fields = {'slug': ('name',)}
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'predicate_count', 'is_active', 'created_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'user__username')
+    raw_id_fields = ('user', 'landmark')
+    readonly_fields = ('predicate_count',)
@@ -3,7 +3,9 @@ from django.views import View
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.shortcuts import get_object_or_404
 from django.contrib import messages
-from .models import Hostel, User, ContactReveal
+from django.urls import reverse
+from . import bulk_actions
+from .models import Hostel, User, ContactReveal, BulkActionJob
 import json
 
 class AdminRequiredMixin(UserPassesTestMixin):
@@ -101,61 +103,49 @@ class ToggleActiveView(AdminRequiredMixin, View):
             }, status=400)
 
 
-class BulkHostelActionView(AdminRequiredMixin, View):
-    """AJAX view for bulk operations on hostels"""
+class BulkActionView(AdminRequiredMixin, View):
+    """AJAX view for bulk operations, applied inline or as a background job"""
+    target = None
+    ids_key = None
 
     def post(self, request):
         try:
             data = json.loads(request.body)
             action = data.get('action')
-            hostel_ids = data.get('hostel_ids', [])
+            selection = self.get_selection(data)
 
-            if not action or not hostel_ids:
+            if not action or selection is None:
                 return JsonResponse({
                     'success': False,
-                    'error': 'Action and hostel IDs are required'
+                    'error': f'Action and {self.target} IDs are required'
                 }, status=400)
 
-            hostels = Hostel.objects.filter(id__in=hostel_ids)
-
-            if action == 'approve':
-                hostels.update(is_verified=True)
-                message = f'{hostels.count()} hostels approved successfully.'
-            elif action == 'reject':
-                hostels.update(is_active=False, is_verified=False)
-                message = f'{hostels.count()} hostels rejected successfully.'
-            elif action == 'feature':
-                hostels.update(is_featured=True)
-                message = f'{hostels.count()} hostels added to featured list.'
-            elif action == 'unfeature':
-                hostels.update(is_featured=False)
-                message = f'{hostels.count()} hostels removed from featured list.'
-            elif action == 'activate':
-                hostels.update(is_active=True)
-                message = f'{hostels.count()} hostels activated successfully.'
-            elif action == 'deactivate':
-                hostels.update(is_active=False)
-                message = f'{hostels.count()} hostels deactivated successfully.'
-            elif action == 'delete':
-                count = hostels.count()
-                hostels.delete()
-                message = f'{count} hostels deleted successfully.'
-                return JsonResponse({
-                    'success': True,
-                    'message': message,
-                    'affected_count': count
-                })
-            else:
+            if action not in bulk_actions.ACTIONS[self.target]:
                 return JsonResponse({
                     'success': False,
                     'error': 'Invalid action'
                 }, status=400)
 
+            job = BulkActionJob(target=self.target, action=action, selection=selection, created_by=request.user)
+
+            if bulk_actions.runs_inline(job):
+                affected = bulk_actions.apply_inline(job)
+                return JsonResponse({
+                    'success': True,
+                    'message': bulk_actions.result_message(job, affected),
+                    'affected_count': affected
+                })
+
+            job.total = bulk_actions.get_selection(job).count()
+            job.save()
+            bulk_actions.start(job)
             return JsonResponse({
                 'success': True,
-                'message': message,
-                'affected_count': hostels.count()
-            })
+                'message': f'Processing {job.total} {job.get_target_display().lower()} in the background.',
+                'job_id': str(job.pk),
+                'status_url': reverse('hostels:bulk_action_status', kwargs={'job_id': job.pk}),
+                'total': job.total
+            }, status=202)
 
         except Exception as e:
             return JsonResponse({
@@ -163,6 +153,38 @@ class BulkHostelActionView(AdminRequiredMixin, View):
                 'error': str(e)
             }, status=400)
 
+    def get_selection(self, data):
+        """Explicit IDs, or the list page filters for "select all matching" """
+        if data.get('select_all'):
+            filters = data.get('filters') or {}
+            return {'filters': {
+                key: filters[key] for key in bulk_actions.FILTER_PARAMS[self.target] if filters.get(key)
+            }}
+        ids = data.get(self.ids_key) or []
+        return {'ids': [str(pk) for pk in ids]} if ids else None
+
+
+class BulkHostelActionView(BulkActionView):
+    """AJAX view for bulk operations on hostels"""
+    target = 'hostel'
+    ids_key = 'hostel_ids'
+
+
+class BulkActionStatusView(AdminRequiredMixin, View):
+    """AJAX view reporting the progress of a background bulk action"""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(BulkActionJob, pk=job_id)
+        return JsonResponse({
+            'status': job.status,
+            'total': job.total,
+            'processed': job.processed,
+            'affected_count': job.affected,
+            'progress': job.progress,
+            'message': bulk_actions.result_message(job, job.affected) if job.status == 'completed' else '',
+            'error': job.error
+        })
+
 
 class ExportDataView(AdminRequiredMixin, View):
     """Export data to CSV"""
@@ -214,6 +236,49 @@ class ExportDataView(AdminRequiredMixin, View):
         return response
 
 
+class ImportHostelsView(AdminRequiredMixin, View):
+    """Upload a CSV or NDJSON file of hostels, import it in the background and show the report"""
+    template_name = 'hostels/admin/import_hostels.html'
+
+    def render(self, request, form, job=None):
+        from django.shortcuts import render
+        return render(request, self.template_name, {
+            'form': form,
+            'job': job,
+            'report': job.report if job else None,
+            'dry_run': job.selection.get('dry_run') if job else False,
+            'message': bulk_actions.result_message(job, job.affected) if job and job.status == 'completed' else '',
+        })
+
+    def get(self, request, job_id=None):
+        from .importer import ImportUploadForm
+
+        job = None
+        if job_id is not None:
+            job = get_object_or_404(BulkActionJob, pk=job_id, action=bulk_actions.IMPORT_ACTION)
+        return self.render(request, ImportUploadForm(), job)
+
+    def post(self, request):
+        from django.shortcuts import redirect
+        from .importer import ImportUploadForm
+
+        form = ImportUploadForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return self.render(request, form)
+
+        # Imported by a BulkActionJob; the page polls it and shows the report
+        job = bulk_actions.queue_import(
+            form.cleaned_data['file'],
+            form.cleaned_data['format'],
+            form.cleaned_data['rows'],
+            owner=form.cleaned_data['owner'],
+            verified=form.cleaned_data['verified'],
+            dry_run=form.cleaned_data['dry_run'],
+            created_by=request.user,
+        )
+        return redirect('hostels:import_hostels_job', job_id=job.pk)
+
+
 class SystemBackupView(AdminRequiredMixin, View):
     """Create a backup of essential data"""
 
@@ -284,7 +349,7 @@ class DeleteUserView(AdminRequiredMixin, View):
                 }, status=400)
 
             username = user.username
-            user.delete()
+            bulk_actions.delete_users([user.pk])
 
             return JsonResponse({
                 'success': True,
@@ -297,54 +362,10 @@ class DeleteUserView(AdminRequiredMixin, View):
             }, status=400)
 
 
-class BulkUserActionView(AdminRequiredMixin, View):
+class BulkUserActionView(BulkActionView):
     """AJAX view for bulk operations on users"""
-
-    def post(self, request):
-        try:
-            data = json.loads(request.body)
-            action = data.get('action')
-            user_ids = data.get('user_ids', [])
-
-            if not action or not user_ids:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Action and user IDs are required'
-                }, status=400)
-
-            users = User.objects.filter(id__in=user_ids)
-
-            # Filter out superusers and current user for safety
-            if action in ['delete', 'deactivate']:
-                users = users.exclude(is_superuser=True).exclude(id=request.user.id)
-
-            if action == 'activate':
-                users.update(is_active=True)
-                message = f'{users.count()} users activated successfully.'
-            elif action == 'deactivate':
-                users.update(is_active=False)
-                message = f'{users.count()} users deactivated successfully.'
-            elif action == 'delete':
-                count = users.count()
-                users.delete()
-                message = f'{count} users deleted successfully.'
-            else:
-                return JsonResponse({
-                    'success': False,
-                    'error': 'Invalid action'
-                }, status=400)
-
-            return JsonResponse({
-                'success': True,
-                'message': message,
-                'affected_count': users.count() if action != 'delete' else count
-            })
-
-        except Exception as e:
-            return JsonResponse({
-                'success': False,
-                'error': str(e)
-            }, status=400)
+    target = 'user'
+    ids_key = 'user_ids'
 
 
 class ApproveReviewView(AdminRequiredMixin, View):
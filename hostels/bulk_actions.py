@@ -0,0 +1,405 @@
+"""
+Bulk admin actions on hostels and users.
+
+Small explicit selections are applied inline within the request. Larger
+ones and "select all matching" selections run as a BulkActionJob, one
+chunk of primary keys at a time, so no single statement locks a large
+part of a table.
+
+Hostel file imports (hostels.importer) are jobs with the ``import``
+action: the stored file and options are kept in ``selection``, the
+report in ``report`` and the last line imported in ``cursor``.
+
+A job is started in a background thread once it is saved, but the thread
+dies with its process. Workers claim a job before running it and record
+a heartbeat and the last primary key done after every chunk, so a job
+left pending, or running without a heartbeat for
+``BULK_ACTION_STALE_SECONDS``, is claimed again by ``run_bulk_actions``
+(run it from cron or with ``--loop``) and resumes after its last chunk.
+"""
+import io
+import logging
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import map_clusters, page_cache, ranking, saved_searches
+from .localities import refresh_counts
+from .models import BulkActionJob, Hostel, Locality, User
+
+logger = logging.getLogger(__name__)
+
+# action -> (field values for UPDATE, or None for delete; result message)
+HOSTEL_ACTIONS = {
+    'approve': ({'is_verified': True}, '{count} hostels approved successfully.'),
+    'reject': ({'is_active': False, 'is_verified': False}, '{count} hostels rejected successfully.'),
+    'feature': ({'is_featured': True}, '{count} hostels added to featured list.'),
+    'unfeature': ({'is_featured': False}, '{count} hostels removed from featured list.'),
+    'activate': ({'is_active': True}, '{count} hostels activated successfully.'),
+    'deactivate': ({'is_active': False}, '{count} hostels deactivated successfully.'),
+    'delete': (None, '{count} hostels deleted successfully.'),
+}
+
+USER_ACTIONS = {
+    'activate': ({'is_active': True}, '{count} users activated successfully.'),
+    'deactivate': ({'is_active': False}, '{count} users deactivated successfully.'),
+    'delete': (None, '{count} users deleted successfully.'),
+}
+
+ACTIONS = {
+    'hostel': HOSTEL_ACTIONS,
+    'user': USER_ACTIONS,
+}
+
+# Hostel file imports; not offered on the list pages, so not in ACTIONS
+IMPORT_ACTION = 'import'
+IMPORT_DIRECTORY = 'hostel_imports'
+
+# Query parameters of the admin list pages accepted for "select all matching"
+FILTER_PARAMS = {
+    'hostel': ('status', 'search'),
+    'user': ('role', 'search'),
+}
+
+
+def filter_hostels(queryset, status=None, search=None):
+    """Apply the hostel management page filters"""
+    if status == 'verified':
+        queryset = queryset.filter(is_verified=True)
+    elif status == 'pending':
+        queryset = queryset.filter(is_verified=False)
+    elif status == 'featured':
+        queryset = queryset.filter(is_featured=True)
+    elif status == 'inactive':
+        queryset = queryset.filter(is_active=False)
+
+    if search:
+        queryset = queryset.filter(
+            Q(name__icontains=search) |
+            Q(owner__username__icontains=search) |
+            Q(address__icontains=search)
+        )
+    return queryset
+
+
+def filter_users(queryset, role=None, search=None):
+    """Apply the user management page filters"""
+    if role in ['student', 'owner', 'admin']:
+        queryset = queryset.filter(role=role)
+
+    if search:
+        queryset = queryset.filter(
+            Q(username__icontains=search) |
+            Q(first_name__icontains=search) |
+            Q(last_name__icontains=search) |
+            Q(email__icontains=search)
+        )
+    return queryset
+
+
+def get_selection(job):
+    """Queryset of the rows a job applies to"""
+    if job.target == 'hostel':
+        queryset = Hostel.objects.all()
+        apply_filters = filter_hostels
+    else:
+        queryset = User.objects.all()
+        apply_filters = filter_users
+        # Never lock out or delete superusers or the admin running the action
+        if job.action in ['delete', 'deactivate']:
+            queryset = queryset.exclude(is_superuser=True).exclude(id=job.created_by_id)
+
+    if 'ids' in job.selection:
+        return queryset.filter(pk__in=job.selection['ids'])
+    return apply_filters(queryset, **job.selection.get('filters', {}))
+
+
+def runs_inline(job):
+    """Whether a job is small enough to apply within the request"""
+    return 'ids' in job.selection and len(job.selection['ids']) <= settings.BULK_ACTION_INLINE_LIMIT
+
+
+def apply_inline(job):
+    """Apply a small job within the request; return the number of rows it changed"""
+    values, _ = ACTIONS[job.target][job.action]
+    selection = get_selection(job)
+    ids = list(selection.values_list('pk', flat=True))
+    if job.target == 'hostel':
+        return change_hostels(ids, values)
+    if values is None:
+        return delete_users(ids)
+    return selection.model.objects.filter(pk__in=ids).update(**values)
+
+
+def delete_users(ids):
+    """Delete users and return how many were deleted.
+
+    Their hostels would go by cascade without anything derived from them
+    being refreshed, so they are deleted through change_hostels first.
+    """
+    ids = list(ids)
+    hostel_ids = list(Hostel.objects.filter(owner__in=ids).values_list('pk', flat=True))
+    if hostel_ids:
+        change_hostels(hostel_ids, None)
+    return delete_in_batches(User, ids, settings.BULK_ACTION_CHUNK_SIZE)
+
+
+def change_hostels(ids, values):
+    """Update hostels with ``values`` (or delete them, for None) and refresh what is derived from them.
+
+    Returns the number of hostels changed. Locality counts, map clusters,
+    saved search matches and cached pages are refreshed as Hostel.save()
+    and delete() would have done.
+    """
+    ids = list(ids)
+    # Read before a delete removes the hostels and their locality links
+    state = listing_state(ids)
+
+    if values is None:
+        affected = delete_in_batches(Hostel, ids, settings.BULK_ACTION_CHUNK_SIZE)
+    else:
+        if 'is_featured' in values:
+            ranking.boost_featured(Hostel.objects.filter(pk__in=ids), values['is_featured'])
+        affected = Hostel.objects.filter(pk__in=ids).update(**values)
+
+    refresh_listing(state, relisted=lists_hostels(values))
+    return affected
+
+
+def listing_state(ids):
+    """What refresh_listing needs to know about hostels, read before they change"""
+    ids = list(ids)
+    return {
+        'ids': ids,
+        'locality_ids': list(
+            Locality.objects.filter(hostel_localities__hostel__in=ids).values_list('pk', flat=True).distinct()
+        ),
+        'rows': list(Hostel.objects.filter(pk__in=ids).values_list('latitude', 'longitude', 'slug')),
+    }
+
+
+def refresh_listing(state, relisted=False):
+    """Refresh what is derived from hostels whose listing changed without Hostel.save().
+
+    Call after the change, inside its transaction. Saved searches are only
+    matched when the change can have ``relisted`` the hostels.
+    """
+    refresh_counts(state['locality_ids'])
+    map_clusters.refresh_after_commit([row[:2] for row in state['rows']])
+    if relisted:
+        saved_searches.match_after_commit(state['ids'])
+    page_cache.invalidate_after_commit(slugs=[row[2] for row in state['rows']])
+
+
+def change_subscriptions(subscriptions, relisted=False, **values):
+    """Update subscriptions and refresh their hostels' listing; return the number updated.
+
+    Only hostels with an active subscription are listed when search is
+    subscription-gated, so a status or end date change lists or delists
+    them like a hostel status change.
+    """
+    with transaction.atomic():
+        state = listing_state(subscriptions.values_list('hostel_id', flat=True))
+        updated = subscriptions.update(**values)
+        refresh_listing(state, relisted=relisted)
+    return updated
+
+
+def lists_hostels(values):
+    """Whether an update can put hostels on the public listing"""
+    return bool(values) and (values.get('is_verified') is True or values.get('is_active') is True)
+
+
+def result_message(job, count):
+    if job.action == IMPORT_ACTION:
+        if job.selection.get('dry_run'):
+            return f"{count} of {job.report.get('rows', 0)} rows are valid."
+        return f'{count} hostels imported successfully.'
+    _, message = ACTIONS[job.target][job.action]
+    return message.format(count=count)
+
+
+def queue_import(upload, fmt, rows, owner=None, verified=False, dry_run=False, created_by=None):
+    """Store an uploaded import file and start a job importing it"""
+    name = default_storage.save(f'{IMPORT_DIRECTORY}/{uuid.uuid4().hex}.{fmt}', upload)
+    job = BulkActionJob.objects.create(
+        target='hostel',
+        action=IMPORT_ACTION,
+        selection={
+            'file': name,
+            'format': fmt,
+            'owner_id': owner.pk if owner else None,
+            'verified': verified,
+            'dry_run': dry_run,
+        },
+        total=rows,
+        created_by=created_by,
+    )
+    start(job)
+    return job
+
+
+def start(job):
+    """Run the job in a background thread once the surrounding transaction commits"""
+    thread = threading.Thread(target=run_in_background, args=(job.pk,), name=f'bulk-action-{job.pk}', daemon=True)
+    transaction.on_commit(thread.start)
+
+
+def run_in_background(job_id):
+    try:
+        run(job_id)
+    finally:
+        # The thread opened its own connection
+        connection.close()
+
+
+def claimable(now):
+    """Jobs no worker is running: pending, or running without a recent heartbeat"""
+    stale = now - timedelta(seconds=settings.BULK_ACTION_STALE_SECONDS)
+    return Q(status='pending') | Q(status='running', heartbeat_at__lt=stale) | Q(status='running', heartbeat_at=None)
+
+
+def claim(jobs=None):
+    """Mark the oldest claimable job of ``jobs`` running for this worker; return it, or None"""
+    if jobs is None:
+        jobs = BulkActionJob.objects.all()
+    now = timezone.now()
+    with transaction.atomic():
+        job = jobs.select_for_update(skip_locked=True).filter(claimable(now)).order_by('created_at').first()
+        if job is None:
+            return None
+        # The conditional UPDATE also settles races on databases without row locks
+        claimed = BulkActionJob.objects.filter(claimable(now), pk=job.pk).update(
+            status='running', heartbeat_at=now, started_at=Coalesce('started_at', Value(now)),
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run(job_id):
+    """Claim a job and process it, unless another worker has it"""
+    job = claim(BulkActionJob.objects.filter(pk=job_id))
+    if job is not None:
+        process(job)
+
+
+def process(job):
+    """Process a claimed job chunk by chunk, after its last recorded chunk"""
+    jobs = BulkActionJob.objects.filter(pk=job.pk)
+    try:
+        if job.action == IMPORT_ACTION:
+            process_import(job, jobs)
+        else:
+            process_selection(job, jobs)
+        jobs.update(status='completed', finished_at=timezone.now())
+    except Exception as exc:
+        logger.exception('Bulk action job %s failed', job.pk)
+        jobs.update(status='failed', error=str(exc), finished_at=timezone.now())
+
+
+def process_selection(job, jobs):
+    values, _ = ACTIONS[job.target][job.action]
+    chunk_size = settings.BULK_ACTION_CHUNK_SIZE
+    selection = get_selection(job).order_by('pk')
+    model = selection.model
+
+    # Keyset pagination: rows that leave the selection after being
+    # updated (or deleted) cannot shift the next chunk, and a claimed
+    # job resumes after the last chunk it recorded.
+    last_pk = job.cursor or None
+    while True:
+        chunk = selection if last_pk is None else selection.filter(pk__gt=last_pk)
+        ids = list(chunk.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+
+        # Positions and slugs are read before a delete removes them
+        positions, slugs = [], []
+        if job.target == 'hostel':
+            rows = list(model.objects.filter(pk__in=ids).values_list('latitude', 'longitude', 'slug'))
+            positions = [row[:2] for row in rows]
+            slugs = [row[2] for row in rows]
+
+        if values is None and job.target == 'user':
+            affected = delete_users(ids)
+        elif values is None:
+            affected = delete_in_batches(model, ids, chunk_size)
+        else:
+            if job.target == 'hostel' and 'is_featured' in values:
+                ranking.boost_featured(model.objects.filter(pk__in=ids), values['is_featured'])
+            affected = model.objects.filter(pk__in=ids).update(**values)
+        map_clusters.refresh_points(positions)
+        if job.target == 'hostel':
+            page_cache.invalidate(slugs)
+        if job.target == 'hostel' and lists_hostels(values):
+            saved_searches.match_hostels(ids)
+        jobs.update(
+            processed=F('processed') + len(ids), affected=F('affected') + affected,
+            cursor=str(last_pk), heartbeat_at=timezone.now(),
+        )
+
+    if job.target == 'hostel':
+        # Status changes and deletes bypass Hostel.save(); recount the locality index once
+        refresh_counts()
+
+
+def process_import(job, jobs):
+    """Import a job's stored file, after the last line a previous worker recorded"""
+    from .importer import HostelImporter, ImportReport
+
+    options = job.selection
+    importer = HostelImporter(
+        owner=User.objects.filter(pk=options['owner_id']).first() if options['owner_id'] else None,
+        chunk_size=settings.BULK_ACTION_CHUNK_SIZE,
+        verified=options['verified'],
+        dry_run=options['dry_run'],
+        report=ImportReport(**job.report) if job.report else None,
+    )
+
+    def progress(line_number):
+        # In the chunk's transaction, so the report and cursor match the rows saved
+        report = importer.report
+        jobs.update(
+            processed=report.rows, affected=report.valid if importer.dry_run else report.created,
+            report=report.as_dict(), cursor=str(line_number), heartbeat_at=timezone.now(),
+        )
+
+    with default_storage.open(options['file'], 'rb') as upload:
+        stream = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+        report = importer.run(stream, options['format'], start_after=int(job.cursor or 0), progress=progress)
+    # A file without rows never reported progress
+    jobs.update(report=report.as_dict())
+    default_storage.delete(options['file'])
+
+
+def delete_in_batches(model, ids, batch_size):
+    """Delete rows and their cascades bottom-up, one batch per transaction.
+
+    A plain ``delete()`` collects and deletes every dependent row (views,
+    reveals, reviews, ...) in one transaction. Here each cascading relation
+    is emptied ``batch_size`` rows at a time first, so locks stay short.
+    Returns the number of ``model`` rows deleted.
+    """
+    for relation in model._meta.related_objects:
+        if relation.many_to_many or relation.on_delete is not models.CASCADE:
+            continue
+        related = relation.related_model._base_manager.filter(**{f'{relation.field.name}__in': ids})
+        while True:
+            child_ids = list(related.values_list('pk', flat=True)[:batch_size])
+            if not child_ids:
+                break
+            delete_in_batches(relation.related_model, child_ids, batch_size)
+
+    with transaction.atomic():
+        _, deleted = model._base_manager.filter(pk__in=ids).delete()
+    return deleted.get(model._meta.label, 0)
@@ -0,0 +1,114 @@
+"""
+Conditional GET for hostel pages and the search API.
+
+Validators are computed without rendering. A hostel page's ETag combines
+the hostel's ``updated_at``, the version token of its page cache tag
+(replaced whenever its reviews, rooms or images change, see
+hostels.page_cache) and the visitor, since signed-in users see their own
+controls. Its Last-Modified is the later of ``updated_at`` and the time
+that token was made. Search API results only change with the listings,
+so the ``listings`` token is their validator.
+
+Django's ``condition()`` answers matching If-None-Match and
+If-Modified-Since requests with 304 before the view runs, so a hostel
+page answered with 304 records its HostelView here instead, as the
+page cache does for the 304s it serves. ``Cache-Control``
+makes browsers revalidate every time and lets a shared proxy in front of
+the site serve public responses for ``PROXY_CACHE_MAX_AGE`` seconds.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import page_cache
+from .models import Hostel
+
+
+def digest(*parts):
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def version_datetime(version):
+    return datetime.fromtimestamp(page_cache.version_time(version), tz=dt_timezone.utc)
+
+
+def hostel_validators(request, slug):
+    """``(etag, last modified)`` of a hostel page, or None to render it unconditionally"""
+    if not hasattr(request, 'hostel_validators'):
+        row = Hostel.objects.filter(slug=slug, is_active=True).values_list('pk', 'owner_id', 'updated_at').first()
+        request.validated_hostel = row and row[:2]
+        updated_at = row and row[2]
+        if updated_at is None or len(get_messages(request)):
+            # Missing hostels get their 404; pending messages must be rendered
+            request.hostel_validators = None
+        else:
+            (version,) = page_cache.tag_versions([page_cache.hostel_tag(slug)])
+            visitor = request.user.pk if request.user.is_authenticated else 'anonymous'
+            request.hostel_validators = (
+                digest(updated_at.isoformat(), version, visitor),
+                max(updated_at, version_datetime(version)),
+            )
+    return request.hostel_validators
+
+
+def hostel_etag(request, slug):
+    validators = hostel_validators(request, slug)
+    return validators and validators[0]
+
+
+def hostel_last_modified(request, slug):
+    validators = hostel_validators(request, slug)
+    return validators and validators[1]
+
+
+def record_hostel_view(request, slug):
+    """Record the HostelView of a hostel page answered with 304, as rendering it would have"""
+    from . import events
+
+    hostel_id, owner_id = request.validated_hostel
+    if request.user.pk != owner_id:
+        events.record_hostel_view(request, hostel_id)
+
+
+def listings_version():
+    (version,) = page_cache.tag_versions([page_cache.LISTINGS_TAG])
+    return version
+
+
+def listings_etag(request, *args, **kwargs):
+    return digest(listings_version())
+
+
+def listings_last_modified(request, *args, **kwargs):
+    return version_datetime(listings_version())
+
+
+def revalidated(etag_func, last_modified_func, per_user=False, not_modified=None):
+    """``condition()`` with these validators, plus Cache-Control for browsers and a local proxy.
+
+    ``per_user`` responses are private to signed-in users. ``not_modified``
+    is called with the view's arguments when the answer is 304.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code == 304 and not_modified is not None:
+                not_modified(request, *args, **kwargs)
+            if response.status_code in (200, 304) and not response.has_header('Cache-Control'):
+                if per_user and request.user.is_authenticated:
+                    patch_cache_control(response, private=True, no_cache=True)
+                else:
+                    patch_cache_control(
+                        response, public=True, max_age=0, s_maxage=settings.PROXY_CACHE_MAX_AGE,
+                    )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,189 @@
+"""
+"Students also viewed" from HostelView sessions.
+
+Views are grouped per visitor (the user, or IP and user agent for anonymous
+visitors) into sessions that end after ``SESSION_GAP`` without a view.
+Every pair of hostels viewed in the same session counts once for that
+session, and CoView keeps the running count in both directions, so a
+hostel's most co-viewed hostels are the top of one index range.
+
+``update`` is incremental: it reads only views after the watermark stored
+in JobState, a chunk at a time. Earlier views of the same visitors within
+the session gap are loaded as context, so a session that straddles two
+runs adds only the pairs its new views create. Each chunk's counts and
+the advanced watermark commit together, so a crashed run resumes cleanly.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CoView, HostelView, JobState
+
+JOB_NAME = 'coviews'
+
+SESSION_GAP = timedelta(minutes=30)
+# Sessions viewing more hostels than this are crawlers; they add no pairs
+MAX_SESSION_HOSTELS = 30
+# Co-viewed hostels kept per hostel; the long tail is pruned after each chunk
+KEEP = 50
+# Fewest shared sessions before a pair is shown
+MIN_SESSIONS = 2
+# Bound on re-queries while following one visitor's session back in time
+MAX_CONTEXT_ROUNDS = 12
+
+
+def visitor_key(user_id, ip_address, user_agent):
+    return ('user', user_id) if user_id else ('anon', ip_address, user_agent)
+
+
+def session_pairs(views):
+    """Unordered pairs that a visitor's views add; ``views`` are ``(timestamp, hostel, is_new)``.
+
+    Within each session, pairs among hostels seen only in old views were
+    counted by an earlier run and are skipped.
+    """
+    pairs = []
+    session = []
+    for view in sorted(views) + [None]:
+        if session and (view is None or view[0] - session[-1][0] > SESSION_GAP):
+            old = {hostel for _, hostel, is_new in session if not is_new}
+            new = {hostel for _, hostel, is_new in session if is_new} - old
+            if new and len(old | new) <= MAX_SESSION_HOSTELS:
+                pairs += combinations(sorted(new), 2)
+                pairs += (tuple(sorted((a, b))) for a in new for b in old)
+            session = []
+        if view is not None:
+            session.append(view)
+    return pairs
+
+
+def count_pairs(views, context):
+    """Co-view counts added by ``views``, given already-counted ``context`` views.
+
+    Both are ``(hostel, user, ip, user agent, timestamp)`` rows.
+    """
+    by_visitor = defaultdict(list)
+    for hostel, user, ip_address, user_agent, timestamp in views:
+        by_visitor[visitor_key(user, ip_address, user_agent)].append((timestamp, hostel, True))
+    for hostel, user, ip_address, user_agent, timestamp in context:
+        key = visitor_key(user, ip_address, user_agent)
+        if key in by_visitor:
+            by_visitor[key].append((timestamp, hostel, False))
+
+    counts = Counter()
+    for visitor_views in by_visitor.values():
+        counts.update(session_pairs(visitor_views))
+    return counts
+
+
+def context_views(views, watermark):
+    """Already-counted views of the same visitors that can share a session with ``views``.
+
+    A session is a chain of views less than ``SESSION_GAP`` apart, so each
+    visitor's window is widened and re-queried until their chain ends, for
+    at most ``MAX_CONTEXT_ROUNDS`` rounds.
+    """
+    windows = {}
+    for _, user, ip_address, user_agent, timestamp in views:
+        key = visitor_key(user, ip_address, user_agent)
+        low, high = windows.get(key, (timestamp, timestamp))
+        windows[key] = (min(low, timestamp), max(high, timestamp))
+
+    context = {}
+    pending = set(windows)
+    for _ in range(MAX_CONTEXT_ROUNDS):
+        if not pending:
+            break
+        users = {key[1] for key in pending if key[0] == 'user'}
+        ips = {key[1] for key in pending if key[0] == 'anon'}
+        rows = (
+            HostelView.objects.filter(Q(user__in=users) | Q(user__isnull=True, ip_address__in=ips))
+            .filter(
+                pk__lte=watermark,
+                timestamp__gte=min(windows[key][0] for key in pending) - SESSION_GAP,
+                timestamp__lte=max(windows[key][1] for key in pending) + SESSION_GAP,
+            )
+            .exclude(pk__in=list(context))
+            .order_by('timestamp')
+            .values_list('pk', 'hostel_id', 'user_id', 'ip_address', 'user_agent', 'timestamp')
+        )
+        grown = set()
+        for pk, *row in rows:
+            key = visitor_key(*row[1:4])
+            if key not in pending:
+                continue
+            low, high = windows[key]
+            timestamp = row[4]
+            if low - SESSION_GAP <= timestamp <= high + SESSION_GAP:
+                context[pk] = row
+                windows[key] = (min(low, timestamp), max(high, timestamp))
+                if timestamp < low or timestamp > high:
+                    grown.add(key)
+        pending = grown
+    return list(context.values())
+
+
+def apply(counts, batch_size=1000):
+    """Add pair counts to CoView in both directions and prune the hostels they touched"""
+    added = Counter()
+    for (a, b), sessions in counts.items():
+        added[(a, b)] += sessions
+        added[(b, a)] += sessions
+    touched = {hostel for hostel, _ in added}
+
+    existing = {
+        (hostel, other): (pk, sessions)
+        for pk, hostel, other, sessions in CoView.objects.filter(hostel__in=touched)
+        .values_list('pk', 'hostel_id', 'other_id', 'sessions')
+    }
+    updated, created = [], []
+    for (hostel, other), sessions in added.items():
+        if (hostel, other) in existing:
+            pk, current = existing[(hostel, other)]
+            updated.append(CoView(pk=pk, sessions=current + sessions))
+        else:
+            created.append(CoView(hostel_id=hostel, other_id=other, sessions=sessions))
+    CoView.objects.bulk_update(updated, ['sessions'], batch_size=batch_size)
+    CoView.objects.bulk_create(created, batch_size=batch_size)
+
+    ranked = CoView.objects.filter(hostel__in=touched).order_by('hostel', '-sessions', 'pk')
+    kept = Counter()
+    pruned = []
+    for pk, hostel in ranked.values_list('pk', 'hostel_id'):
+        kept[hostel] += 1
+        if kept[hostel] > KEEP:
+            pruned.append(pk)
+    for start in range(0, len(pruned), batch_size):
+        CoView.objects.filter(pk__in=pruned[start:start + batch_size]).delete()
+
+
+def update(chunk_size=5000):
+    """Consume every view after the watermark; return ``(views read, pairs counted)``"""
+    read = counted = 0
+    while True:
+        with transaction.atomic():
+            state, _ = JobState.objects.select_for_update().get_or_create(name=JOB_NAME)
+            rows = list(
+                HostelView.objects.filter(pk__gt=state.watermark).order_by('pk')
+                .values_list('pk', 'hostel_id', 'user_id', 'ip_address', 'user_agent', 'timestamp')[:chunk_size]
+            )
+            if not rows:
+                return read, counted
+            views = [row[1:] for row in rows]
+            counts = count_pairs(views, context_views(views, state.watermark))
+            apply(counts)
+
+            state.watermark = rows[-1][0]
+            state.save(update_fields=['watermark', 'updated_at'])
+        read += len(rows)
+        counted += sum(counts.values())
+
+
+def reset():
+    """Forget every count so the next ``update`` recomputes from the first view"""
+    with transaction.atomic():
+        CoView.objects.all().delete()
+        JobState.objects.filter(name=JOB_NAME).delete()
@@ -0,0 +1,162 @@
+"""
+Buffered writes for high-volume event tables.
+
+Events are collected in memory and inserted with one bulk_create() when
+the buffer reaches ``EVENT_BUFFER_SIZE`` events or its oldest event is
+``EVENT_BUFFER_MAX_AGE`` seconds old, whichever comes first. Each process
+has its own buffer; pending events are flushed at interpreter exit, and
+are lost if the process is killed, which is acceptable for analytics
+events. Set ``EVENT_BUFFER_SIZE = 1`` to write every event immediately.
+
+Events of hostels deleted while they were queued are left out (and links
+to deleted users cleared) before inserting, and a batch that still fails
+is retried row by row in savepoints, so one bad event cannot drop the
+rest.
+
+A buffer with a ``counter`` also adds its events to that Hostel counter
+column in the same transaction, one UPDATE per distinct increment, and
+one with a ``trend_weight`` adds its events to the hostels' trending
+scores (hostels.trending).
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+from . import trending
+from .models import ContactReveal, Hostel, HostelView, User
+from .throttling import forwarded_ip
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """Collect unsaved ``model`` instances and insert them in batches"""
+
+    def __init__(self, model, counter=None, trend_weight=None):
+        self.model = model
+        self.counter = counter
+        self.trend_weight = trend_weight
+        self.lock = threading.Lock()
+        self.pending = []
+        self.timer = None
+
+    def add(self, **fields):
+        event = self.model(**fields)
+        with self.lock:
+            self.pending.append(event)
+            full = len(self.pending) >= settings.EVENT_BUFFER_SIZE
+            if not full and self.timer is None:
+                # Flush a quiet buffer after max age instead of waiting for the next event
+                self.timer = threading.Timer(settings.EVENT_BUFFER_MAX_AGE, self.flush_in_background)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+        return event
+
+    def flush(self):
+        """Insert every pending event; return how many were written"""
+        with self.lock:
+            events, self.pending = self.pending, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not events:
+            return 0
+        try:
+            with transaction.atomic():
+                events = self.drop_orphans(events)
+                events = self.insert(events)
+                if self.counter:
+                    self.increment_counters(events)
+                if self.trend_weight:
+                    trending.add_events(events, self.trend_weight)
+        except DatabaseError:
+            logger.exception('Dropped %d %s events', len(events), self.model._meta.label)
+            return 0
+        return len(events)
+
+    def drop_orphans(self, events):
+        """Leave out events of hostels deleted since they were queued, and unlink deleted users.
+
+        Foreign keys are only checked at commit, too late to skip one row.
+        """
+        hostel_ids = {event.hostel_id for event in events}
+        existing = set(Hostel.objects.filter(pk__in=hostel_ids).values_list('pk', flat=True))
+        kept = [event for event in events if event.hostel_id in existing]
+        if len(kept) < len(events):
+            logger.warning(
+                'Dropped %d %s events of deleted hostels', len(events) - len(kept), self.model._meta.label,
+            )
+
+        user_ids = {event.user_id for event in kept if event.user_id}
+        if user_ids:
+            users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+            for event in kept:
+                if event.user_id and event.user_id not in users:
+                    # As on_delete=SET_NULL would have done
+                    event.user = None
+        return kept
+
+    def insert(self, events):
+        """Insert ``events``; if the batch fails, insert them one by one and return those written"""
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(events, batch_size=500)
+            return events
+        except DatabaseError:
+            logger.warning('Batch insert of %d %s events failed, retrying one by one', len(events), self.model._meta.label)
+
+        written = []
+        for event in events:
+            try:
+                with transaction.atomic():
+                    event.save(force_insert=True)
+                written.append(event)
+            except DatabaseError:
+                logger.exception('Dropped %s event for hostel %s', self.model._meta.label, event.hostel_id)
+        return written
+
+    def increment_counters(self, events):
+        by_increment = defaultdict(list)
+        for hostel_id, count in Counter(event.hostel_id for event in events).items():
+            by_increment[count].append(hostel_id)
+        for count, hostel_ids in by_increment.items():
+            Hostel.objects.filter(pk__in=hostel_ids).update(**{self.counter: F(self.counter) + count})
+
+    def flush_in_background(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own connection
+            connection.close()
+
+
+contact_reveals = EventBuffer(
+    ContactReveal, counter='total_contact_reveals', trend_weight=trending.REVEAL_WEIGHT,
+)
+hostel_views = EventBuffer(HostelView, counter='total_views', trend_weight=trending.VIEW_WEIGHT)
+
+BUFFERS = [contact_reveals, hostel_views]
+
+
+def record_hostel_view(request, hostel_id):
+    """Queue a HostelView of ``hostel_id`` by the visitor making ``request``"""
+    return hostel_views.add(
+        hostel_id=hostel_id,
+        user=request.user if request.user.is_authenticated else None,
+        ip_address=forwarded_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+    )
+
+
+def flush_all():
+    return sum(buffer.flush() for buffer in BUFFERS)
+
+
+atexit.register(flush_all)
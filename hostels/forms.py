@@ -178,29 +178,44 @@ class HostelForm(forms.ModelForm):
         )
 
     def save(self, commit=True):
+        adding = self.instance._state.adding
+        self.locate()
         hostel = super().save(commit)
 
         if commit:
-            # Handle facilities
-            selected_facilities = self.cleaned_data.get('facilities', [])
-            new_facility_name = self.cleaned_data.get('new_facility')
-
-            # Clear existing facilities
-            hostel.hostel_facilities.all().delete()
-
-            # Add selected facilities
-            for facility in selected_facilities:
-                HostelFacility.objects.create(hostel=hostel, facility=facility)
-
-            # Add new facility if provided
-            if new_facility_name:
-                new_facility, created = Facility.objects.get_or_create(
-                    name=new_facility_name.strip()
-                )
-                HostelFacility.objects.get_or_create(hostel=hostel, facility=new_facility)
+            self.save_facilities(hostel, adding)
 
         return hostel
 
+    def locate(self):
+        """Fill in coordinates from the offline gazetteer for new or changed addresses"""
+        from .geocoding import geocode_hostel
+
+        hostel = self.instance
+        if hostel.latitude is not None and not {'address', 'nearby_landmark'} & set(self.changed_data):
+            return
+        place = geocode_hostel(hostel.address, hostel.nearby_landmark)
+        if place is not None:
+            hostel.latitude, hostel.longitude = place.latitude, place.longitude
+
+    def save_facilities(self, hostel, adding=False):
+        """Apply the facility selection as a diff: one DELETE and one bulk INSERT at most"""
+        selected = {facility.pk for facility in self.cleaned_data.get('facilities') or []}
+
+        # Add new facility if provided
+        new_facility_name = (self.cleaned_data.get('new_facility') or '').strip()
+        if new_facility_name:
+            new_facility, created = Facility.objects.get_or_create(name=new_facility_name)
+            selected.add(new_facility.pk)
+
+        current = set() if adding else set(hostel.hostel_facilities.values_list('facility_id', flat=True))
+        removed = current - selected
+        if removed:
+            hostel.hostel_facilities.filter(facility_id__in=removed).delete()
+        HostelFacility.objects.bulk_create(
+            [HostelFacility(hostel=hostel, facility_id=facility_id) for facility_id in selected - current]
+        )
+
 
 class HostelImageForm(forms.ModelForm):
     """Form for uploading hostel images"""
@@ -0,0 +1,132 @@
+"""
+Offline geocoding against a local gazetteer.
+
+The gazetteer is a CSV of cities, areas and landmarks with coordinates
+(``GEOCODER_GAZETTEER``, hostels/data/gazetteer.csv by default; columns
+``name, kind, city, latitude, longitude, aliases`` with ``;``-separated
+aliases). Addresses and names are reduced to slug tokens, and an address
+matches every gazetteer name whose tokens appear in it as a contiguous
+run. The most specific match wins: a landmark over an area over a city,
+then the longest name, restricted to the city the address mentions.
+
+Results are memoized per normalized address, so repeated lookups of the
+same area cost a dict hit.
+"""
+import csv
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.text import slugify
+
+KIND_RANK = {'landmark': 3, 'area': 2, 'city': 1}
+
+# Words that never distinguish one place from another
+STOPWORDS = {'near', 'opposite', 'behind', 'the', 'of', 'and', 'e', 'i', 'house', 'plot', 'street', 'no'}
+
+CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    kind: str
+    city: str
+    latitude: Decimal
+    longitude: Decimal
+
+    @property
+    def formatted_address(self):
+        if self.kind == 'city' or not self.city:
+            return self.name
+        return f'{self.name}, {self.city}'
+
+
+def tokenize(text):
+    return tuple(token for token in slugify(text or '').split('-') if token and token not in STOPWORDS)
+
+
+class Gazetteer:
+    """In-memory token index over the gazetteer entries"""
+
+    def __init__(self, places):
+        # first token -> [(name tokens, place)]
+        self.index = {}
+        for place, names in places:
+            for name in names:
+                tokens = tokenize(name)
+                if tokens:
+                    self.index.setdefault(tokens[0], []).append((tokens, place))
+
+    @classmethod
+    def from_csv(cls, path):
+        places = []
+        with open(path, encoding='utf-8', newline='') as stream:
+            for row in csv.DictReader(stream):
+                place = Place(
+                    name=row['name'].strip(),
+                    kind=row['kind'].strip(),
+                    city=row['city'].strip(),
+                    latitude=Decimal(row['latitude']).quantize(Decimal('0.000001')),
+                    longitude=Decimal(row['longitude']).quantize(Decimal('0.000001')),
+                )
+                aliases = [alias for alias in (row.get('aliases') or '').split(';') if alias.strip()]
+                places.append((place, [place.name, *aliases]))
+        return cls(places)
+
+    def matches(self, tokens):
+        """Every place whose name occurs in ``tokens`` as a contiguous run"""
+        found = []
+        for start, token in enumerate(tokens):
+            for name_tokens, place in self.index.get(token, ()):
+                if tokens[start:start + len(name_tokens)] == name_tokens:
+                    found.append((len(name_tokens), place))
+        return found
+
+    def lookup(self, tokens):
+        found = self.matches(tokens)
+        if not found:
+            return None
+
+        cities = {place.city for _, place in found if place.kind == 'city'}
+        if cities:
+            # Drop same-named places elsewhere ("COMSATS" in Lahore vs Islamabad)
+            found = [(length, place) for length, place in found if place.city in cities] or found
+        else:
+            # No city in the address: prefer the gazetteer's default city on ties
+            default = settings.GEOCODER_DEFAULT_CITY
+            found.sort(key=lambda match: match[1].city == default, reverse=True)
+
+        return max(found, key=lambda match: (KIND_RANK.get(match[1].kind, 0), match[0]))[1]
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer():
+    return Gazetteer.from_csv(settings.GEOCODER_GAZETTEER)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def lookup_tokens(tokens):
+    return get_gazetteer().lookup(tokens)
+
+
+def geocode(address):
+    """Return the best matching Place for a free-text address, or None"""
+    tokens = tokenize(address)
+    return lookup_tokens(tokens) if tokens else None
+
+
+def geocode_hostel(address, landmark=''):
+    """Locate a hostel from its address, falling back to its nearby landmark.
+
+    The address decides when it names an area or landmark; a landmark
+    a hostel is merely "near" is only used when the address gives no
+    more than a city.
+    """
+    place = geocode(address)
+    if landmark and (place is None or place.kind == 'city'):
+        near = geocode(f'{landmark}, {place.city}' if place else landmark)
+        if near is not None and near.kind != 'city':
+            return near
+    return place
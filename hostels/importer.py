@@ -0,0 +1,322 @@
+"""
+Bulk hostel import from CSV or NDJSON.
+
+Rows are streamed from the file, validated with the same field rules as
+the owner-facing HostelForm and RoomTypeForm, and inserted chunk by chunk
+with bulk_create(). A chunk that fails at the database level is retried
+row by row in savepoints, so one bad row is reported instead of aborting
+the import.
+
+Columns (CSV header or NDJSON keys):
+
+- ``owner``: username of an existing hostel owner (optional when the
+  importer is given a default owner)
+- every HostelForm field: ``name``, ``address``, ``description``,
+  ``contact_email``, ``contact_phone``, ``whatsapp_number``,
+  ``google_location_link``, ``nearby_landmark``, ``landmark_distance``,
+  ``gender_type``, plus ``latitude`` and ``longitude`` (looked up in the
+  offline gazetteer when left empty)
+- ``facilities``: facility names, ``;``-separated in CSV or a list in NDJSON
+- ``rooms``: ``type:price:available_rooms`` entries, ``;``-separated in
+  CSV, or a list of objects with RoomTypeForm fields in NDJSON
+
+Files uploaded from the admin pages are checked by ImportUploadForm and
+imported by a BulkActionJob (hostels.bulk_actions), which records the
+report and the last line imported after every chunk, in the chunk's own
+transaction, so a restarted import resumes after that line.
+"""
+import csv
+import io
+import json
+from dataclasses import asdict, dataclass, field
+
+from django import forms
+from django.db import DatabaseError, transaction
+
+from .forms import HostelForm, RoomTypeForm
+from . import landmarks, page_cache
+from .geocoding import geocode_hostel
+from .localities import sync_localities
+from .map_clusters import refresh_after_commit
+from .saved_searches import match_after_commit
+from .models import Facility, Hostel, HostelFacility, RoomType, User
+from .slugs import assign_unique_slugs
+
+FORMATS = ('csv', 'ndjson')
+
+
+class HostelImportForm(forms.ModelForm):
+    """HostelForm field rules without the per-form facility queries and layout"""
+
+    class Meta:
+        model = Hostel
+        fields = HostelForm.Meta.fields + ('latitude', 'longitude')
+
+
+class RoomImportForm(forms.ModelForm):
+    class Meta:
+        model = RoomType
+        fields = RoomTypeForm.Meta.fields
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    valid: int = 0
+    created: int = 0
+    rooms: int = 0
+    facilities: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+    def as_dict(self):
+        return asdict(self)
+
+
+def detect_format(filename):
+    return 'ndjson' if filename.lower().endswith(('.ndjson', '.jsonl', '.json')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row)`` pairs without loading the whole file"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError('expected a JSON object')
+
+
+def count_rows(stream, fmt):
+    """Number of rows in a file; raises UnicodeDecodeError or csv.Error if it cannot be read"""
+    return sum(1 for _ in read_rows(stream, fmt))
+
+
+class ImportUploadForm(forms.Form):
+    """An import file and its options, checked to be readable before it is queued"""
+    file = forms.FileField()
+    owner = forms.CharField(required=False, help_text='Username of the owner for rows without an "owner" column')
+    format = forms.ChoiceField(choices=[('', 'Detect from file name')] + [(fmt, fmt.upper()) for fmt in FORMATS],
+                               required=False)
+    verified = forms.BooleanField(required=False)
+    dry_run = forms.BooleanField(required=False)
+
+    def clean_owner(self):
+        username = self.cleaned_data['owner'].strip()
+        if not username:
+            return None
+        owner = User.objects.filter(username=username, role='owner').first()
+        if owner is None:
+            raise forms.ValidationError(f'No hostel owner named "{username}".')
+        return owner
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload is None:
+            return cleaned_data
+        fmt = cleaned_data['format'] = cleaned_data.get('format') or detect_format(upload.name)
+
+        # Read through once, so the job only gets files it can decode and parse
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            cleaned_data['rows'] = count_rows(stream, fmt)
+        except UnicodeDecodeError:
+            self.add_error('file', 'The file is not UTF-8 text. Save it as UTF-8 (CSV UTF-8 in Excel) and try again.')
+        except csv.Error as exc:
+            self.add_error('file', f'The CSV file cannot be read: {exc}')
+        finally:
+            stream.detach()
+            upload.seek(0)
+        return cleaned_data
+
+
+class HostelImporter:
+    """Validate and insert hostel rows in chunks of ``chunk_size``"""
+
+    def __init__(self, owner=None, chunk_size=500, verified=False, dry_run=False, report=None):
+        self.default_owner = owner
+        self.chunk_size = chunk_size
+        self.verified = verified
+        self.dry_run = dry_run
+        self.report = report or ImportReport()
+        self.facility_ids = {name.lower(): pk for name, pk in Facility.objects.values_list('name', 'pk')}
+
+    def run(self, stream, fmt, start_after=0, progress=None):
+        """Import the rows after line ``start_after``.
+
+        ``progress(line_number)`` is called after every chunk, in the
+        chunk's transaction, with the last line it read.
+        """
+        chunk = []
+        for line_number, row in read_rows(stream, fmt):
+            if line_number <= start_after:
+                continue
+            chunk.append((line_number, row))
+            if len(chunk) >= self.chunk_size:
+                self.run_chunk(chunk, progress)
+                chunk = []
+        if chunk:
+            self.run_chunk(chunk, progress)
+        return self.report
+
+    def run_chunk(self, rows, progress):
+        with transaction.atomic():
+            self.report.rows += len(rows)
+            readable = []
+            for line_number, row in rows:
+                if isinstance(row, Exception):
+                    self.report.add_error(line_number, f'Unreadable row: {row}')
+                else:
+                    readable.append((line_number, row))
+            if readable:
+                self.import_chunk(readable)
+            if progress is not None:
+                progress(rows[-1][0])
+
+    # Validation
+    def import_chunk(self, rows):
+        owners = self.load_owners(rows)
+        records = []
+        for line_number, row in rows:
+            record = self.build(row, owners)
+            if isinstance(record, str):
+                self.report.add_error(line_number, record)
+            else:
+                records.append((line_number, record))
+
+        self.report.valid += len(records)
+        if not records or self.dry_run:
+            return
+
+        try:
+            with transaction.atomic():
+                self.insert([record for _, record in records])
+        except DatabaseError:
+            # Find the offending rows; every other row still goes in
+            for line_number, record in records:
+                self.reset(record)
+                try:
+                    with transaction.atomic():
+                        self.insert([record])
+                except DatabaseError as exc:
+                    self.report.add_error(line_number, f'Database error: {exc}')
+
+    def load_owners(self, rows):
+        usernames = {str(row.get('owner') or '').strip() for _, row in rows} - {''}
+        return {
+            user.username: user
+            for user in User.objects.filter(username__in=usernames, role='owner')
+        }
+
+    def build(self, row, owners):
+        """Return ``(hostel, rooms, facility_ids)`` for a valid row or an error message"""
+        row = {key.strip(): value for key, value in row.items() if key}
+
+        username = str(row.get('owner') or '').strip()
+        owner = owners.get(username) if username else self.default_owner
+        if owner is None:
+            return f'Unknown hostel owner "{username}"' if username else 'No owner given'
+
+        if not row.get('gender_type'):
+            row['gender_type'] = Hostel._meta.get_field('gender_type').default
+
+        hostel_form = HostelImportForm(data=row)
+        if not hostel_form.is_valid():
+            return self.form_errors(hostel_form)
+        hostel = hostel_form.save(commit=False)
+        hostel.owner = owner
+        hostel.is_verified = self.verified
+        if hostel.latitude is None or hostel.longitude is None:
+            place = geocode_hostel(hostel.address, hostel.nearby_landmark)
+            if place is not None:
+                hostel.latitude, hostel.longitude = place.latitude, place.longitude
+
+        rooms = []
+        for index, room_data in enumerate(self.parse_rooms(row.get('rooms')), start=1):
+            room_form = RoomImportForm(data=room_data)
+            if not room_form.is_valid():
+                return f'Room {index}: {self.form_errors(room_form)}'
+            room = room_form.save(commit=False)
+            room.hostel = hostel
+            rooms.append(room)
+        room_types = [room.type for room in rooms]
+        if len(set(room_types)) != len(room_types):
+            return 'Each room type may only be listed once'
+
+        facility_ids = set()
+        for name in self.parse_list(row.get('facilities')):
+            facility_ids.add(self.get_facility_id(name))
+        return hostel, rooms, facility_ids
+
+    @staticmethod
+    def form_errors(form):
+        return '; '.join(
+            f'{name}: {" ".join(errors)}' if name != '__all__' else ' '.join(errors)
+            for name, errors in form.errors.items()
+        )
+
+    @staticmethod
+    def parse_list(value):
+        if isinstance(value, list):
+            return [str(item).strip() for item in value if str(item).strip()]
+        return [item.strip() for item in str(value or '').split(';') if item.strip()]
+
+    def parse_rooms(self, value):
+        if isinstance(value, list):
+            return [room if isinstance(room, dict) else {} for room in value]
+        rooms = []
+        for entry in self.parse_list(value):
+            room_type, _, rest = entry.partition(':')
+            price, _, available = rest.partition(':')
+            rooms.append({'type': room_type, 'price': price, 'available_rooms': available or 1})
+        return rooms
+
+    def get_facility_id(self, name):
+        key = name.lower()
+        if key not in self.facility_ids:
+            facility = Facility.objects.filter(name__iexact=name).first() or Facility.objects.create(name=name)
+            self.facility_ids[key] = facility.pk
+        return self.facility_ids[key]
+
+    # Insertion
+    def insert(self, records):
+        hostels = [hostel for hostel, _, _ in records]
+        assign_unique_slugs(hostels)
+        Hostel.objects.bulk_create(hostels)
+        rooms = RoomType.objects.bulk_create([room for _, hostel_rooms, _ in records for room in hostel_rooms])
+        links = HostelFacility.objects.bulk_create([
+            HostelFacility(hostel=hostel, facility_id=facility_id)
+            for hostel, _, facility_ids in records
+            for facility_id in facility_ids
+        ])
+        sync_localities(hostels)
+        refresh_after_commit((hostel.latitude, hostel.longitude) for hostel in hostels)
+        landmarks.refresh_after_commit(hostel_ids=[hostel.pk for hostel in hostels if hostel.latitude is not None])
+        if self.verified:
+            match_after_commit([hostel.pk for hostel in hostels])
+            # New hostels have no cached pages of their own yet, only the listings to expire
+            page_cache.invalidate_after_commit()
+        self.report.created += len(hostels)
+        self.report.rooms += len(rooms)
+        self.report.facilities += len(links)
+
+    @staticmethod
+    def reset(record):
+        """Drop the slug and room ids a rolled-back insert left on the objects"""
+        hostel, rooms, _ = record
+        hostel.slug = ''
+        for room in rooms:
+            room.pk = None
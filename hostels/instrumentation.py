@@ -0,0 +1,182 @@
+"""
+Lightweight instrumentation helpers for measuring SQL and template rendering.
+
+Both helpers are plain context managers so they can wrap a single request
+(test client, middleware) without touching global DEBUG settings.
+"""
+import contextvars
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.template.backends.django import Template as DjangoTemplate
+
+
+class QueryRecorder:
+    """Record every SQL statement executed on a connection with its duration.
+
+    With ``capture_stack=True`` each query also records the innermost
+    project source line and template line that triggered it.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, capture_stack=False):
+        self.connection = connections[using]
+        self.capture_stack = capture_stack
+        self.queries = []
+        self._wrapper = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            query = {
+                'sql': sql,
+                'time': time.perf_counter() - start,
+            }
+            if self.capture_stack:
+                query['site'], query['template'] = call_site()
+            self.queries.append(query)
+
+    def __enter__(self):
+        self._wrapper = self.connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        self._wrapper = None
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        """Total time spent in the database, in seconds"""
+        return sum(query['time'] for query in self.queries)
+
+    def duplicates(self, threshold=2):
+        """Query shapes executed at least ``threshold`` times, most repeated first"""
+        shapes = Counter(normalize_sql(query['sql']) for query in self.queries)
+        return [(sql, count) for sql, count in shapes.most_common() if count >= threshold]
+
+
+_PROJECT_ROOT = str(settings.BASE_DIR)
+_THIS_FILE = __file__
+
+
+def call_site():
+    """Return ``(source_line, template_line)`` for the code running a query.
+
+    ``source_line`` is the innermost frame in project code (outside Django
+    and third-party packages), e.g. ``hostels/models.py:95``, and is None
+    when the query comes straight from a template tag or variable lookup.
+    ``template_line`` is the innermost template node being rendered, e.g.
+    ``hostels/home.html:42``, or None outside templates.
+    """
+    site = template = None
+    frame = sys._getframe(1)
+    while frame is not None and template is None:
+        filename = frame.f_code.co_filename
+        if (site is None and filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE
+                and 'site-packages' not in filename):
+            site = f'{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_lineno}'
+        if frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        frame = frame.f_back
+    if site is None and template is None:
+        return None, None
+    return site, template
+
+
+_active_render_timers = contextvars.ContextVar('active_render_timers', default=())
+_render_depth = contextvars.ContextVar('render_depth', default=0)
+_original_render = None
+
+
+def _install_render_hook():
+    """Wrap the Django template backend once so RenderTimer can observe it"""
+    global _original_render
+    if _original_render is not None:
+        return
+
+    _original_render = DjangoTemplate.render
+
+    def render(self, context=None, request=None):
+        timers = _active_render_timers.get()
+        if not timers or _render_depth.get():
+            # Nested renders (includes, render_to_string in tags) are already
+            # covered by the outermost render.
+            return _original_render(self, context, request)
+
+        token = _render_depth.set(1)
+        start = time.perf_counter()
+        try:
+            return _original_render(self, context, request)
+        finally:
+            elapsed = time.perf_counter() - start
+            _render_depth.reset(token)
+            for timer in timers:
+                timer.total_time += elapsed
+                timer.templates.append(self.template.name)
+
+    DjangoTemplate.render = render
+
+
+class RenderTimer:
+    """Measure wall time spent rendering Django templates.
+
+    Timers can be nested; every active timer sees each render. Queries
+    triggered lazily from inside templates are included in the render time
+    as well as in any surrounding QueryRecorder.
+    """
+
+    def __init__(self):
+        self.total_time = 0.0
+        self.templates = []
+        self._token = None
+
+    def __enter__(self):
+        _install_render_hook()
+        self._token = _active_render_timers.set(_active_render_timers.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_render_timers.reset(self._token)
+        self._token = None
+
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SQL_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SQL_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """Reduce a SQL statement to its shape by stripping literal values.
+
+    Two queries that differ only in their parameters (``WHERE id = 1`` vs
+    ``WHERE id = 2``, or IN lists of different lengths) normalize to the
+    same string.
+    """
+    sql = _SQL_STRING.sub('?', sql)
+    sql = _SQL_NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _SQL_IN_LIST.sub('(...)', sql)
+    return _SQL_WHITESPACE.sub(' ', sql).strip()
+
+
+def percentile(samples, pct):
+    """Nearest-rank ``pct`` percentile of a non-empty list of samples"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
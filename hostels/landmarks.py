@@ -0,0 +1,96 @@
+"""
+Hostel-to-landmark distance matrix.
+
+Great-circle distances from every hostel with coordinates to every
+Landmark are computed with NumPy, a block of hostels at a time, and the
+pairs within ``LANDMARK_DISTANCE_CUTOFF_KM`` are stored in
+HostelLandmarkDistance. Its ``(landmark, distance_km)`` index turns
+"within X km of landmark Y, nearest first" into one index range scan.
+
+Hostel and Landmark saves recompute their own row or column after commit;
+``compute_landmark_distances`` rebuilds the whole table.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import Hostel, HostelLandmarkDistance, Landmark
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(latitudes, longitudes, landmark_latitudes, landmark_longitudes):
+    """Distance matrix in km: one row per point, one column per landmark"""
+    lat1 = np.radians(np.asarray(latitudes, dtype=float))[:, np.newaxis]
+    lng1 = np.radians(np.asarray(longitudes, dtype=float))[:, np.newaxis]
+    lat2 = np.radians(np.asarray(landmark_latitudes, dtype=float))[np.newaxis, :]
+    lng2 = np.radians(np.asarray(landmark_longitudes, dtype=float))[np.newaxis, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def distance_rows(hostels, landmarks, cutoff_km=None):
+    """HostelLandmarkDistance rows for ``(pk, lat, lng)`` hostels and landmarks within the cutoff"""
+    if not hostels or not landmarks:
+        return []
+    cutoff_km = settings.LANDMARK_DISTANCE_CUTOFF_KM if cutoff_km is None else cutoff_km
+    hostel_ids, latitudes, longitudes = zip(*hostels)
+    landmark_ids, landmark_latitudes, landmark_longitudes = zip(*landmarks)
+
+    distances = haversine_km(latitudes, longitudes, landmark_latitudes, landmark_longitudes)
+    rows, columns = np.nonzero(distances <= cutoff_km)
+    return [
+        HostelLandmarkDistance(
+            hostel_id=hostel_ids[row], landmark_id=landmark_ids[column],
+            distance_km=round(float(distances[row, column]), 3),
+        )
+        for row, column in zip(rows.tolist(), columns.tolist())
+    ]
+
+
+def located_hostels():
+    return Hostel.objects.filter(latitude__isnull=False, longitude__isnull=False).order_by('pk')
+
+
+def landmark_points(landmarks=None):
+    landmarks = Landmark.objects.all() if landmarks is None else landmarks
+    return list(landmarks.values_list('pk', 'latitude', 'longitude'))
+
+
+def rebuild(block_size=2000, cutoff_km=None):
+    """Recompute the whole table; return the number of pairs stored"""
+    landmarks = landmark_points()
+    stored = 0
+    with transaction.atomic():
+        HostelLandmarkDistance.objects.all().delete()
+        last_pk = None
+        while True:
+            block = located_hostels() if last_pk is None else located_hostels().filter(pk__gt=last_pk)
+            hostels = list(block.values_list('pk', 'latitude', 'longitude')[:block_size])
+            if not hostels:
+                break
+            last_pk = hostels[-1][0]
+            rows = distance_rows(hostels, landmarks, cutoff_km)
+            HostelLandmarkDistance.objects.bulk_create(rows, batch_size=1000)
+            stored += len(rows)
+    return stored
+
+
+def refresh(hostel_ids=(), landmark_ids=()):
+    """Recompute the rows of the given hostels and the columns of the given landmarks"""
+    with transaction.atomic():
+        if hostel_ids:
+            HostelLandmarkDistance.objects.filter(hostel__in=hostel_ids).delete()
+            hostels = list(located_hostels().filter(pk__in=hostel_ids).values_list('pk', 'latitude', 'longitude'))
+            HostelLandmarkDistance.objects.bulk_create(distance_rows(hostels, landmark_points()), batch_size=1000)
+        if landmark_ids:
+            HostelLandmarkDistance.objects.filter(landmark__in=landmark_ids).delete()
+            landmarks = landmark_points(Landmark.objects.filter(pk__in=landmark_ids))
+            hostels = list(located_hostels().values_list('pk', 'latitude', 'longitude'))
+            HostelLandmarkDistance.objects.bulk_create(distance_rows(hostels, landmarks), batch_size=1000)
+
+
+def refresh_after_commit(hostel_ids=(), landmark_ids=()):
+    hostel_ids, landmark_ids = list(hostel_ids), list(landmark_ids)
+    transaction.on_commit(lambda: refresh(hostel_ids, landmark_ids))
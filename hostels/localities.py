@@ -0,0 +1,150 @@
+"""
+Locality index: cities, areas and landmarks extracted from hostel addresses.
+
+Addresses are free text ("House 12, Block C, Johar Town, Lahore"), so the
+same area shows up under many spellings and positions. At save time each
+hostel is linked to normalized Locality rows (city, area, landmark), and
+every Locality keeps a count of its listed hostels, so "popular locations"
+is an indexed top-N read instead of a GROUP BY over raw addresses.
+
+Counts are refreshed for the affected localities whenever hostels are
+linked, unlinked or change status through save(); ``rebuild_localities``
+re-links and recounts everything for paths that bypass save().
+"""
+import re
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from .models import Hostel, HostelLocality, Locality
+
+KNOWN_CITIES = [
+    'Lahore', 'Karachi', 'Islamabad', 'Rawalpindi', 'Faisalabad', 'Multan', 'Peshawar', 'Quetta',
+    'Sialkot', 'Gujranwala', 'Hyderabad', 'Bahawalpur', 'Sargodha', 'Abbottabad', 'Sukkur',
+]
+CITY_KEYS = {slugify(city): city for city in KNOWN_CITIES}
+
+# Address parts that name a plot or street rather than an area
+STREET_PART = re.compile(
+    r'^(\d|(house|plot|flat|apartment|building|street|st|lane|block|sector|near)\b)'
+    r'|\b(road|rd|street|lane|boulevard|avenue)$',
+    re.IGNORECASE,
+)
+NEAR_PREFIX = re.compile(r'^near\s+', re.IGNORECASE)
+
+
+def clean_name(value):
+    return ' '.join(value.split()).strip(' .-')
+
+
+def extract_localities(address, landmark=''):
+    """Return the ``(kind, name, city)`` localities an address and landmark belong to"""
+    parts = [clean_name(part) for part in (address or '').split(',')]
+    parts = [part for part in parts if part]
+
+    city = ''
+    for part in reversed(parts):
+        if slugify(part) in CITY_KEYS:
+            city = CITY_KEYS[slugify(part)]
+            break
+
+    found = []
+    if city:
+        found.append(('city', city, city))
+
+    # The area is the most specific remaining part closest to the city
+    for part in reversed(parts):
+        if slugify(part) in CITY_KEYS or STREET_PART.search(part):
+            continue
+        found.append(('area', part, city))
+        break
+
+    landmarks = [clean_name(landmark or '')]
+    landmarks += [NEAR_PREFIX.sub('', part) for part in parts if NEAR_PREFIX.match(part)]
+    for name in landmarks:
+        if name:
+            found.append(('landmark', name, city))
+            break
+    return found
+
+
+def locality_ids(hostels):
+    """Map each hostel pk to the ids of its localities, creating missing ones in bulk"""
+    wanted = {hostel.pk: extract_localities(hostel.address, hostel.nearby_landmark) for hostel in hostels}
+    names = {}
+    for found in wanted.values():
+        for kind, name, city in found:
+            key = slugify(name)[:200]
+            if key:
+                names.setdefault((kind, key), (name, city))
+
+    existing = {}
+    if names:
+        keys = {key for _, key in names}
+        for pk, kind, key in Locality.objects.filter(key__in=keys).values_list('pk', 'kind', 'key'):
+            existing[(kind, key)] = pk
+        missing = [
+            Locality(kind=kind, key=key, name=name[:200], city=city[:100])
+            for (kind, key), (name, city) in names.items()
+            if (kind, key) not in existing
+        ]
+        if missing:
+            Locality.objects.bulk_create(missing, ignore_conflicts=True)
+            for pk, kind, key in Locality.objects.filter(key__in=keys).values_list('pk', 'kind', 'key'):
+                existing[(kind, key)] = pk
+
+    return {
+        hostel_pk: {existing[(kind, slugify(name)[:200])] for kind, name, _ in found if slugify(name)}
+        for hostel_pk, found in wanted.items()
+    }
+
+
+def sync_localities(hostels):
+    """Re-link hostels to the localities in their address and refresh the affected counts"""
+    hostels = [hostel for hostel in hostels if hostel.pk is not None]
+    if not hostels:
+        return
+    with transaction.atomic():
+        wanted = locality_ids(hostels)
+        current = {}
+        for hostel_id, locality_id in HostelLocality.objects.filter(
+            hostel__in=[hostel.pk for hostel in hostels]
+        ).values_list('hostel_id', 'locality_id'):
+            current.setdefault(hostel_id, set()).add(locality_id)
+
+        removed = [
+            (hostel_pk, locality_id)
+            for hostel_pk, ids in current.items()
+            for locality_id in ids - wanted.get(hostel_pk, set())
+        ]
+        added = [
+            HostelLocality(hostel_id=hostel_pk, locality_id=locality_id)
+            for hostel_pk, ids in wanted.items()
+            for locality_id in ids - current.get(hostel_pk, set())
+        ]
+        for hostel_pk, locality_id in removed:
+            HostelLocality.objects.filter(hostel_id=hostel_pk, locality_id=locality_id).delete()
+        HostelLocality.objects.bulk_create(added, ignore_conflicts=True)
+
+        # Status changes move a hostel in or out of every count it is part of
+        affected = set().union(*wanted.values(), *current.values())
+        refresh_counts(affected)
+
+
+def refresh_counts(locality_ids=None):
+    """Recount listed hostels for the given localities (all when None)"""
+    listed = (
+        HostelLocality.objects.filter(locality=OuterRef('pk'), hostel__in=Hostel.objects.searchable())
+        .order_by().values('locality').annotate(total=Count('pk')).values('total')
+    )
+    localities = Locality.objects.all()
+    if locality_ids is not None:
+        localities = localities.filter(pk__in=locality_ids)
+    return localities.update(hostel_count=Coalesce(Subquery(listed), 0))
+
+
+def top_localities(kind, limit=10):
+    """The ``limit`` localities of a kind with the most listed hostels"""
+    return Locality.objects.filter(kind=kind, hostel_count__gt=0).order_by('-hostel_count', 'name')[:limit]
@@ -0,0 +1,353 @@
+"""
+Benchmark every named route in hostels/urls.py against a large synthetic dataset
+"""
+import json
+import logging
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import NoReverseMatch, reverse
+
+from hostels import events, urls as hostel_urls
+from hostels.instrumentation import QueryRecorder, RenderTimer, percentile
+from hostels.testing import DEFAULT_MAX_REPEATS, QueryShapeGuard
+from hostels.models import User, Hostel, Review, HostelView, FeaturedPlan, FeaturedRequest
+
+# generate_load_data prefix used for the benchmark dataset
+DATASET_PREFIX = 'bench'
+
+# POST-only routes that are safe to replay against the benchmark dataset
+SAFE_POST_ROUTES = {
+    'geocode': {'address': 'Johar Town, Lahore'},
+}
+
+# POST-only routes that write rows; measured in a transaction that is rolled back
+ROLLED_BACK_POST_ROUTES = {
+    'reveal_contact': {},
+}
+
+# Extra request headers (Client META keys) for routes that check them
+ROUTE_HEADERS = {
+    'geocode': {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'},
+}
+
+# Query strings for GET routes that do nothing useful without parameters
+GET_PARAMS = {
+    'search_api': {'q': 'Hostel'},
+    # The generate_load_data areas of Lahore
+    'map_clusters': {'bbox': '74.20,31.40,74.45,31.55', 'zoom': 13},
+    'location_autocomplete': {'q': 'joh'},
+}
+
+# Routes whose access check cannot be inferred from the view's mixins
+ROUTE_PERSONAS = {
+    'owner_dashboard': 'owner',
+    'request_featured': 'owner',
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query count, DB time, render time and latency for every hostels URL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hostels', type=int, default=50000, help='Number of synthetic hostels to seed')
+        parser.add_argument('--reviews', type=int, default=500000, help='Number of synthetic reviews to seed')
+        parser.add_argument('--views', type=int, default=2000000, help='Number of synthetic hostel views to seed')
+        parser.add_argument('--skip-seed', action='store_true', help='Benchmark the data already in the database')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per route')
+        parser.add_argument('--routes', nargs='*', help='Only benchmark these route names')
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic dataset')
+        parser.add_argument('--max-repeats', type=int, default=DEFAULT_MAX_REPEATS,
+                            help='Report query shapes repeated more often than this per request')
+        parser.add_argument('--strict', action='store_true',
+                            help='Exit with an error when any route repeats a query shape (N+1) or fails')
+        parser.add_argument('--cached', action='store_true',
+                            help='Keep the page and search result caches on (warm numbers instead of rendering)')
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            self.seed_dataset(options)
+
+        personas = self.get_personas()
+        fixtures = self.get_fixtures(personas)
+
+        # Error responses are recorded in the results; keep the tracebacks
+        # of failing views out of the console output.
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        setup_test_environment()
+        # Timed requests repeat the warm-up request, so with the caches on
+        # anonymous pages would only measure cache hits
+        caches = override_settings() if options['cached'] else override_settings(
+            PAGE_CACHE_ENABLED=False, SEARCH_CACHE_TIMEOUT=0,
+        )
+        try:
+            with caches:
+                results = self.run_benchmarks(personas, fixtures, options)
+        finally:
+            teardown_test_environment()
+            request_logger.setLevel(previous_level)
+
+        report = {
+            'meta': {
+                'commit': self.get_commit(),
+                'timestamp': datetime.now().isoformat(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'cached': options['cached'],
+                'dataset': {
+                    'hostels': Hostel.objects.count(),
+                    'reviews': Review.objects.count(),
+                    'views': HostelView.objects.count(),
+                },
+            },
+            'routes': results,
+        }
+
+        with open(options['output'], 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Benchmarked {len(results)} routes, results written to {options['output']}")
+        )
+
+        problems = []
+        failed = sorted(name for name, result in results.items() if result.get('failed'))
+        if failed:
+            problems.append(f"Non-2xx responses in {len(failed)} routes: {', '.join(failed)}")
+        offenders = sorted(name for name, result in results.items() if result.get('repeated_queries'))
+        if offenders:
+            problems.append(f"Repeated query shapes (N+1) in {len(offenders)} routes: {', '.join(offenders)}")
+        if problems and options['strict']:
+            raise CommandError('\n'.join(problems))
+        for message in problems:
+            self.stdout.write(self.style.WARNING(message))
+
+    # Dataset
+    def seed_dataset(self, options):
+        if User.objects.filter(username__startswith=f'{DATASET_PREFIX}_owner_').exists():
+            self.stdout.write('Benchmark dataset already present, reusing it.')
+            return
+
+        self.stdout.write('Seeding benchmark dataset...')
+        call_command(
+            'generate_load_data',
+            prefix=DATASET_PREFIX,
+            hostels=options['hostels'],
+            reviews=options['reviews'],
+            views=options['views'],
+            favorites=options['reviews'] // 2,
+            reveals=options['views'] // 10,
+            students=max(1000, options['reviews'] // 50),
+            seed=options['seed'],
+            derive=True,
+            stdout=self.stdout,
+        )
+
+    # Personas and URL fixtures
+    def get_persona(self, role):
+        user, _ = User.objects.get_or_create(
+            username=f'benchmark_{role}',
+            defaults={
+                'email': f'benchmark_{role}@example.com',
+                'role': role,
+                'is_staff': role == 'admin',
+                'is_superuser': role == 'admin',
+            }
+        )
+        return user
+
+    def get_personas(self):
+        personas = {role: self.get_persona(role) for role in ('admin', 'student')}
+        # Benchmark the owner dashboard against a realistic portfolio
+        personas['owner'] = (
+            User.objects.filter(username__startswith=f'{DATASET_PREFIX}_owner_').order_by('id').first()
+            or self.get_persona('owner')
+        )
+        return personas
+
+    def get_fixtures(self, personas):
+        owner = personas['owner']
+        hostel = owner.hostels.filter(is_active=True, is_verified=True).first()
+        if hostel is None:
+            hostel = Hostel.objects.create(
+                owner=owner,
+                name='Benchmark Probe Hostel',
+                slug=f'{DATASET_PREFIX}-probe-hostel',
+                address='Johar Town, Lahore',
+                description='Probe hostel for URL benchmarks',
+                contact_email='probe@example.com',
+                contact_phone='+923001234567',
+                is_verified=True,
+            )
+
+        plan = FeaturedPlan.objects.first()
+        if plan is None:
+            call_command('create_featured_plans', stdout=StringIO())
+            plan = FeaturedPlan.objects.first()
+
+        featured_request = FeaturedRequest.objects.filter(hostel=hostel).first()
+        if featured_request is None:
+            featured_request = FeaturedRequest.objects.create(
+                hostel=hostel, plan=plan, owner=owner,
+                contact_name='Benchmark Owner', contact_phone='+923001234567',
+                contact_email='probe@example.com',
+            )
+
+        return {
+            'slug': hostel.slug,
+            'uidb64': 'MQ',
+            'token': 'set-password',
+            'pk': {
+                'admin_featured_request_detail': featured_request.pk,
+                'edit_featured_plan': plan.pk,
+            },
+        }
+
+    def get_route_kwargs(self, name, pattern, fixtures):
+        kwargs = {}
+        for key in pattern.pattern.converters:
+            value = fixtures.get(key)
+            if isinstance(value, dict):
+                value = value.get(name)
+            if value is None:
+                return None
+            kwargs[key] = value
+        return kwargs
+
+    def get_route_persona(self, name, view_class):
+        if name in ROUTE_PERSONAS:
+            return ROUTE_PERSONAS[name]
+        mixins = {klass.__name__ for klass in view_class.__mro__}
+        if 'AdminRequiredMixin' in mixins:
+            return 'admin'
+        if 'OwnerRequiredMixin' in mixins:
+            return 'owner'
+        if 'LoginRequiredMixin' in mixins:
+            return 'student'
+        return 'anonymous'
+
+    # Benchmark loop
+    def run_benchmarks(self, personas, fixtures, options):
+        results = {}
+        for pattern in hostel_urls.urlpatterns:
+            name = pattern.name
+            if not name or (options['routes'] and name not in options['routes']):
+                continue
+
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if view_class is None:
+                results[name] = {'skipped': 'not a class-based view'}
+                continue
+
+            if hasattr(view_class, 'get') and 'get' in view_class.http_method_names:
+                method, data = 'get', GET_PARAMS.get(name)
+            elif name in SAFE_POST_ROUTES or name in ROLLED_BACK_POST_ROUTES:
+                method, data = 'post', SAFE_POST_ROUTES.get(name, ROLLED_BACK_POST_ROUTES.get(name))
+            else:
+                results[name] = {'skipped': 'mutating POST-only route'}
+                continue
+
+            kwargs = self.get_route_kwargs(name, pattern, fixtures)
+            if kwargs is None:
+                results[name] = {'skipped': 'no fixture for URL arguments'}
+                continue
+            try:
+                url = reverse(f'hostels:{name}', kwargs=kwargs)
+            except NoReverseMatch:
+                results[name] = {'skipped': 'URL cannot be reversed'}
+                continue
+
+            persona = self.get_route_persona(name, view_class)
+            client = Client(raise_request_exception=False)
+            if persona != 'anonymous':
+                client.force_login(personas[persona])
+
+            headers = ROUTE_HEADERS.get(name, {})
+            if name in ROLLED_BACK_POST_ROUTES:
+                result = self.measure_rolled_back(client, method, url, data, headers, options)
+            else:
+                result = self.measure(client, method, url, data, headers, options)
+            if not 200 <= result['status'] < 300:
+                # A rejected request only times the rejection; keep it out of the results
+                results[name] = {'failed': f"HTTP {result['status']}", 'status': result['status'], 'url': url}
+                self.stdout.write(self.style.WARNING(f"{name:32} {result['status']} not measured"))
+                continue
+            results[name] = result
+            results[name].update({'url': url, 'method': method.upper(), 'persona': persona})
+            self.stdout.write(
+                f"{name:32} {results[name]['status']} "
+                f"queries={results[name]['queries']} p50={results[name]['latency_ms']['p50']:.1f}ms "
+                f"p95={results[name]['latency_ms']['p95']:.1f}ms"
+            )
+        return results
+
+    def measure(self, client, method, url, data, headers, options):
+        # Warm-up request so one-off costs (template loading, URL caches)
+        # do not skew the timed samples. It also runs under the N+1 guard.
+        with QueryShapeGuard(options['max_repeats'], raise_errors=False) as guard:
+            response = getattr(client, method)(url, data, **headers)
+        if not 200 <= response.status_code < 300:
+            return {'status': response.status_code}
+        repeated = guard.violations()
+        if repeated:
+            self.stdout.write(self.style.WARNING(guard.format_violations()))
+
+        latencies, db_times, render_times = [], [], []
+        queries = status = None
+        for _ in range(max(options['iterations'], 1)):
+            with QueryRecorder() as recorder, RenderTimer() as renderer:
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data, **headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+            db_times.append(recorder.total_time * 1000)
+            render_times.append(renderer.total_time * 1000)
+            queries = recorder.count
+            status = response.status_code
+
+        return {
+            'status': status,
+            'queries': queries,
+            'db_time_ms': round(statistics.median(db_times), 3),
+            'render_time_ms': round(statistics.median(render_times), 3),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'max': round(max(latencies), 3),
+            },
+            'repeated_queries': [
+                {'sql': group['sql'], 'site': group['site'], 'templates': group['templates'], 'count': group['count']}
+                for group in repeated
+            ],
+        }
+
+    def measure_rolled_back(self, client, method, url, data, headers, options):
+        """``measure()`` in a transaction that is rolled back afterwards.
+
+        Buffered events (hostels.events) are written as they are recorded,
+        so they are rolled back too; events queued before are flushed first.
+        """
+        events.flush_all()
+        with override_settings(EVENT_BUFFER_SIZE=1), transaction.atomic():
+            result = self.measure(client, method, url, data, headers, options)
+            transaction.set_rollback(True)
+        return result
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
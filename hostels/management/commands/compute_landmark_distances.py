@@ -0,0 +1,63 @@
+"""
+Recompute the hostel-to-landmark distance table, optionally loading landmarks from the gazetteer first
+"""
+import csv
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.text import slugify
+
+from hostels import landmarks
+from hostels.models import Landmark
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed hostel-to-landmark distances used by "near landmark" searches (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--import-gazetteer', action='store_true',
+            help='Create or update a Landmark for every landmark entry in the geocoder gazetteer first',
+        )
+        parser.add_argument('--block-size', type=int, default=2000, help='Hostels per distance matrix block')
+        parser.add_argument(
+            '--cutoff', type=float, default=None,
+            help=f'Radius in km to store (default: LANDMARK_DISTANCE_CUTOFF_KM, {settings.LANDMARK_DISTANCE_CUTOFF_KM:g})',
+        )
+
+    def handle(self, *args, **options):
+        if options['import_gazetteer']:
+            imported = self.import_gazetteer(settings.GEOCODER_GAZETTEER)
+            self.stdout.write(f'Imported {imported} landmarks from {settings.GEOCODER_GAZETTEER}')
+
+        started = time.monotonic()
+        stored = landmarks.rebuild(block_size=options['block_size'], cutoff_km=options['cutoff'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {stored} hostel-landmark distances for {Landmark.objects.count()} landmarks '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
+
+    @staticmethod
+    def import_gazetteer(path):
+        rows = []
+        with open(path, encoding='utf-8', newline='') as stream:
+            for row in csv.DictReader(stream):
+                if row['kind'].strip() != 'landmark':
+                    continue
+                name = row['name'].strip()
+                rows.append(Landmark(
+                    name=name,
+                    slug=slugify(name)[:200],
+                    city=row['city'].strip(),
+                    latitude=Decimal(row['latitude']).quantize(Decimal('0.000001')),
+                    longitude=Decimal(row['longitude']).quantize(Decimal('0.000001')),
+                    aliases=(row.get('aliases') or '').strip(),
+                ))
+        # bulk_create skips Landmark.save(); the rebuild that follows covers every landmark
+        Landmark.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['slug'],
+            update_fields=['name', 'city', 'latitude', 'longitude', 'aliases'],
+        )
+        return len(rows)
@@ -0,0 +1,17 @@
+"""
+Recompute the relevance scores behind the default hostel listing order
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostels import ranking
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every hostel\'s rank_score from ratings, popularity, age and featured status (run hourly)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        scored = ranking.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} hostels in {time.monotonic() - started:.1f}s'))
@@ -0,0 +1,25 @@
+"""
+Recompute the "similar hostels" shown on hostel detail pages
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostels import similarity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed similar-hostel recommendations from all listed hostels (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int, default=similarity.NEIGHBOURS,
+                            help='Similar hostels stored per hostel')
+        parser.add_argument('--block-size', type=int, default=256,
+                            help='Hostels compared against all others per step; bounds memory use')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        stored = similarity.rebuild(k=options['neighbours'], block_size=options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {stored} similar-hostel rows in {time.monotonic() - started:.1f}s'
+        ))
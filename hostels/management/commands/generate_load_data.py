@@ -0,0 +1,348 @@
+"""
+Generate large, reproducible datasets for benchmarks and capacity planning
+"""
+import math
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from multiprocessing import Pool
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from hostels.models import (
+    User, Hostel, RoomType, Facility, HostelFacility, HostelImage,
+    ContactReveal, HostelView, Favorite, Review
+)
+
+# Commands that rebuild the tables derived from hostels and their events,
+# which bulk_create() leaves empty; in dependency order
+DERIVE_COMMANDS = [
+    'rebuild_localities', 'compute_landmark_distances', 'rebuild_map_clusters', 'compute_rank_scores',
+    'rebuild_trending', 'compute_similar_hostels', 'update_coviews',
+]
+
+NAME_PREFIXES = ['Green', 'Royal', 'Crescent', 'Iqbal', 'Model', 'Garden', 'Pearl', 'Falcon', 'Sunrise', 'Star']
+NAME_SUFFIXES = ['Residence', 'Hostel', 'Lodge', 'Student Home', 'House', 'Inn']
+AREAS = [
+    ('Johar Town', 31.4697, 74.2728), ('Gulberg', 31.5204, 74.3487), ('Model Town', 31.4834, 74.3260),
+    ('DHA Phase 5', 31.4627, 74.4086), ('Township', 31.4512, 74.3069), ('Faisal Town', 31.4806, 74.3045),
+    ('Wapda Town', 31.4350, 74.2670), ('Garden Town', 31.5009, 74.3256), ('Iqbal Town', 31.5107, 74.2921),
+]
+LANDMARKS = [
+    'University of Management and Technology (UMT)', 'Lahore Grammar School (LGS)', 'FAST University',
+    'LUMS', 'COMSATS University', 'University of the Punjab', 'Pearl Continental (PC) Hotel',
+]
+ROOM_PRICES = {'single': (15000, 30000), 'double': (10000, 20000), 'shared': (6000, 12000), 'dormitory': (4000, 8000)}
+IMAGE_CAPTIONS = ['Front view of the hostel', 'Common room area', 'Sample bedroom', 'Kitchen facilities', 'Study area']
+PLACEHOLDER_IMAGES = 8
+PARETO_ALPHA = 1.5
+
+# Share of daily traffic per hour of day (students browse in the evening)
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 5, 6, 6, 5, 5, 6, 7, 8, 9, 10, 9, 6, 3]
+
+# Worker state, populated once per process by _init_worker
+_ctx = {}
+
+
+def _init_worker(ctx):
+    _ctx.update(ctx)
+
+
+def _stochastic_round(rng, value):
+    base = math.floor(value)
+    return base + (1 if rng.random() < value - base else 0)
+
+
+def _event_time(rng, created_at, now):
+    """Random moment between the hostel going live and now, biased to evenings"""
+    age_days = max((now - created_at).days, 1)
+    day = now - timedelta(days=rng.randrange(age_days))
+    hour = rng.choices(range(24), weights=HOURLY_WEIGHTS)[0]
+    moment = day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+    return max(min(moment, now), created_at)
+
+
+def _random_ip(rng):
+    return f'{rng.choice([39, 110, 119, 182])}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}'
+
+
+def generate_chunk(task):
+    """Build plain row dicts for a chunk of hostels and their related data.
+
+    Runs inside worker processes, so it must not touch the database. Every
+    chunk seeds its own RNG, which keeps output identical for any worker count.
+    """
+    chunk_index, start, stop = task
+    rng = random.Random(f"{_ctx['seed']}:{chunk_index}")
+    now = _ctx['now']
+    owners, students, facilities = _ctx['owners'], _ctx['students'], _ctx['facilities']
+    rows = {name: [] for name in ('hostels', 'rooms', 'facilities', 'images', 'reviews', 'favorites', 'views', 'reveals')}
+
+    for index in range(start, stop):
+        hostel_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+        # Newer listings are more common than old ones
+        created_at = now - timedelta(days=_ctx['days'] * rng.random() ** 2, hours=rng.random() * 24)
+        # Heavy-tailed popularity: a few listings attract most of the traffic
+        popularity = min(rng.paretovariate(PARETO_ALPHA), 100) / _ctx['mean_popularity']
+        quality = rng.betavariate(5, 2)
+        area, lat, lng = rng.choice(AREAS)
+        name = f'{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)} {area}'
+
+        rows['hostels'].append({
+            'id': hostel_id,
+            'owner_id': owners[index % len(owners)],
+            'name': name,
+            'slug': f'{slugify(name)}-{_ctx["prefix"]}-{index}',
+            'address': f'House {rng.randint(1, 999)}, Block {rng.choice("ABCDEFGHJK")}, {area}, Lahore',
+            'latitude': Decimal(f'{lat + rng.gauss(0, 0.01):.6f}'),
+            'longitude': Decimal(f'{lng + rng.gauss(0, 0.01):.6f}'),
+            'gender_type': rng.choices(['male', 'female', 'mixed'], weights=[5, 4, 1])[0],
+            'nearby_landmark': rng.choice(LANDMARKS),
+            'landmark_distance': Decimal(f'{min(rng.expovariate(1 / 1.5), 25):.2f}'),
+            'description': f'{name} offers furnished rooms close to {area} with easy access to nearby campuses.',
+            'contact_email': f'hostel{index}@{_ctx["prefix"]}.example.com',
+            'contact_phone': f'+92300{rng.randrange(10 ** 7):07d}',
+            'whatsapp_number': f'+92300{rng.randrange(10 ** 7):07d}',
+            'is_verified': rng.random() < 0.85,
+            'is_active': rng.random() < 0.97,
+            'is_featured': rng.random() < 0.04,
+            'created_at': created_at,
+            'updated_at': created_at + (now - created_at) * rng.random(),
+        })
+
+        for room_type in rng.sample(list(ROOM_PRICES), rng.randint(1, 4)):
+            low, high = ROOM_PRICES[room_type]
+            rows['rooms'].append({
+                'hostel_id': hostel_id, 'type': room_type,
+                'price': Decimal(round(rng.uniform(low, high), -2)),
+                'available_rooms': rng.randint(1, 30),
+                'description': f'{room_type.title()} room',
+                'created_at': created_at,
+            })
+
+        for facility_id in rng.sample(facilities, min(len(facilities), rng.randint(3, 12))):
+            rows['facilities'].append({'hostel_id': hostel_id, 'facility_id': facility_id})
+
+        for position in range(rng.randint(1, len(IMAGE_CAPTIONS))):
+            rows['images'].append({
+                'hostel_id': hostel_id,
+                'image': f'hostel_images/load/placeholder_{rng.randrange(PLACEHOLDER_IMAGES) + 1}.jpg',
+                'caption': IMAGE_CAPTIONS[position],
+                'is_primary': position == 0,
+                'created_at': created_at,
+            })
+
+        review_count = min(len(students), _stochastic_round(rng, _ctx['reviews_per_hostel'] * popularity))
+        for user_id in rng.sample(students, review_count):
+            rating = max(1, min(5, round(rng.gauss(1 + quality * 4, 0.8))))
+            reviewed_at = _event_time(rng, created_at, now)
+            rows['reviews'].append({
+                'hostel_id': hostel_id, 'user_id': user_id, 'rating': rating,
+                'review_text': f'{"Great" if rating >= 4 else "Average" if rating == 3 else "Poor"} stay, '
+                               f'rated {rating} out of 5.',
+                'is_approved': rng.random() < 0.8,
+                'created_at': reviewed_at, 'updated_at': reviewed_at,
+            })
+
+        favorite_count = min(len(students), _stochastic_round(rng, _ctx['favorites_per_hostel'] * popularity))
+        for user_id in rng.sample(students, favorite_count):
+            rows['favorites'].append({
+                'hostel_id': hostel_id, 'user_id': user_id,
+                'created_at': _event_time(rng, created_at, now),
+            })
+
+        view_count = _stochastic_round(rng, _ctx['views_per_hostel'] * popularity)
+        for _ in range(view_count):
+            rows['views'].append({
+                'hostel_id': hostel_id,
+                'user_id': rng.choice(students) if rng.random() < 0.3 else None,
+                'ip_address': _random_ip(rng),
+                'user_agent': rng.choice(['Mozilla/5.0 (Linux; Android 13)', 'Mozilla/5.0 (iPhone)', 'Mozilla/5.0 (Windows NT 10.0)']),
+                'timestamp': _event_time(rng, created_at, now),
+            })
+
+        reveal_count = _stochastic_round(rng, _ctx['reveals_per_hostel'] * popularity)
+        for _ in range(reveal_count):
+            rows['reveals'].append({
+                'hostel_id': hostel_id,
+                'user_id': rng.choice(students) if rng.random() < 0.5 else None,
+                'ip_address': _random_ip(rng),
+                'timestamp': _event_time(rng, created_at, now),
+            })
+
+        rows['hostels'][-1].update(
+            total_views=view_count, total_contact_reveals=reveal_count, total_favorites=favorite_count,
+        )
+
+    return rows
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the generated values of auto_now/auto_now_add fields"""
+    changed = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                changed.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, seeded synthetic dataset using bulk_create and multiprocessing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hostels', type=int, default=10000, help='Number of hostels to generate')
+        parser.add_argument('--owners', type=int, help='Number of owners (default: one per 20 hostels)')
+        parser.add_argument('--students', type=int, default=5000, help='Number of student accounts')
+        parser.add_argument('--reviews', type=int, default=100000, help='Approximate number of reviews')
+        parser.add_argument('--favorites', type=int, default=50000, help='Approximate number of favorites')
+        parser.add_argument('--views', type=int, default=1000000, help='Approximate number of hostel views')
+        parser.add_argument('--reveals', type=int, default=100000, help='Approximate number of contact reveals')
+        parser.add_argument('--days', type=int, default=365, help='Time window covered by the dataset')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--prefix', default='load', help='Username/slug prefix identifying this dataset')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Generator processes')
+        parser.add_argument('--chunk-size', type=int, default=250, help='Hostels generated per worker task')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create statement')
+        parser.add_argument('--flush', action='store_true', help='Delete an existing dataset with the same prefix first')
+        parser.add_argument('--derive', action='store_true',
+                            help='Rebuild localities, map clusters, rank and trending scores, similar hostels, '
+                                 'landmark distances and co-views afterwards')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}_')
+        if existing.exists():
+            if not options['flush']:
+                raise CommandError(f'A dataset with prefix "{prefix}" already exists. Use --flush to replace it.')
+            self.stdout.write(f'Deleting existing "{prefix}" dataset...')
+            existing.delete()
+
+        hostel_total = options['hostels']
+        if hostel_total < 1:
+            raise CommandError('--hostels must be at least 1')
+
+        rng = random.Random(options['seed'])
+        now = timezone.now().replace(microsecond=0)
+        self.batch_size = options['batch_size']
+
+        call_command('create_facilities', stdout=StringIO())
+        self.create_placeholder_images()
+
+        owner_count = options['owners'] or max(1, hostel_total // 20)
+        with transaction.atomic():
+            owners = self.create_users(prefix, 'owner', owner_count, rng, now, options['days'])
+            students = self.create_users(prefix, 'student', options['students'], rng, now, options['days'])
+
+        ctx = {
+            'seed': options['seed'],
+            'prefix': prefix,
+            'now': now,
+            'days': options['days'],
+            'owners': owners,
+            'students': students,
+            'facilities': list(Facility.objects.values_list('id', flat=True)),
+            # Mean of a Pareto(alpha) sample is alpha / (alpha - 1)
+            'mean_popularity': PARETO_ALPHA / (PARETO_ALPHA - 1),
+            'reviews_per_hostel': options['reviews'] / hostel_total,
+            'favorites_per_hostel': options['favorites'] / hostel_total,
+            'views_per_hostel': options['views'] / hostel_total,
+            'reveals_per_hostel': options['reveals'] / hostel_total,
+        }
+
+        chunk_size = max(1, options['chunk_size'])
+        tasks = [
+            (index, start, min(start + chunk_size, hostel_total))
+            for index, start in enumerate(range(0, hostel_total, chunk_size))
+        ]
+
+        totals = {}
+        if options['workers'] > 1:
+            with Pool(options['workers'], initializer=_init_worker, initargs=(ctx,)) as pool:
+                for rows in pool.imap(generate_chunk, tasks):
+                    self.insert_chunk(rows, totals)
+        else:
+            _init_worker(ctx)
+            for task in tasks:
+                self.insert_chunk(generate_chunk(task), totals)
+
+        self.stdout.write('')
+        summary = ', '.join(f'{count} {name}' for name, count in totals.items())
+        self.stdout.write(
+            self.style.SUCCESS(f'Generated {len(owners)} owners, {len(students)} students, {summary}')
+        )
+
+        if options['derive']:
+            self.derive()
+
+    def derive(self):
+        """Run every DERIVE_COMMANDS command over the whole database"""
+        for name in DERIVE_COMMANDS:
+            started = time.monotonic()
+            self.stdout.write(f'Running {name}...')
+            call_command(name, stdout=StringIO())
+            self.stdout.write(f'  done in {time.monotonic() - started:.1f}s')
+
+    def create_users(self, prefix, role, count, rng, now, days):
+        users = []
+        for i in range(count):
+            joined = now - timedelta(days=days * rng.random())
+            users.append(User(
+                username=f'{prefix}_{role}_{i}',
+                email=f'{prefix}_{role}_{i}@example.com',
+                first_name=role.title(),
+                last_name=str(i),
+                role=role,
+                password='!',  # Unusable password, these accounts cannot log in
+                date_joined=joined,
+                created_at=joined,
+                updated_at=joined,
+            ))
+        with explicit_timestamps(User):
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+        return list(
+            User.objects.filter(username__startswith=f'{prefix}_{role}_').order_by('id').values_list('id', flat=True)
+        )
+
+    def insert_chunk(self, rows, totals):
+        plan = [
+            ('hostels', Hostel), ('rooms', RoomType), ('facilities', HostelFacility), ('images', HostelImage),
+            ('reviews', Review), ('favorites', Favorite), ('views', HostelView), ('reveals', ContactReveal),
+        ]
+        with transaction.atomic(), explicit_timestamps(*(model for _, model in plan)):
+            for name, model in plan:
+                objects = [model(**row) for row in rows[name]]
+                model.objects.bulk_create(objects, batch_size=self.batch_size)
+                totals[name] = totals.get(name, 0) + len(objects)
+        self.stdout.write(f"  {totals['hostels']} hostels written", ending='\r')
+
+    def create_placeholder_images(self):
+        """Write a small set of placeholder JPEGs shared by all generated listings"""
+        from PIL import Image
+
+        colors = [(79, 70, 229), (16, 185, 129), (245, 158, 11), (239, 68, 68),
+                  (59, 130, 246), (139, 92, 246), (20, 184, 166), (100, 116, 139)]
+        for number in range(1, PLACEHOLDER_IMAGES + 1):
+            path = f'hostel_images/load/placeholder_{number}.jpg'
+            if default_storage.exists(path):
+                continue
+            buffer = BytesIO()
+            Image.new('RGB', (800, 600), colors[(number - 1) % len(colors)]).save(buffer, format='JPEG')
+            default_storage.save(path, ContentFile(buffer.getvalue()))
@@ -0,0 +1,86 @@
+"""
+Fill hostel coordinates from the offline gazetteer, geocoding in parallel worker processes
+"""
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hostels.geocoding import geocode_hostel, get_gazetteer
+from hostels import landmarks, map_clusters
+from hostels.models import Hostel
+
+
+def locate_batch(rows):
+    """Geocode ``(pk, address, landmark)`` rows; return ``(pk, latitude, longitude)`` for the hits"""
+    located = []
+    for pk, address, landmark in rows:
+        place = geocode_hostel(address, landmark)
+        if place is not None:
+            located.append((pk, place.latitude, place.longitude))
+    return located
+
+
+class Command(BaseCommand):
+    help = 'Geocode hostels without coordinates using the local gazetteer (no external API)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-geocode hostels that already have coordinates')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes (1 to run inline)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Hostels per worker task and UPDATE batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report matches without saving them')
+
+    def handle(self, *args, **options):
+        hostels = Hostel.objects.order_by('pk')
+        if not options['all']:
+            hostels = hostels.filter(latitude__isnull=True)
+
+        # Load once here so forked workers inherit the index instead of re-reading it
+        get_gazetteer()
+
+        total = located = 0
+        batches = self.batches(hostels, options['batch_size'])
+        if options['workers'] > 1:
+            with Pool(options['workers']) as pool:
+                for rows, hits in pool.imap(self.locate_rows, batches):
+                    total += rows
+                    located += self.save(hits, options)
+        else:
+            for batch in batches:
+                rows, hits = self.locate_rows(batch)
+                total += rows
+                located += self.save(hits, options)
+
+        if options['all'] and not options['dry_run']:
+            # Moved hostels left their old cells; recluster everything once
+            map_clusters.rebuild()
+
+        verb = 'would be geocoded' if options['dry_run'] else 'geocoded'
+        self.stdout.write(self.style.SUCCESS(f'{located} of {total} hostels {verb}'))
+
+    @staticmethod
+    def batches(hostels, batch_size):
+        last_pk = None
+        while True:
+            batch = hostels if last_pk is None else hostels.filter(pk__gt=last_pk)
+            rows = list(batch.values_list('pk', 'address', 'nearby_landmark')[:batch_size])
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            yield rows
+
+    @staticmethod
+    def locate_rows(rows):
+        return len(rows), locate_batch(rows)
+
+    def save(self, hits, options):
+        if hits and not options['dry_run']:
+            with transaction.atomic():
+                Hostel.objects.bulk_update(
+                    [Hostel(pk=pk, latitude=latitude, longitude=longitude) for pk, latitude, longitude in hits],
+                    ['latitude', 'longitude'],
+                    batch_size=options['batch_size'],
+                )
+                map_clusters.refresh_after_commit((latitude, longitude) for _, latitude, longitude in hits)
+                landmarks.refresh_after_commit(hostel_ids=[pk for pk, _, _ in hits])
+        return len(hits)
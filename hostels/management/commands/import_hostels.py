@@ -0,0 +1,60 @@
+"""
+Import hostels, room types and facilities from a CSV or NDJSON file
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hostels.importer import FORMATS, HostelImporter, detect_format
+from hostels.models import User
+
+
+class Command(BaseCommand):
+    help = 'Bulk import hostels from a CSV or NDJSON file (see hostels/importer.py for the columns)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--format', choices=FORMATS, help='File format, detected from the extension by default')
+        parser.add_argument('--owner', help='Username of the owner for rows without an "owner" column')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per bulk insert')
+        parser.add_argument('--verified', action='store_true', help='Mark imported hostels as verified')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing')
+        parser.add_argument('--max-errors', type=int, default=50, help='Row errors to print')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            owner = User.objects.filter(username=options['owner'], role='owner').first()
+            if owner is None:
+                raise CommandError(f"No hostel owner named \"{options['owner']}\"")
+
+        importer = HostelImporter(
+            owner=owner,
+            chunk_size=options['chunk_size'],
+            verified=options['verified'],
+            dry_run=options['dry_run'],
+        )
+        fmt = options['format'] or detect_format(options['path'])
+
+        started = time.monotonic()
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                report = importer.run(stream, fmt)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {options["path"]}: {exc}')
+        elapsed = time.monotonic() - started
+
+        for line_number, message in report.errors[:options['max_errors']]:
+            self.stdout.write(self.style.WARNING(f'Line {line_number}: {message}'))
+        if len(report.errors) > options['max_errors']:
+            self.stdout.write(f"... and {len(report.errors) - options['max_errors']} more errors")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{report.valid} of {report.rows} rows are valid, {len(report.errors)} errors ({elapsed:.1f}s)'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} hostels, {report.rooms} room types and {report.facilities} '
+            f'facility links from {report.rows} rows, {len(report.errors)} errors ({elapsed:.1f}s)'
+        ))
@@ -0,0 +1,113 @@
+"""
+Advance hostel subscriptions through their lifecycle: renew, expire and warn owners
+
+Only hostels with an active subscription are listed, and these UPDATEs
+bypass Hostel.save(), so the locality counts, map clusters and cached
+pages of renewed and expired hostels are refreshed here
+(hostels.bulk_actions.refresh_listing).
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DateField, ExpressionWrapper, F
+from django.utils import timezone
+
+from hostels import bulk_actions
+from hostels.models import HostelSubscription, Notification
+
+
+class Command(BaseCommand):
+    help = 'Renew, expire and flag due-soon hostel subscriptions (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Process as of this date (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--notice-days', type=int, default=settings.SUBSCRIPTION_EXPIRY_NOTICE_DAYS,
+                            help='Warn owners this many days before a subscription ends')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Notifications per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        today = options['date'] or timezone.now().date()
+        subscriptions = HostelSubscription.objects.all()
+
+        if options['dry_run']:
+            self.stdout.write(f"Renewable: {subscriptions.renewable(today).count()}")
+            self.stdout.write(f"Expiring: {subscriptions.lapsed(today).filter(auto_renew=False).count()}")
+            self.stdout.write(f"Due soon: {subscriptions.due_soon(today, options['notice_days']).count()}")
+            return
+
+        renewed = self.renew(today)
+        expired = self.expire(today)
+        notified = self.notify_due_soon(today, options['notice_days'], options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Renewed {renewed}, expired {expired}, notified {notified} subscriptions')
+        )
+
+    def renew(self, today):
+        """Extend auto-renewing subscriptions by whole periods until they cover today"""
+        period = timedelta(days=settings.SUBSCRIPTION_PERIOD_DAYS)
+        renewed = set()
+        hostel_ids = set()
+        with transaction.atomic():
+            # Each pass is one UPDATE; only subscriptions that lapsed more than
+            # a full period ago need a second pass.
+            while True:
+                due = HostelSubscription.objects.renewable(today)
+                rows = list(due.values_list('pk', 'hostel_id'))
+                if not rows:
+                    break
+                ids = {pk for pk, _ in rows}
+                hostel_ids.update(hostel_id for _, hostel_id in rows)
+                due.update(
+                    subscription_end_date=ExpressionWrapper(F('subscription_end_date') + period, output_field=DateField()),
+                    expiry_notice_sent_at=None,
+                    updated_at=timezone.now(),
+                )
+                renewed |= ids
+            # A renewal relists a hostel whose period had already ended
+            bulk_actions.refresh_listing(bulk_actions.listing_state(hostel_ids), relisted=True)
+        return len(renewed)
+
+    def expire(self, today):
+        """Mark every lapsed subscription as expired in a single UPDATE"""
+        return bulk_actions.change_subscriptions(
+            HostelSubscription.objects.lapsed(today), status='expired', updated_at=timezone.now()
+        )
+
+    def notify_due_soon(self, today, days, batch_size):
+        """Create one notification per due-soon subscription and flag it as notified"""
+        with transaction.atomic():
+            due = list(
+                HostelSubscription.objects.due_soon(today, days)
+                .select_for_update(of=('self',))
+                .values_list('pk', 'hostel__owner_id', 'hostel__name', 'subscription_end_date')
+            )
+            if not due:
+                return 0
+
+            Notification.objects.bulk_create(
+                [
+                    Notification(
+                        user_id=owner_id,
+                        title='Subscription expiring soon',
+                        message=(
+                            f'The subscription for "{hostel_name}" ends on {end_date:%B %d, %Y}. '
+                            'Renew it to keep your hostel listed.'
+                        ),
+                        notification_type='warning',
+                    )
+                    for _, owner_id, hostel_name, end_date in due
+                ],
+                batch_size=batch_size,
+            )
+            notified_at = timezone.now()
+            ids = [row[0] for row in due]
+            for start in range(0, len(ids), batch_size):
+                HostelSubscription.objects.filter(pk__in=ids[start:start + batch_size]).update(
+                    expiry_notice_sent_at=notified_at
+                )
+        return len(due)
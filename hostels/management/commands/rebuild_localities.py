@@ -0,0 +1,42 @@
+"""
+Re-link every hostel to the localities in its address and recount the locality index
+"""
+from django.core.management.base import BaseCommand
+
+from hostels.localities import refresh_counts, sync_localities
+from hostels.models import Hostel, Locality
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the popular-locations index from hostel addresses and landmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Hostels linked per batch')
+        parser.add_argument('--counts-only', action='store_true',
+                            help='Only recount hostels per locality (fast, run nightly)')
+        parser.add_argument('--prune', action='store_true', help='Delete localities no hostel links to')
+
+    def handle(self, *args, **options):
+        if not options['counts_only']:
+            hostels = Hostel.objects.order_by('pk').only('pk', 'address', 'nearby_landmark')
+            linked = 0
+            last_pk = None
+            while True:
+                batch = hostels if last_pk is None else hostels.filter(pk__gt=last_pk)
+                batch = list(batch[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                sync_localities(batch)
+                linked += len(batch)
+                self.stdout.write(f'  {linked} hostels linked', ending='\r')
+            self.stdout.write('')
+
+        refresh_counts()
+        if options['prune']:
+            deleted, _ = Locality.objects.filter(hostel_localities__isnull=True).delete()
+            self.stdout.write(f'Pruned {deleted} unused localities')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{Locality.objects.filter(hostel_count__gt=0).count()} localities with listed hostels'
+        ))
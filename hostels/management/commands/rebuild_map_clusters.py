@@ -0,0 +1,20 @@
+"""
+Recompute the map marker clusters for every zoom level
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostels import map_clusters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed /api/map/ clusters from all listed hostels (run nightly)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = map_clusters.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} clusters for zoom {map_clusters.MIN_ZOOM}-{map_clusters.MAX_ZOOM} '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,19 @@
+"""
+Recompute trending scores from the view and contact reveal tables
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostels import trending
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every hostel\'s trending_score from recent events (after moving TRENDING_EPOCH or a bulk import)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        trending_count = trending.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{trending_count} hostels trending, rebuilt in {time.monotonic() - started:.1f}s'
+        ))
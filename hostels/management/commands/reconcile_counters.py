@@ -0,0 +1,60 @@
+"""
+Recount the per-hostel view, contact-reveal and favorite totals from the event tables
+"""
+from django.core.management.base import BaseCommand
+
+from hostels.models import ContactReveal, Favorite, Hostel, HostelView, event_count
+
+# counter column -> (annotation from HostelQuerySet.with_counted_totals(), event model)
+COUNTERS = {
+    'total_views': ('counted_views', HostelView),
+    'total_contact_reveals': ('counted_contact_reveals', ContactReveal),
+    'total_favorites': ('counted_favorites', Favorite),
+}
+
+
+class Command(BaseCommand):
+    help = 'Correct drifted hostel counter columns against the raw event tables (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Hostels recounted per query')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted hostels without fixing them')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        hostels = Hostel.objects.order_by('pk').only('pk', *COUNTERS).with_counted_totals()
+
+        checked = 0
+        drifted = []
+        last_pk = None
+        while True:
+            batch = hostels if last_pk is None else hostels.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            checked += len(batch)
+
+            changed = []
+            for hostel in batch:
+                stale = False
+                for column, (counted, _) in COUNTERS.items():
+                    if getattr(hostel, column) != getattr(hostel, counted):
+                        setattr(hostel, column, getattr(hostel, counted))
+                        stale = True
+                if stale:
+                    changed.append(hostel)
+            drifted.extend(changed)
+
+            if changed and not options['dry_run']:
+                # Recount inside the UPDATE so events flushed since the read are not lost
+                Hostel.objects.filter(pk__in=[hostel.pk for hostel in changed]).update(**{
+                    column: event_count(model) for column, (_, model) in COUNTERS.items()
+                })
+
+        for hostel in drifted[:20]:
+            self.stdout.write(f'  {hostel.pk}: ' + ', '.join(
+                f'{column}={getattr(hostel, column)}' for column in COUNTERS
+            ))
+        verb = 'would be corrected' if options['dry_run'] else 'corrected'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} hostels, {len(drifted)} {verb}'))
@@ -0,0 +1,37 @@
+"""
+Run bulk admin action jobs that are pending, or whose worker stopped without finishing them
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from hostels import bulk_actions
+
+
+class Command(BaseCommand):
+    help = 'Claim and run pending and stale bulk action jobs (run every minute, or with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for jobs instead of exiting')
+        parser.add_argument('--interval', type=float, default=10, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            processed = self.run_claimable()
+            if processed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'{processed} bulk action jobs run in {time.monotonic() - started:.1f}s'
+                ))
+            if not options['loop']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def run_claimable(self):
+        processed = 0
+        while (job := bulk_actions.claim()) is not None:
+            bulk_actions.process(job)
+            processed += 1
+        return processed
@@ -0,0 +1,96 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from hostels.instrumentation import percentile
+
+
+class Command(BaseCommand):
+    help = 'Aggregate the request timing log into a top-N slowest endpoints report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('log_files', nargs='*', help='Timing log files (default: REQUEST_TIMING_LOG_FILE)')
+        parser.add_argument('--top', type=int, default=10, help='Number of endpoints to show')
+        parser.add_argument('--sort', choices=['p95', 'p50', 'total', 'queries', 'db'], default='p95',
+                            help='Metric used to rank endpoints (from sampled requests)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        log_files = options['log_files'] or [settings.REQUEST_TIMING_LOG_FILE]
+
+        # Percentiles use sampled records only: unsampled ones are logged just for
+        # being slow, so mixing them in would overcount slow requests by 1/sample rate
+        endpoints = defaultdict(lambda: {'latency': [], 'queries': [], 'db': [], 'duplicates': 0})
+        slow = defaultdict(list)
+        for path in log_files:
+            try:
+                fh = open(path)
+            except OSError as e:
+                raise CommandError(f'Cannot read {path}: {e}')
+            with fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    endpoint = (record.get('method'), record.get('route') or record.get('path'))
+                    if not record.get('sampled'):
+                        slow[endpoint].append(record['total_ms'])
+                        continue
+                    stats = endpoints[endpoint]
+                    stats['latency'].append(record['total_ms'])
+                    stats['queries'].append(record['queries'])
+                    stats['db'].append(record['db_ms'])
+                    stats['duplicates'] += bool(record.get('duplicates'))
+
+        rows = []
+        for (method, route), stats in endpoints.items():
+            latency = stats['latency']
+            rows.append({
+                'method': method,
+                'route': route,
+                'requests': len(latency),
+                'p50': percentile(latency, 50),
+                'p95': percentile(latency, 95),
+                'total': sum(latency),
+                'queries': sum(stats['queries']) / len(stats['queries']),
+                'db': sum(stats['db']) / len(stats['db']),
+                'n_plus_one': stats['duplicates'],
+            })
+        rows.sort(key=lambda row: row[options['sort']], reverse=True)
+        rows = rows[:options['top']]
+
+        outliers = [
+            {'method': method, 'route': route, 'requests': len(latency), 'max': max(latency)}
+            for (method, route), latency in slow.items()
+        ]
+        outliers.sort(key=lambda row: (row['requests'], row['max']), reverse=True)
+        outliers = outliers[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({'endpoints': rows, 'slow_unsampled': outliers}, indent=2))
+            return
+
+        if not rows and not outliers:
+            self.stdout.write(self.style.WARNING('No timing records found.'))
+            return
+
+        self.stdout.write(
+            f"{'ENDPOINT':45} {'REQS':>6} {'P50 MS':>9} {'P95 MS':>9} {'AVG Q':>7} {'AVG DB MS':>10} {'N+1':>5}"
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['method'] + ' ' + str(row['route']):45.45} {row['requests']:>6} {row['p50']:>9.1f} "
+                f"{row['p95']:>9.1f} {row['queries']:>7.1f} {row['db']:>10.1f} {row['n_plus_one']:>5}"
+            )
+
+        if outliers:
+            self.stdout.write('')
+            self.stdout.write('Slow unsampled requests (over REQUEST_TIMING_SLOW_MS, not in the percentiles above):')
+            self.stdout.write(f"{'ENDPOINT':45} {'REQS':>6} {'MAX MS':>9}")
+            for row in outliers:
+                self.stdout.write(
+                    f"{row['method'] + ' ' + str(row['route']):45.45} {row['requests']:>6} {row['max']:>9.1f}"
+                )
@@ -0,0 +1,25 @@
+"""
+Fold new hostel page views into the "students also viewed" co-view counts
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from hostels import coviews
+
+
+class Command(BaseCommand):
+    help = 'Count co-viewed hostels from page views recorded since the last run (run hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Views read and committed per step')
+        parser.add_argument('--reset', action='store_true', help='Drop all counts and recount every view')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['reset']:
+            coviews.reset()
+        read, counted = coviews.update(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {read} views, counted {counted} co-viewed pairs in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,199 @@
+"""
+Precomputed map marker clusters.
+
+Listed hostels with coordinates are grouped into a square grid on the Web
+Mercator projection at every zoom level from ``MIN_ZOOM`` to ``MAX_ZOOM``.
+Cells are 64px wide (4 x 4 per 256px map tile), so a cell at zoom ``z``
+covers exactly four cells at ``z + 1``. Only the finest level is computed
+from Hostel rows; every coarser cell is summed from its four children,
+which keeps both the full rebuild and incremental refreshes cheap.
+
+Hostel.save()/delete(), RoomType writes and the bulk write paths call ``refresh_points``
+with the old and new positions of the hostels they touched, after commit;
+that recomputes one leaf cell per position and its parents up the pyramid.
+``rebuild_map_clusters`` recomputes everything.
+"""
+import logging
+import math
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Min, Q
+
+from .models import Hostel, MapCluster
+
+logger = logging.getLogger(__name__)
+
+MIN_ZOOM = 3
+MAX_ZOOM = 16
+# log2 of the cells per map tile along each axis
+CELL_BITS = 2
+# Web Mercator stops here
+MAX_LATITUDE = 85.05112878
+# Cells per query when looking up many cells at once
+CELL_BATCH = 100
+
+
+def grid_size(zoom):
+    return 2 ** (zoom + CELL_BITS)
+
+
+def cell_of(latitude, longitude, zoom):
+    """The ``(x, y)`` grid cell containing a point; y grows southwards"""
+    n = grid_size(zoom)
+    latitude = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, float(latitude))))
+    x = int((float(longitude) + 180) / 360 * n)
+    y = int((1 - math.log(math.tan(latitude) + 1 / math.cos(latitude)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cell_bounds(x, y, zoom):
+    """``(south, west, north, east)`` of a grid cell in degrees"""
+    n = grid_size(zoom)
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+
+def clustered_hostels():
+    """``(pk, latitude, longitude, lowest room price)`` of every hostel shown on the map"""
+    return (
+        Hostel.objects.searchable()
+        .filter(latitude__isnull=False, longitude__isnull=False)
+        .order_by()
+        .annotate(lowest_price=Min('room_types__price'))
+        .values_list('pk', 'latitude', 'longitude', 'lowest_price')
+    )
+
+
+def leaf_clusters(rows):
+    """Group hostel rows into clusters at ``MAX_ZOOM``, keyed by cell"""
+    clusters = {}
+    for pk, latitude, longitude, price in rows:
+        cell = cell_of(latitude, longitude, MAX_ZOOM)
+        cluster = clusters.get(cell)
+        if cluster is None:
+            clusters[cell] = MapCluster(
+                zoom=MAX_ZOOM, cell_x=cell[0], cell_y=cell[1], hostel_count=1,
+                latitude_sum=float(latitude), longitude_sum=float(longitude), min_price=price, hostel_id=pk,
+            )
+            continue
+        cluster.hostel_count += 1
+        cluster.latitude_sum += float(latitude)
+        cluster.longitude_sum += float(longitude)
+        cluster.min_price = lowest(cluster.min_price, price)
+        cluster.hostel_id = None
+    return clusters
+
+
+def parent_clusters(children, zoom):
+    """Sum clusters at ``zoom + 1`` into their parent cells at ``zoom``"""
+    parents = {}
+    for child in children:
+        cell = (child.cell_x // 2, child.cell_y // 2)
+        parent = parents.get(cell)
+        if parent is None:
+            parents[cell] = MapCluster(
+                zoom=zoom, cell_x=cell[0], cell_y=cell[1], hostel_count=child.hostel_count,
+                latitude_sum=child.latitude_sum, longitude_sum=child.longitude_sum,
+                min_price=child.min_price, hostel_id=child.hostel_id,
+            )
+            continue
+        parent.hostel_count += child.hostel_count
+        parent.latitude_sum += child.latitude_sum
+        parent.longitude_sum += child.longitude_sum
+        parent.min_price = lowest(parent.min_price, child.min_price)
+        parent.hostel_id = None
+    return parents
+
+
+def lowest(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+def cells_q(cells):
+    return reduce(or_, (Q(cell_x=x, cell_y=y) for x, y in cells))
+
+
+def batched(items, size=CELL_BATCH):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def rebuild():
+    """Recompute every zoom level from scratch; return the number of clusters written"""
+    level = leaf_clusters(clustered_hostels().iterator(chunk_size=2000))
+    written = 0
+    with transaction.atomic():
+        MapCluster.objects.all().delete()
+        for zoom in range(MAX_ZOOM, MIN_ZOOM - 1, -1):
+            MapCluster.objects.bulk_create(level.values(), batch_size=1000)
+            written += len(level)
+            level = parent_clusters(level.values(), zoom - 1)
+    return written
+
+
+def refresh_points(points):
+    """Recompute the cells containing the given ``(latitude, longitude)`` positions.
+
+    Pass both the old and the new position of a moved hostel. Positions
+    without coordinates are ignored.
+    """
+    cells = {
+        cell_of(latitude, longitude, MAX_ZOOM)
+        for latitude, longitude in points
+        if latitude is not None and longitude is not None
+    }
+    if not cells:
+        return
+    try:
+        with transaction.atomic():
+            replace(MAX_ZOOM, cells, recount_leaves(cells))
+            for zoom in range(MAX_ZOOM - 1, MIN_ZOOM - 1, -1):
+                cells = {(x // 2, y // 2) for x, y in cells}
+                children = []
+                for batch in batched(cells):
+                    children += MapCluster.objects.filter(
+                        cells_q([(2 * x + dx, 2 * y + dy) for x, y in batch for dx in (0, 1) for dy in (0, 1)]),
+                        zoom=zoom + 1,
+                    )
+                replace(zoom, cells, parent_clusters(children, zoom))
+    except IntegrityError:
+        # A concurrent refresh wrote the same cells; the next refresh or rebuild settles them
+        logger.warning('Map cluster refresh collided with a concurrent update', exc_info=True)
+
+
+def recount_leaves(cells):
+    rows = []
+    for batch in batched(cells):
+        # Padded bounds, then exact cell membership in Python, so rounding at
+        # cell edges cannot drop a hostel
+        bounds = []
+        for x, y in batch:
+            south, west, north, east = cell_bounds(x, y, MAX_ZOOM)
+            pad = 1e-6
+            bounds.append(Q(
+                latitude__gte=south - pad, latitude__lte=north + pad,
+                longitude__gte=west - pad, longitude__lte=east + pad,
+            ))
+        rows += clustered_hostels().filter(reduce(or_, bounds))
+    return {cell: cluster for cell, cluster in leaf_clusters(rows).items() if cell in cells}
+
+
+def replace(zoom, cells, clusters):
+    for batch in batched(cells):
+        MapCluster.objects.filter(cells_q(batch), zoom=zoom).delete()
+    MapCluster.objects.bulk_create(clusters.values(), batch_size=1000)
+
+
+def refresh_after_commit(points):
+    points = list(points)
+    transaction.on_commit(lambda: refresh_points(points))
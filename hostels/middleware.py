@@ -0,0 +1,113 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from . import page_cache
+from .instrumentation import QueryRecorder, RenderTimer
+
+logger = logging.getLogger('hostels.request_timing')
+
+
+class RequestTimingMiddleware:
+    """Record per-request SQL, template and total timings.
+
+    Sampled requests are fully instrumented (query count, DB time, repeated
+    query shapes, render time); unsampled requests only have their latency
+    measured and are logged when slower than REQUEST_TIMING_SLOW_MS. Each
+    record is written to the ``hostels.request_timing`` logger as one JSON
+    line, and sampled responses get a ``Server-Timing`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_TIMING_ENABLED', True)
+        self.sample_rate = getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE', 1.0)
+        self.slow_ms = getattr(settings, 'REQUEST_TIMING_SLOW_MS', 1000)
+        self.duplicate_threshold = getattr(settings, 'REQUEST_TIMING_DUPLICATE_THRESHOLD', 3)
+        self.server_timing = getattr(settings, 'REQUEST_TIMING_SERVER_TIMING_HEADER', True)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        if random.random() >= self.sample_rate:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            total_ms = (time.perf_counter() - start) * 1000
+            if total_ms >= self.slow_ms:
+                self.log(request, response, {'total_ms': round(total_ms, 2), 'sampled': False})
+            return response
+
+        with QueryRecorder() as recorder, RenderTimer() as renderer:
+            start = time.perf_counter()
+            response = self.get_response(request)
+            total_ms = (time.perf_counter() - start) * 1000
+
+        db_ms = recorder.total_time * 1000
+        render_ms = renderer.total_time * 1000
+        duplicates = recorder.duplicates(self.duplicate_threshold)
+
+        self.log(request, response, {
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'render_ms': round(render_ms, 2),
+            'queries': recorder.count,
+            'duplicates': [{'sql': sql[:500], 'count': count} for sql, count in duplicates[:5]],
+            'sampled': True,
+        })
+
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+                f'tpl;dur={render_ms:.1f}',
+                f'total;dur={total_ms:.1f}',
+            ])
+        return response
+
+    def log(self, request, response, metrics):
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'route': match.view_name if match else None,
+            'path': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            **metrics,
+        }
+        logger.info(json.dumps(record))
+
+
+class PageCacheMiddleware:
+    """Serve anonymous GET requests for views with ``page_cache_tags`` from the cache.
+
+    Must come after the authentication and message middleware. See
+    hostels.page_cache for keys, invalidation and per-visitor parts.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PAGE_CACHE_ENABLED', True)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        pending = getattr(request, 'page_cache_pending', None)
+        if pending:
+            page_cache.store(request, response, *pending)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.enabled or request.method not in ('GET', 'HEAD'):
+            return None
+        tags = page_cache.view_tags(view_func, view_kwargs)
+        if tags is None or request.user.is_authenticated:
+            return None
+
+        key = page_cache.page_key(request)
+        # Read before rendering, so a change made meanwhile expires what is stored
+        versions = page_cache.tag_versions(tags)
+        response = page_cache.serve(request, key, versions)
+        if response is None and request.method == 'GET':
+            request.page_cache_pending = (key, versions)
+        return response
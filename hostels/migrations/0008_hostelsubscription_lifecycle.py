@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0007_hostelview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostelsubscription',
+            name='auto_renew',
+            field=models.BooleanField(default=False, help_text='Extend automatically at the end of each period'),
+        ),
+        migrations.AddField(
+            model_name='hostelsubscription',
+            name='expiry_notice_sent_at',
+            field=models.DateTimeField(blank=True, help_text='When the owner was warned about the upcoming expiry', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='hostelsubscription',
+            index=models.Index(fields=['status', 'subscription_end_date'], name='hostels_sub_status_end_idx'),
+        ),
+    ]
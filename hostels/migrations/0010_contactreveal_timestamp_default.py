@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0009_bulkactionjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contactreveal',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:25
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Hostel = apps.get_model('hostels', 'Hostel')
+
+    def count_of(model_name):
+        events = apps.get_model('hostels', model_name).objects.filter(hostel=models.OuterRef('pk'))
+        counts = events.order_by().values('hostel').annotate(total=models.Count('pk')).values('total')
+        return Coalesce(models.Subquery(counts), 0)
+
+    Hostel.objects.update(
+        total_views=count_of('HostelView'),
+        total_contact_reveals=count_of('ContactReveal'),
+        total_favorites=count_of('Favorite'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0010_contactreveal_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostel',
+            name='total_contact_reveals',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hostel',
+            name='total_favorites',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hostel',
+            name='total_views',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='hostelview',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0011_hostel_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostelLocality',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hostel_localities', to='hostels.hostel')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Locality',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('city', 'City'), ('area', 'Area'), ('landmark', 'Landmark')], max_length=10)),
+                ('key', models.SlugField(help_text='Normalized name used for matching and autocomplete', max_length=200)),
+                ('name', models.CharField(max_length=200)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('hostel_count', models.PositiveIntegerField(default=0, help_text='Listed hostels in this locality')),
+                ('hostels', models.ManyToManyField(related_name='localities', through='hostels.HostelLocality', to='hostels.hostel')),
+            ],
+            options={
+                'verbose_name_plural': 'Localities',
+                'ordering': ['-hostel_count', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='hostellocality',
+            name='locality',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hostel_localities', to='hostels.locality'),
+        ),
+        migrations.AddIndex(
+            model_name='locality',
+            index=models.Index(fields=['kind', '-hostel_count'], name='hostels_locality_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='locality',
+            constraint=models.UniqueConstraint(fields=('kind', 'key'), name='hostels_locality_kind_key_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='hostellocality',
+            constraint=models.UniqueConstraint(fields=('hostel', 'locality'), name='hostels_hostellocality_uniq'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0012_locality_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MapCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('cell_x', models.PositiveIntegerField()),
+                ('cell_y', models.PositiveIntegerField()),
+                ('hostel_count', models.PositiveIntegerField()),
+                ('latitude_sum', models.FloatField()),
+                ('longitude_sum', models.FloatField()),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('hostel', models.ForeignKey(blank=True, help_text='The hostel, for single-hostel cells', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hostels.hostel')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('zoom', 'cell_x', 'cell_y'), name='hostels_mapcluster_cell_uniq')],
+            },
+        ),
+    ]
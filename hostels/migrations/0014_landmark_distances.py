@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0013_mapcluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Landmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=200, unique=True)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('aliases', models.CharField(blank=True, help_text='Other names, separated by semicolons', max_length=300)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='HostelLandmarkDistance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField()),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='landmark_distances', to='hostels.hostel')),
+                ('landmark', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hostel_distances', to='hostels.landmark')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['landmark', 'distance_km'], name='hostels_landmark_dist_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hostel', 'landmark'), name='hostels_landmarkdistance_uniq')],
+            },
+        ),
+    ]
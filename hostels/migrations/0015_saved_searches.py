@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0014_landmark_distances'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('params', models.JSONField(default=dict, help_text='Canonical hostel list filter parameters')),
+                ('predicate_count', models.PositiveSmallIntegerField(default=0, editable=False)),
+                ('is_active', models.BooleanField(default=True, help_text='Send alerts for new matches')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('landmark', models.ForeignKey(blank=True, help_text='The landmark the landmark filter resolved to when saved', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hostels.landmark')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'saved searches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='hostels.hostel')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='hostels.savedsearch')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('saved_search', 'hostel'), name='hostels_searchmatch_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(choices=[('facility', 'Facility'), ('gender', 'Gender type'), ('room_type', 'Room type'), ('price_band', 'Price band'), ('landmark', 'Landmark')], max_length=20)),
+                ('value', models.CharField(max_length=50)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='hostels.savedsearch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'value'], name='hostels_searchterm_idx')],
+                'constraints': [models.UniqueConstraint(fields=('saved_search', 'key', 'value'), name='hostels_searchterm_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0015_saved_searches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarHostel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField(help_text='Similarity from 0 to 1')),
+                ('hostel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_hostels', to='hostels.hostel')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='hostels.hostel')),
+            ],
+            options={
+                'ordering': ['hostel', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('hostel', 'rank'), name='hostels_similarhostel_rank_uniq')],
+            },
+        ),
+    ]
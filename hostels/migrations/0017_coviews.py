@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0016_similar_hostels'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessions', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JobState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('watermark', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='hostelview',
+            index=models.Index(fields=['ip_address', 'timestamp'], name='hostels_view_visitor_idx'),
+        ),
+        migrations.AddField(
+            model_name='coview',
+            name='hostel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_views', to='hostels.hostel'),
+        ),
+        migrations.AddField(
+            model_name='coview',
+            name='other',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='hostels.hostel'),
+        ),
+        migrations.AddIndex(
+            model_name='coview',
+            index=models.Index(fields=['hostel', '-sessions'], name='hostels_coview_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='coview',
+            constraint=models.UniqueConstraint(fields=('hostel', 'other'), name='hostels_coview_uniq'),
+        ),
+    ]
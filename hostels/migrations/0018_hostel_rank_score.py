@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:43
+
+from django.db import migrations, models
+
+
+def seed_rank_scores(apps, schema_editor):
+    # Keep featured hostels first until compute_rank_scores runs; ties fall back to newest first
+    Hostel = apps.get_model('hostels', 'Hostel')
+    Hostel.objects.filter(is_featured=True).update(rank_score=1.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0017_coviews'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostel',
+            name='rank_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(seed_rank_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_verified', True)), fields=['-rank_score', '-created_at'], name='hostels_hostel_rank_idx'),
+        ),
+    ]
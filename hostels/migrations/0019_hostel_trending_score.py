@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0018_hostel_rank_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hostel',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='hostel',
+            index=models.Index(condition=models.Q(('is_active', True), ('is_verified', True)), fields=['-trending_score'], name='hostels_hostel_trending_idx'),
+        ),
+    ]
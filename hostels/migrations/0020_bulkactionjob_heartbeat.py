@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0019_hostel_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='cursor',
+            field=models.CharField(blank=True, help_text='Primary key of the last row processed', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last progress of the worker running the job', null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0020_bulkactionjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkactionjob',
+            name='report',
+            field=models.JSONField(blank=True, default=dict, help_text='Import report: row counts and row errors'),
+        ),
+        migrations.AlterField(
+            model_name='bulkactionjob',
+            name='cursor',
+            field=models.CharField(blank=True, help_text='Primary key (or import file line) of the last row processed', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='bulkactionjob',
+            name='selection',
+            field=models.JSONField(default=dict, help_text='Explicit IDs, the list filters to match, or the import file and options'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+DECIMAL_PARAMS = ('max_distance', 'min_price', 'max_price')
+
+
+def fixed_point_params(apps, schema_editor):
+    # Searches saved while round numbers were stored in exponent form ("1.5E+4")
+    SavedSearch = apps.get_model('hostels', 'SavedSearch')
+    for search in SavedSearch.objects.iterator():
+        changed = False
+        for name in DECIMAL_PARAMS:
+            value = search.params.get(name)
+            if value and 'E' in value.upper():
+                fixed = format(Decimal(value), 'f')
+                search.name = search.name.replace(f'₨{value}', f'₨{fixed}')
+                search.params[name] = fixed
+                changed = True
+        if changed:
+            search.save(update_fields=['name', 'params'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hostels', '0021_bulkactionjob_report'),
+    ]
+
+    operations = [
+        migrations.RunPython(fixed_point_params, migrations.RunPython.noop),
+    ]
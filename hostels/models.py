@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.core.validators import FileExtensionValidator
 import uuid
@@ -31,6 +36,88 @@ class User(AbstractUser):
         return f"{self.username} ({self.get_role_display()})"
 
 
+class HostelQuerySet(models.QuerySet):
+    """Set-based helpers so listings don't fall back to per-hostel queries"""
+
+    def with_featured_state(self):
+        """Annotate the current featured end date and pending-request flag.
+
+        Lets ``is_currently_featured``, ``featured_until``,
+        ``featured_days_remaining`` and ``has_pending_featured_request`` be
+        answered for every row from the listing query itself.
+        """
+        from django.utils import timezone
+        now = timezone.now()
+        active_requests = FeaturedRequest.objects.filter(
+            hostel=models.OuterRef('pk'),
+            status='approved',
+            featured_start_date__lte=now,
+            featured_end_date__gte=now,
+        ).order_by('-featured_end_date')
+        pending_requests = FeaturedRequest.objects.filter(hostel=models.OuterRef('pk'), status='pending')
+        return self.annotate(
+            active_featured_end=models.Subquery(active_requests.values('featured_end_date')[:1]),
+            pending_featured_request=models.Exists(pending_requests),
+        )
+
+    def searchable(self):
+        """Hostels that may appear in public listings and search results.
+
+        With ``SUBSCRIPTION_GATED_SEARCH`` on, only hostels with a paid-up
+        subscription are listed; the check is a single join on the
+        ``(status, subscription_end_date)`` index.
+        """
+        queryset = self.filter(is_verified=True, is_active=True)
+        if settings.SUBSCRIPTION_GATED_SEARCH:
+            from django.utils import timezone
+            queryset = queryset.filter(
+                subscription__status='active',
+                subscription__subscription_end_date__gte=timezone.now().date(),
+            )
+        return queryset
+
+    def for_cards(self):
+        """Annotate and prefetch everything a hostel card shows.
+
+        ``average_rating`` and ``rating_count`` are answered from the
+        annotations, and ``min_price``, the first image, room types and
+        facilities from prefetched rows, so a page of cards takes a fixed
+        number of queries. The annotations are subqueries rather than
+        aggregates, so they add no GROUP BY to the listing query.
+        """
+        approved = Review.objects.filter(hostel=models.OuterRef('pk'), is_approved=True).order_by().values('hostel')
+        return self.annotate(
+            approved_rating=models.Subquery(approved.annotate(average=models.Avg('rating')).values('average')),
+            approved_review_count=Coalesce(
+                models.Subquery(approved.annotate(total=models.Count('pk')).values('total')), 0
+            ),
+        ).prefetch_related('images', 'room_types', 'hostel_facilities__facility')
+
+    def with_event_counts(self, since=None):
+        """Annotate ``period_views`` and ``period_reveals`` (optionally since a date)"""
+        return self.annotate(
+            period_views=event_count(HostelView, since),
+            period_reveals=event_count(ContactReveal, since),
+        )
+
+    def with_counted_totals(self):
+        """Annotate the counter columns' true values, counted from the event tables"""
+        return self.annotate(
+            counted_views=event_count(HostelView),
+            counted_contact_reveals=event_count(ContactReveal),
+            counted_favorites=event_count(Favorite),
+        )
+
+
+def event_count(model, since=None):
+    """Per-hostel row count of ``model`` as a subquery on the outer hostel"""
+    events = model.objects.filter(hostel=models.OuterRef('pk'))
+    if since is not None:
+        events = events.filter(timestamp__gte=since)
+    counts = events.order_by().values('hostel').annotate(total=models.Count('pk')).values('total')
+    return Coalesce(models.Subquery(counts), 0)
+
+
 class Hostel(models.Model):
     """Main hostel model"""
     GENDER_CHOICES = [
@@ -60,9 +147,22 @@ class Hostel(models.Model):
     is_verified = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False, help_text="Featured hostels appear first in search results and on homepage")
+
+    # Denormalized totals, incremented as events are written and checked by reconcile_counters
+    total_views = models.PositiveIntegerField(default=0, editable=False)
+    total_contact_reveals = models.PositiveIntegerField(default=0, editable=False)
+    total_favorites = models.PositiveIntegerField(default=0, editable=False)
+
+    # Default listing order, recomputed in batch by compute_rank_scores and seeded on save (hostels.ranking)
+    rank_score = models.FloatField(default=0, editable=False)
+    # Decayed views and contact reveals, raised as events are flushed (hostels.trending)
+    trending_score = models.FloatField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HostelQuerySet.as_manager()
+
     class Meta:
         ordering = ['-is_featured', '-created_at']
         indexes = [
@@ -70,12 +170,115 @@ class Hostel(models.Model):
             models.Index(fields=['is_verified', 'is_active']),
             models.Index(fields=['is_featured']),
             models.Index(fields=['landmark_distance']),
+            # Listed hostels in default order (hostels.ranking)
+            models.Index(
+                fields=['-rank_score', '-created_at'], name='hostels_hostel_rank_idx',
+                condition=models.Q(is_verified=True, is_active=True),
+            ),
+            # Listed hostels by trending score (hostels.trending)
+            models.Index(
+                fields=['-trending_score'], name='hostels_hostel_trending_idx',
+                condition=models.Q(is_verified=True, is_active=True),
+            ),
         ]
 
+    CONTACT_FIELDS = ('contact_email', 'contact_phone', 'whatsapp_number')
+    CONTACT_CACHE_TIMEOUT = 300
+
+    # Fields that decide which localities a hostel is listed under
+    LOCALITY_FIELDS = {'address', 'nearby_landmark', 'is_active', 'is_verified'}
+    # Fields that decide where, and whether, a hostel appears on the map
+    MAP_FIELDS = ('latitude', 'longitude', 'is_active', 'is_verified')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell whether the map clusters need a refresh
+        instance._loaded_map_state = tuple(instance.__dict__.get(name) for name in cls.MAP_FIELDS)
+        # ... and whether the featured boost of the rank score changes
+        instance._loaded_featured = instance.__dict__.get('is_featured')
+        return instance
+
+    @property
+    def map_state(self):
+        return tuple(getattr(self, name) for name in self.MAP_FIELDS)
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        from . import landmarks, page_cache
+        from .localities import sync_localities
+        from .map_clusters import refresh_after_commit
+        from .saved_searches import match_after_commit
+
+        update_fields = kwargs.get('update_fields')
+        loaded = getattr(self, '_loaded_map_state', None)
+        self.update_rank_score(update_fields, kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+            cache.delete(self.contact_cache_key(self.slug))
+        else:
+            # Allocate and insert in one transaction so the slug lock covers the INSERT
+            from .slugs import allocate_slug
+            with transaction.atomic(using=kwargs.get('using')):
+                self.slug = allocate_slug(self, self.name, using=kwargs.get('using'))
+                super().save(*args, **kwargs)
+        page_cache.invalidate_after_commit(slugs=[self.slug])
+
+        if update_fields is None or self.LOCALITY_FIELDS.intersection(update_fields):
+            sync_localities([self])
+
+        if loaded != self.map_state:
+            refresh_after_commit([loaded[:2] if loaded else (None, None), self.map_state[:2]])
+            if (loaded or (None, None))[:2] != self.map_state[:2]:
+                landmarks.refresh_after_commit(hostel_ids=[self.pk])
+            if self.is_active and self.is_verified and not (loaded and all(loaded[2:])):
+                # Newly listed: alert the saved searches it matches
+                match_after_commit([self.pk])
+            self._loaded_map_state = self.map_state
+
+    def update_rank_score(self, update_fields, kwargs):
+        """Seed a new hostel's rank score, or apply a featured change to it, until the next rebuild"""
+        from . import ranking
+
+        loaded_featured = getattr(self, '_loaded_featured', None)
+        if self._state.adding and not self.rank_score:
+            self.rank_score = ranking.initial_score(self.is_featured)
+        elif loaded_featured is not None and loaded_featured != self.is_featured:
+            if update_fields is not None and 'is_featured' not in update_fields:
+                return
+            boost = ranking.FEATURED_BOOST if self.is_featured else -ranking.FEATURED_BOOST
+            self.rank_score = round(self.rank_score + boost, 6)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'rank_score'}
+        self._loaded_featured = self.is_featured
+
+    def delete(self, *args, **kwargs):
+        from . import page_cache
+        from .localities import refresh_counts
+        from .map_clusters import refresh_after_commit
+
+        cache.delete(self.contact_cache_key(self.slug))
+        locality_ids = list(self.hostel_localities.values_list('locality_id', flat=True))
+        with transaction.atomic(using=kwargs.get('using')):
+            refresh_after_commit([(self.latitude, self.longitude)])
+            page_cache.invalidate_after_commit(slugs=[self.slug])
+            result = super().delete(*args, **kwargs)
+        refresh_counts(locality_ids)
+        return result
+
+    @staticmethod
+    def contact_cache_key(slug):
+        return f'hostel-contact:{slug}'
+
+    @classmethod
+    def get_contact_details(cls, slug):
+        """Contact fields of an active hostel by slug, cached; None if there is no such hostel"""
+        key = cls.contact_cache_key(slug)
+        details = cache.get(key)
+        if details is None:
+            details = cls.objects.filter(slug=slug, is_active=True).values('id', *cls.CONTACT_FIELDS).first()
+            # Cache misses too, so unknown slugs cannot be used to bypass the cache
+            cache.set(key, details or {}, cls.CONTACT_CACHE_TIMEOUT)
+        return details or None
 
     def get_absolute_url(self):
         return reverse('hostels:hostel_detail', kwargs={'slug': self.slug})
@@ -86,18 +289,26 @@ class Hostel(models.Model):
     @property
     def min_price(self):
         """Get the minimum room price for this hostel"""
+        room_types = getattr(self, '_prefetched_objects_cache', {}).get('room_types')
+        if room_types is not None:  # Prefetched by for_cards()
+            return min((room.price for room in room_types), default=None)
         min_room = self.room_types.order_by('price').first()
         return min_room.price if min_room else None
 
     @property
     def contact_reveals_count(self):
-        """Count how many times contact info was revealed"""
-        return self.contact_reveals.count()
+        """How many times contact info was revealed"""
+        return self.total_contact_reveals
 
     @property
     def views_count(self):
-        """Count how many times hostel was viewed"""
-        return self.views.count()
+        """How many times the hostel was viewed"""
+        return self.total_views
+
+    @property
+    def favorites_count(self):
+        """How many users saved the hostel to their favorites"""
+        return self.total_favorites
 
     @property
     def current_featured_request(self):
@@ -112,36 +323,59 @@ class Hostel(models.Model):
     @property
     def is_currently_featured(self):
         """Check if hostel is currently featured based on active requests"""
-        return self.current_featured_request is not None
+        return self.featured_until is not None
 
     @property
     def featured_until(self):
         """Get the end date of current featured period"""
+        if hasattr(self, 'active_featured_end'):  # Annotated by with_featured_state()
+            return self.active_featured_end
         current = self.current_featured_request
         return current.featured_end_date if current else None
 
+    @property
+    def featured_days_remaining(self):
+        """Days left in the current featured period"""
+        from django.utils import timezone
+        until = self.featured_until
+        return max(0, (until - timezone.now()).days) if until else 0
+
+    @property
+    def has_pending_featured_request(self):
+        """Check if a featured request is awaiting admin review"""
+        if hasattr(self, 'pending_featured_request'):  # Annotated by with_featured_state()
+            return self.pending_featured_request
+        return self.featured_requests.filter(status='pending').exists()
+
+    def load_rating(self):
+        """Set ``approved_rating`` and ``approved_review_count`` with one query, unless annotated by for_cards()"""
+        if not hasattr(self, 'approved_review_count'):
+            self.__dict__.update(self.reviews.filter(is_approved=True).aggregate(
+                approved_rating=models.Avg('rating'),
+                approved_review_count=models.Count('pk'),
+            ))
+
     @property
     def average_rating(self):
         """Calculate average rating from approved reviews"""
-        approved_reviews = self.reviews.filter(is_approved=True)
-        if approved_reviews.exists():
-            total_rating = sum(review.rating for review in approved_reviews)
-            return round(total_rating / approved_reviews.count(), 1)
+        self.load_rating()
+        if self.approved_review_count:
+            return round(float(self.approved_rating), 1)
         return 0
 
     @property
     def rating_count(self):
         """Get count of approved reviews"""
-        return self.reviews.filter(is_approved=True).count()
+        self.load_rating()
+        return self.approved_review_count
 
-    @property
+    @cached_property
     def rating_distribution(self):
         """Get distribution of ratings (1-5 stars)"""
-        approved_reviews = self.reviews.filter(is_approved=True)
-        distribution = {}
-        for i in range(1, 6):
-            distribution[i] = approved_reviews.filter(rating=i).count()
-        return distribution
+        counts = self.reviews.filter(is_approved=True).aggregate(**{
+            f'stars_{i}': models.Count('pk', filter=models.Q(rating=i)) for i in range(1, 6)
+        })
+        return {i: counts[f'stars_{i}'] for i in range(1, 6)}
 
     @property
     def rating_stars_display(self):
@@ -211,6 +445,30 @@ class RoomType(models.Model):
     def __str__(self):
         return f"{self.hostel.name} - {self.get_type_display()} (₨{self.price})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.rooms_changed([self.hostel_id])
+
+    def delete(self, *args, **kwargs):
+        self.rooms_changed([self.hostel_id])
+        return super().delete(*args, **kwargs)
+
+    @staticmethod
+    def rooms_changed(hostel_ids):
+        """Refresh what room types feed once the transaction commits.
+
+        Room prices are the map clusters' minimum price and a saved search
+        filter, and the cards and hostel pages show them.
+        """
+        from . import page_cache
+        from .map_clusters import refresh_after_commit
+        from .saved_searches import match_after_commit
+
+        hostel_ids = list(hostel_ids)
+        refresh_after_commit(Hostel.objects.filter(pk__in=hostel_ids).values_list('latitude', 'longitude'))
+        match_after_commit(hostel_ids)
+        page_cache.invalidate_after_commit(hostel_ids=hostel_ids)
+
 
 class HostelImage(models.Model):
     """Images for hostels"""
@@ -227,10 +485,17 @@ class HostelImage(models.Model):
         return f"{self.hostel.name} - Image {self.id}"
 
     def save(self, *args, **kwargs):
+        from .page_cache import invalidate_after_commit
         # Ensure only one primary image per hostel
         if self.is_primary:
             HostelImage.objects.filter(hostel=self.hostel, is_primary=True).update(is_primary=False)
         super().save(*args, **kwargs)
+        invalidate_after_commit(hostel_ids=[self.hostel_id])
+
+    def delete(self, *args, **kwargs):
+        from .page_cache import invalidate_after_commit
+        invalidate_after_commit(hostel_ids=[self.hostel_id])
+        return super().delete(*args, **kwargs)
 
 
 class ContactReveal(models.Model):
@@ -238,7 +503,8 @@ class ContactReveal(models.Model):
     hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='contact_reveals')
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the reveal happens, not when the buffered row is inserted (hostels.events)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         return f"{self.hostel.name} - Contact revealed at {self.timestamp}"
@@ -250,12 +516,17 @@ class HostelView(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the page is viewed, not when the buffered row is inserted (hostels.events)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         verbose_name = "Hostel View"
         verbose_name_plural = "Hostel Views"
         ordering = ['-timestamp']
+        indexes = [
+            # An anonymous visitor's recent views, for sessionizing (hostels.coviews)
+            models.Index(fields=['ip_address', 'timestamp'], name='hostels_view_visitor_idx'),
+        ]
 
     def __str__(self):
         return f"{self.hostel.name} - Viewed at {self.timestamp}"
@@ -291,6 +562,30 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.hostel.name} - {self.rating} stars by {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.rooms_changed([self.hostel_id])
+
+    def delete(self, *args, **kwargs):
+        self.rooms_changed([self.hostel_id])
+        return super().delete(*args, **kwargs)
+
+    @staticmethod
+    def rooms_changed(hostel_ids):
+        """Refresh what room types feed once the transaction commits.
+
+        Room prices are the map clusters' minimum price and a saved search
+        filter, and the cards and hostel pages show them.
+        """
+        from . import page_cache
+        from .map_clusters import refresh_after_commit
+        from .saved_searches import match_after_commit
+
+        hostel_ids = list(hostel_ids)
+        refresh_after_commit(Hostel.objects.filter(pk__in=hostel_ids).values_list('latitude', 'longitude'))
+        match_after_commit(hostel_ids)
+        page_cache.invalidate_after_commit(hostel_ids=hostel_ids)
+
 
 class Report(models.Model):
     """Reports for fake/inappropriate hostels"""
@@ -406,6 +701,28 @@ class EmailVerification(models.Model):
         return timezone.now() > self.created_at + timedelta(hours=24)
 
 
+class HostelSubscriptionQuerySet(models.QuerySet):
+    """Lifecycle selections used by the process_subscriptions command"""
+
+    def renewable(self, today):
+        """Active auto-renewing subscriptions whose period has ended"""
+        return self.filter(status='active', auto_renew=True, subscription_end_date__lt=today)
+
+    def lapsed(self, today):
+        """Active subscriptions past their end date that will not renew"""
+        return self.filter(status='active', subscription_end_date__lt=today)
+
+    def due_soon(self, today, days):
+        """Active subscriptions ending within ``days`` that have not been notified yet"""
+        from datetime import timedelta
+        return self.filter(
+            status='active',
+            subscription_end_date__gte=today,
+            subscription_end_date__lte=today + timedelta(days=days),
+            expiry_notice_sent_at__isnull=True,
+        )
+
+
 class HostelSubscription(models.Model):
     """Track hostel subscription and payment status"""
     SUBSCRIPTION_STATUS_CHOICES = [
@@ -423,9 +740,18 @@ class HostelSubscription(models.Model):
     payment_method = models.CharField(max_length=100, blank=True, help_text="External payment method used")
     payment_reference = models.CharField(max_length=200, blank=True, help_text="External payment reference/transaction ID")
     notes = models.TextField(blank=True, help_text="Admin notes about payment status")
+    auto_renew = models.BooleanField(default=False, help_text="Extend automatically at the end of each period")
+    expiry_notice_sent_at = models.DateTimeField(null=True, blank=True, help_text="When the owner was warned about the upcoming expiry")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HostelSubscriptionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'subscription_end_date'], name='hostels_sub_status_end_idx'),
+        ]
+
     def __str__(self):
         return f"{self.hostel.name} - {self.get_status_display()}"
 
@@ -579,3 +905,307 @@ class FeaturedHistory(models.Model):
 
     def __str__(self):
         return f"{self.hostel.name} - Featured {self.start_date.date()} to {self.end_date.date()}"
+
+
+class BulkActionJob(models.Model):
+    """Bulk admin action on hostels or users, or a hostel file import, processed in chunks in the background"""
+    TARGET_CHOICES = [
+        ('hostel', 'Hostels'),
+        ('user', 'Users'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    action = models.CharField(max_length=20)
+    selection = models.JSONField(default=dict, help_text="Explicit IDs, the list filters to match, or the import file and options")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    affected = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='bulk_action_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text="Last progress of the worker running the job")
+    cursor = models.CharField(max_length=64, blank=True, help_text="Primary key (or import file line) of the last row processed")
+    report = models.JSONField(default=dict, blank=True, help_text="Import report: row counts and row errors")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.action} {self.get_target_display().lower()} - {self.get_status_display()}"
+
+    @property
+    def progress(self):
+        """Percentage of the selection processed so far"""
+        if self.status == 'completed' or not self.total:
+            return 100 if self.status == 'completed' else 0
+        return min(100, round(self.processed * 100 / self.total))
+
+
+class Locality(models.Model):
+    """A city, area or landmark extracted from hostel addresses (hostels.localities)"""
+    KIND_CHOICES = [
+        ('city', 'City'),
+        ('area', 'Area'),
+        ('landmark', 'Landmark'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.SlugField(max_length=200, help_text="Normalized name used for matching and autocomplete")
+    name = models.CharField(max_length=200)
+    city = models.CharField(max_length=100, blank=True)
+    hostel_count = models.PositiveIntegerField(default=0, help_text="Listed hostels in this locality")
+    hostels = models.ManyToManyField(Hostel, through='HostelLocality', related_name='localities')
+
+    class Meta:
+        verbose_name_plural = "Localities"
+        ordering = ['-hostel_count', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'key'], name='hostels_locality_kind_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', '-hostel_count'], name='hostels_locality_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_kind_display()})"
+
+    @property
+    def location(self):
+        return self.city
+
+    def get_absolute_url(self):
+        from urllib.parse import urlencode
+        return f"{reverse('hostels:hostel_list')}?{urlencode({'q': self.name})}"
+
+
+class HostelLocality(models.Model):
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='hostel_localities')
+    locality = models.ForeignKey(Locality, on_delete=models.CASCADE, related_name='hostel_localities')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hostel', 'locality'], name='hostels_hostellocality_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.hostel.name} - {self.locality.name}"
+
+
+class MapCluster(models.Model):
+    """Hostel marker group for one grid cell at one map zoom level (hostels.map_clusters)"""
+    zoom = models.PositiveSmallIntegerField()
+    cell_x = models.PositiveIntegerField()
+    cell_y = models.PositiveIntegerField()
+    hostel_count = models.PositiveIntegerField()
+    # Sums rather than means so parent cells can be built from their children
+    latitude_sum = models.FloatField()
+    longitude_sum = models.FloatField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    hostel = models.ForeignKey(Hostel, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+                               help_text="The hostel, for single-hostel cells")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['zoom', 'cell_x', 'cell_y'], name='hostels_mapcluster_cell_uniq'),
+        ]
+
+    def __str__(self):
+        return f"z{self.zoom} ({self.cell_x}, {self.cell_y}): {self.hostel_count} hostels"
+
+    @property
+    def latitude(self):
+        return self.latitude_sum / self.hostel_count
+
+    @property
+    def longitude(self):
+        return self.longitude_sum / self.hostel_count
+
+
+class Landmark(models.Model):
+    """A university, school or workplace students search hostels near (hostels.landmarks)"""
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200, unique=True)
+    city = models.CharField(max_length=100, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    aliases = models.CharField(max_length=300, blank=True, help_text="Other names, separated by semicolons")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from .landmarks import refresh_after_commit
+
+        if not self.slug:
+            self.slug = slugify(self.name)[:200]
+        super().save(*args, **kwargs)
+        refresh_after_commit(landmark_ids=[self.pk])
+
+    @classmethod
+    def resolve(cls, text):
+        """The landmark named ``text`` (by slug, name or alias), or None"""
+        key = slugify(text or '')
+        if not key:
+            return None
+        candidates = cls.objects.filter(
+            models.Q(slug=key) | models.Q(name__iexact=text.strip()) | models.Q(aliases__icontains=text.strip())
+        )
+        for landmark in candidates:
+            names = [landmark.slug, landmark.name, *landmark.aliases.split(';')]
+            if key in {slugify(name) for name in names}:
+                return landmark
+        return None
+
+
+class HostelLandmarkDistance(models.Model):
+    """Straight-line distance from a hostel to a landmark within the cutoff radius"""
+    landmark = models.ForeignKey(Landmark, on_delete=models.CASCADE, related_name='hostel_distances')
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='landmark_distances')
+    distance_km = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hostel', 'landmark'], name='hostels_landmarkdistance_uniq'),
+        ]
+        indexes = [
+            # "Within X km of landmark Y, nearest first" is a range scan on this index
+            models.Index(fields=['landmark', 'distance_km'], name='hostels_landmark_dist_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hostel.name} - {self.landmark.name}: {self.distance_km:.2f} km"
+
+
+class SavedSearch(models.Model):
+    """A student's saved HostelListView filters, alerted on new matches (hostels.saved_searches)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100)
+    params = models.JSONField(default=dict, help_text="Canonical hostel list filter parameters")
+    landmark = models.ForeignKey(
+        Landmark, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="The landmark the landmark filter resolved to when saved"
+    )
+    # Distinct indexed predicates; a hostel matches when it satisfies all of them
+    predicate_count = models.PositiveSmallIntegerField(default=0, editable=False)
+    is_active = models.BooleanField(default=True, help_text="Send alerts for new matches")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = "saved searches"
+
+    def __str__(self):
+        return f"{self.name} - {self.user.username}"
+
+    def save(self, *args, **kwargs):
+        from .saved_searches import index_search
+
+        with transaction.atomic(using=kwargs.get('using')):
+            self.landmark = Landmark.resolve(self.params.get('landmark'))
+            super().save(*args, **kwargs)
+            index_search(self)
+
+    def get_absolute_url(self):
+        from urllib.parse import urlencode
+        return f"{reverse('hostels:hostel_list')}?{urlencode(self.params, doseq=True)}"
+
+
+class SavedSearchTerm(models.Model):
+    """Inverted index entry: saved searches that accept ``value`` for predicate ``key``"""
+    KEY_CHOICES = [
+        ('facility', 'Facility'),
+        ('gender', 'Gender type'),
+        ('room_type', 'Room type'),
+        ('price_band', 'Price band'),
+        ('landmark', 'Landmark'),
+    ]
+
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='terms')
+    key = models.CharField(max_length=20, choices=KEY_CHOICES)
+    value = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'key', 'value'], name='hostels_searchterm_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['key', 'value'], name='hostels_searchterm_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+
+class SavedSearchMatch(models.Model):
+    """A hostel a saved search has already alerted about"""
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'hostel'], name='hostels_searchmatch_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.saved_search.name} - {self.hostel.name}"
+
+
+class SimilarHostel(models.Model):
+    """Precomputed nearest neighbours of a hostel, best first (hostels.similarity)"""
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='similar_hostels')
+    similar = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(help_text="Similarity from 0 to 1")
+
+    class Meta:
+        ordering = ['hostel', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['hostel', 'rank'], name='hostels_similarhostel_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.hostel.name} ~ {self.similar.name} ({self.score:.2f})"
+
+
+class JobState(models.Model):
+    """Progress of an incremental batch job: the last event id it has consumed"""
+    name = models.CharField(max_length=50, unique=True)
+    watermark = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.watermark}"
+
+
+class CoView(models.Model):
+    """How many browsing sessions viewed both hostels; stored in both directions (hostels.coviews)"""
+    hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='co_views')
+    other = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='+')
+    sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hostel', 'other'], name='hostels_coview_uniq'),
+        ]
+        indexes = [
+            # "Students also viewed": the top rows of one hostel
+            models.Index(fields=['hostel', '-sessions'], name='hostels_coview_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.hostel.name} + {self.other.name}: {self.sessions}"
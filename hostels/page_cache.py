@@ -0,0 +1,169 @@
+"""
+Full-page cache for anonymous visitors.
+
+Views opt in with a ``page_cache_tags`` attribute: tag templates formatted
+with the URL kwargs, e.g. ``('hostel:{slug}',)``. PageCacheMiddleware
+(hostels.middleware) serves anonymous GET and HEAD requests for those
+views from the cache, keyed by host, path and normalized query string.
+
+Each tag has a version token in the cache, starting with the time it was
+made. A page is stored with the versions its tags had before it was
+rendered, and is only served while they are unchanged, so ``invalidate``
+just replaces the tokens: the ``listings`` tag (home and list pages) and
+the ``hostel:<slug>`` tag of each changed hostel. Hostel, review, room
+type and image writes call ``invalidate_after_commit``. Derived data
+(rank and trending scores, similar hostels) refreshes within
+``PAGE_CACHE_TIMEOUT``.
+
+The parts of a page that differ per visitor are punched out before it
+is stored: the CSRF token is replaced with a placeholder and the messages
+block with an empty marker; both are filled in for every response served.
+A hostel page served from the cache still records its HostelView, and
+its stored ETag and Last-Modified (hostels.conditional) still answer
+conditional requests with 304.
+"""
+import hashlib
+import re
+import time
+import uuid
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+LISTINGS_TAG = 'listings'
+# Query parameters that never change the page
+TRACKING_PARAMS = {'fbclid', 'gclid', 'msclkid'}
+
+CSRF_PLACEHOLDER = 'page-cache-csrf-token'
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+MESSAGES_START = b'<!-- page-cache:messages -->'
+MESSAGES_END = b'<!-- /page-cache:messages -->'
+MESSAGES_BLOCK = re.compile(re.escape(MESSAGES_START) + rb'.*?' + re.escape(MESSAGES_END), re.DOTALL)
+MESSAGES_TEMPLATE = 'hostels/messages.html'
+# Response headers kept with a cached page; the rest are set again by the middleware
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+def hostel_tag(slug):
+    return f'hostel:{slug}'
+
+
+def view_tags(view_func, view_kwargs):
+    """The tags of a cacheable view, or None if the view is not cached"""
+    templates = getattr(getattr(view_func, 'view_class', None), 'page_cache_tags', None)
+    if templates is None:
+        return None
+    return [template.format(**view_kwargs) for template in templates]
+
+
+def page_key(request):
+    """Cache key for a request's page; parameter order and tracking parameters do not matter"""
+    params = sorted(
+        (name, value) for name, value in parse_qsl(request.META.get('QUERY_STRING', ''))
+        if name not in TRACKING_PARAMS and not name.startswith('utm_')
+    )
+    url = f'{request.get_host()}{request.path}?{urlencode(params)}'
+    return f'page-cache:page:{hashlib.sha1(url.encode()).hexdigest()}'
+
+
+def tag_key(tag):
+    return f'page-cache:tag:{tag}'
+
+
+def new_version():
+    return f'{time.time():.6f}:{uuid.uuid4().hex[:12]}'
+
+
+def version_time(version):
+    """When a version token was made, as a Unix timestamp"""
+    return float(version.partition(':')[0])
+
+
+def tag_versions(tags):
+    """Current version tokens of ``tags``, in order; tags never seen get one"""
+    keys = [tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    for key in missing:
+        cache.add(key, new_version(), None)
+    if missing:
+        # Another process may have added the token first
+        versions.update(cache.get_many(missing))
+    return tuple(versions.get(key) for key in keys)
+
+
+def invalidate(slugs=()):
+    """Expire the listing pages and the pages of the hostels with ``slugs``"""
+    tags = [LISTINGS_TAG] + [hostel_tag(slug) for slug in slugs]
+    cache.set_many({tag_key(tag): new_version() for tag in tags}, None)
+
+
+def invalidate_after_commit(hostel_ids=(), slugs=()):
+    """Invalidate once the current transaction commits; hostel slugs are looked up now"""
+    from .models import Hostel
+
+    slugs = list(slugs)
+    hostel_ids = list(hostel_ids)
+    if hostel_ids:
+        slugs += Hostel.objects.filter(pk__in=hostel_ids).values_list('slug', flat=True)
+    transaction.on_commit(lambda: invalidate(slugs))
+
+
+def store(request, response, key, versions):
+    """Cache a rendered page with its per-visitor parts punched out"""
+    if (
+        response.status_code != 200
+        or response.streaming
+        or 'private' in response.get('Cache-Control', '')
+        or any(name != settings.CSRF_COOKIE_NAME for name in response.cookies)
+    ):
+        return
+    content = response.content
+    match = CSRF_INPUT.search(content)
+    if match:
+        content = content.replace(match.group(1), CSRF_PLACEHOLDER.encode())
+    content = MESSAGES_BLOCK.sub(MESSAGES_START + MESSAGES_END, content)
+    cache.set(key, {
+        'content': content,
+        'headers': {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+        'versions': versions,
+        'csrf': bool(match) or settings.CSRF_COOKIE_NAME in response.cookies,
+        'viewed_hostel_id': getattr(request, 'viewed_hostel_id', None),
+    }, settings.PAGE_CACHE_TIMEOUT)
+    response['X-Page-Cache'] = 'miss'
+
+
+def serve(request, key, versions):
+    """The cached page for ``key`` if its tags still have ``versions``, else None"""
+    from . import events
+
+    entry = cache.get(key)
+    if entry is None or entry['versions'] != versions:
+        return None
+
+    content = entry['content']
+    if entry['csrf']:
+        # Also sets the CSRF cookie, as rendering the page did
+        content = content.replace(CSRF_PLACEHOLDER.encode(), get_token(request).encode())
+    storage = get_messages(request)
+    if len(storage):
+        messages = render_to_string(MESSAGES_TEMPLATE, {'messages': storage}, request=request)
+        content = content.replace(MESSAGES_START, MESSAGES_START + messages.encode(), 1)
+
+    if entry['viewed_hostel_id']:
+        events.record_hostel_view(request, entry['viewed_hostel_id'])
+
+    response = HttpResponse(content)
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response['X-Page-Cache'] = 'hit'
+    last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+    return get_conditional_response(request, etag=response.get('ETag'), last_modified=last_modified, response=response)
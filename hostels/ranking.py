@@ -0,0 +1,126 @@
+"""
+Relevance score behind the default "featured" listing order.
+
+Each hostel's ``rank_score`` combines, with the weights below:
+
+- its approved-review rating, smoothed towards the site-wide average as if
+  every hostel had ``PRIOR_REVIEWS`` extra average reviews, so one 5-star
+  review does not beat fifty 4.6-star ones;
+- popularity: views and contact reveals, each event decaying with a
+  ``POPULARITY_HALF_LIFE_DAYS`` half-life, on a log scale relative to the
+  most popular hostel;
+- freshness: a ``RECENCY_HALF_LIFE_DAYS`` half-life on the listing's age;
+- ``FEATURED_BOOST`` for featured hostels, as large as every other part
+  together so paid placement still comes first.
+
+``rebuild`` computes every score with NumPy and writes them to the indexed
+``Hostel.rank_score`` column; the list view then orders by it directly.
+Between rebuilds, a new hostel starts with ``initial_score`` (the average
+rating, no events yet, full freshness) and a featured change adds or
+removes ``FEATURED_BOOST`` (``boost_featured``), so neither waits for the
+next rebuild to move in the default order.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ContactReveal, Hostel, HostelView, Review
+
+PRIOR_REVIEWS = 5
+POPULARITY_HALF_LIFE_DAYS = 14
+# Older events are ignored; they would have decayed below 3% anyway
+POPULARITY_WINDOW_DAYS = 70
+# One contact reveal shows as much interest as this many views
+REVEAL_WEIGHT = 5
+RECENCY_HALF_LIFE_DAYS = 30
+
+RATING_WEIGHT = 0.4
+POPULARITY_WEIGHT = 0.4
+RECENCY_WEIGHT = 0.2
+FEATURED_BOOST = 1.0
+
+
+def decay(age_days, half_life):
+    return np.power(0.5, np.maximum(age_days, 0) / half_life)
+
+
+def decayed_events(model, index, today, weight=1.0):
+    """Per-hostel event counts with each day's events decayed by their age"""
+    totals = np.zeros(len(index))
+    since = timezone.now() - timedelta(days=POPULARITY_WINDOW_DAYS)
+    daily = (
+        model.objects.filter(timestamp__gte=since).order_by()
+        .annotate(day=TruncDate('timestamp')).values_list('hostel_id', 'day')
+        .annotate(events=Count('pk'))
+    )
+    rows = [(index[hostel], (today - day).days, events) for hostel, day, events in daily if hostel in index]
+    if rows:
+        positions, ages, events = (np.array(column) for column in zip(*rows))
+        np.add.at(totals, positions, events * decay(ages, POPULARITY_HALF_LIFE_DAYS) * weight)
+    return totals
+
+
+def compute_scores():
+    """``(hostel ids, scores)`` for every hostel"""
+    hostels = list(Hostel.objects.order_by('pk').values_list('pk', 'created_at', 'is_featured'))
+    if not hostels:
+        return [], np.zeros(0)
+    ids, created, featured = zip(*hostels)
+    index = {pk: position for position, pk in enumerate(ids)}
+    now = timezone.now()
+    today = timezone.localdate(now)
+
+    # Bayesian average of approved ratings
+    rating_sum, rating_count = np.zeros(len(ids)), np.zeros(len(ids))
+    for hostel, total, count in (
+        Review.objects.filter(is_approved=True).order_by().values_list('hostel_id')
+        .annotate(total=Sum('rating'), count=Count('pk'))
+    ):
+        if hostel in index:
+            rating_sum[index[hostel]], rating_count[index[hostel]] = total, count
+    prior = rating_sum.sum() / rating_count.sum() if rating_count.sum() else 3.0
+    rating = (prior * PRIOR_REVIEWS + rating_sum) / (PRIOR_REVIEWS + rating_count) / 5
+
+    interest = decayed_events(HostelView, index, today) + decayed_events(ContactReveal, index, today, REVEAL_WEIGHT)
+    popularity = np.log1p(interest)
+    if popularity.max() > 0:
+        popularity /= popularity.max()
+
+    age_days = np.array([(now - timestamp).total_seconds() / 86400 for timestamp in created])
+    recency = decay(age_days, RECENCY_HALF_LIFE_DAYS)
+
+    scores = (
+        RATING_WEIGHT * rating
+        + POPULARITY_WEIGHT * popularity
+        + RECENCY_WEIGHT * recency
+        + FEATURED_BOOST * np.array(featured, dtype=float)
+    )
+    return list(ids), np.round(scores, 6)
+
+
+def initial_score(featured=False):
+    """The score ``compute_scores`` gives a hostel listed just now, without reviews or events"""
+    prior = Review.objects.filter(is_approved=True).aggregate(average=Avg('rating'))['average'] or 3.0
+    return round(RATING_WEIGHT * prior / 5 + RECENCY_WEIGHT + FEATURED_BOOST * featured, 6)
+
+
+def boost_featured(hostels, featured):
+    """Move the scores of the ``hostels`` whose featured flag is about to become ``featured``"""
+    boost = FEATURED_BOOST if featured else -FEATURED_BOOST
+    return hostels.exclude(is_featured=featured).update(rank_score=F('rank_score') + boost)
+
+
+def rebuild(batch_size=1000):
+    """Recompute and store every hostel's rank_score; return the number of hostels scored"""
+    ids, scores = compute_scores()
+    with transaction.atomic():
+        Hostel.objects.bulk_update(
+            [Hostel(pk=pk, rank_score=score) for pk, score in zip(ids, scores.tolist())],
+            ['rank_score'],
+            batch_size=batch_size,
+        )
+    return len(ids)
@@ -0,0 +1,315 @@
+"""
+Saved search alerts.
+
+A SavedSearch stores the HostelListView filters a student searched with.
+Its indexable predicates (facility, gender type, room type, price band,
+landmark) are written to SavedSearchTerm as ``(key, value)`` rows, one per
+accepted value, so a predicate with several accepted values (any of the
+selected facilities, every price band in the range) is a disjunction.
+
+When hostels are verified or their prices change, ``match_hostels`` turns
+each hostel into the terms it satisfies, looks them up in the index with
+one query, and keeps the searches for which every predicate was hit. Only
+those candidates are checked against the remaining filters (text query,
+exact price and distance bounds, rating) in Python. New matches are
+recorded in SavedSearchMatch, so a search alerts about a hostel once, and
+each search gets one Notification per run, all written with bulk_create.
+"""
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Avg, Q
+
+from .models import (
+    Hostel, HostelFacility, HostelLandmarkDistance, Notification, RoomType,
+    SavedSearch, SavedSearchMatch, SavedSearchTerm,
+)
+
+logger = logging.getLogger(__name__)
+
+# HostelListView filters a saved search keeps; sort and page are dropped
+SEARCH_PARAMS = (
+    'q', 'landmark', 'max_distance', 'min_price', 'max_price',
+    'facilities', 'room_type', 'gender_type', 'min_rating',
+)
+DECIMAL_PARAMS = ('max_distance', 'min_price', 'max_price')
+
+# Monthly rent per price band (PKR); everything from TOP_BAND up shares the last band
+PRICE_BAND = 2500
+TOP_BAND = 40
+
+# Most hostels listed in one notification before "and N more"
+NOTIFICATION_HOSTELS = 3
+
+
+def canonical_params(query):
+    """The saved-search filters of a QueryDict, normalized so equal searches compare equal"""
+    params = {}
+    for name in SEARCH_PARAMS:
+        if name == 'facilities':
+            facilities = sorted({int(value) for value in query.getlist(name) if value.isdigit()})
+            if facilities:
+                params[name] = [str(value) for value in facilities]
+            continue
+        value = (query.get(name) or '').strip()
+        if not value:
+            continue
+        if name in DECIMAL_PARAMS:
+            try:
+                number = Decimal(value)
+            except InvalidOperation:
+                continue
+            if not number.is_finite():
+                # NaN and Infinity parse, but no filter can compare with them
+                continue
+            # Fixed-point: normalize() alone writes 15000 as '1.5E+4'
+            value = format(number.normalize(), 'f')
+        elif name == 'min_rating' and not value.isdigit():
+            continue
+        params[name] = value
+    return params
+
+
+def describe(params):
+    """A short default name for a saved search"""
+    parts = [params.get('q'), params.get('landmark') and f"near {params['landmark']}"]
+    if params.get('max_price'):
+        parts.append(f"under ₨{params['max_price']}")
+    return ', '.join(part for part in parts if part)[:100] or 'All hostels'
+
+
+def price_band(price):
+    return min(int(price // PRICE_BAND), TOP_BAND)
+
+
+def decimal_param(params, name):
+    value = params.get(name)
+    return Decimal(value) if value else None
+
+
+def search_terms(search):
+    """The ``(key, value)`` index terms of a saved search"""
+    params = search.params
+    terms = [('facility', facility) for facility in params.get('facilities', ())]
+    if params.get('gender_type'):
+        terms.append(('gender', params['gender_type']))
+    if params.get('room_type'):
+        terms.append(('room_type', params['room_type']))
+
+    min_price, max_price = decimal_param(params, 'min_price'), decimal_param(params, 'max_price')
+    if min_price is not None or max_price is not None:
+        low = price_band(min_price) if min_price is not None else 0
+        high = price_band(max_price) if max_price is not None else TOP_BAND
+        terms += [('price_band', str(band)) for band in range(low, high + 1)]
+
+    if search.landmark_id:
+        terms.append(('landmark', str(search.landmark_id)))
+    return terms
+
+
+def index_search(search):
+    """Rewrite the index terms of a saved search; call inside the transaction that saves it"""
+    terms = search_terms(search)
+    SavedSearchTerm.objects.filter(saved_search=search).delete()
+    SavedSearchTerm.objects.bulk_create(
+        [SavedSearchTerm(saved_search=search, key=key, value=value) for key, value in terms]
+    )
+    predicate_count = len({key for key, _ in terms})
+    if search.predicate_count != predicate_count:
+        search.predicate_count = predicate_count
+        SavedSearch.objects.filter(pk=search.pk).update(predicate_count=predicate_count)
+
+
+@dataclass
+class Listing:
+    """What the matcher needs to know about one searchable hostel"""
+    pk: object
+    name: str
+    text: str
+    nearby_landmark: str
+    landmark_distance: Decimal
+    gender_type: str
+    rating: float = None
+    prices: list = field(default_factory=list)
+    room_types: set = field(default_factory=set)
+    facilities: set = field(default_factory=set)
+    # landmark pk -> measured distance in km
+    landmarks: dict = field(default_factory=dict)
+
+    def terms(self):
+        terms = {('gender', self.gender_type)}
+        terms.update(('facility', str(facility)) for facility in self.facilities)
+        terms.update(('room_type', room_type) for room_type in self.room_types)
+        terms.update(('price_band', str(price_band(price))) for price in self.prices)
+        terms.update(('landmark', str(landmark)) for landmark in self.landmarks)
+        return terms
+
+
+def load_listings(hostel_ids):
+    """Listings for the searchable hostels among ``hostel_ids``, five queries in all"""
+    hostels = (
+        Hostel.objects.searchable().filter(pk__in=hostel_ids).order_by()
+        .annotate(rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True)))
+        .values_list('pk', 'name', 'address', 'nearby_landmark', 'landmark_distance', 'gender_type', 'rating')
+    )
+    listings = {
+        pk: Listing(
+            pk=pk, name=name, text=f'{name}\n{address}\n{landmark}'.lower(), nearby_landmark=landmark.lower(),
+            landmark_distance=distance, gender_type=gender_type, rating=rating,
+        )
+        for pk, name, address, landmark, distance, gender_type, rating in hostels
+    }
+    if not listings:
+        return listings
+
+    for hostel_id, room_type, price in RoomType.objects.filter(hostel__in=listings).values_list(
+        'hostel_id', 'type', 'price'
+    ):
+        listings[hostel_id].room_types.add(room_type)
+        listings[hostel_id].prices.append(price)
+    for hostel_id, facility_id in HostelFacility.objects.filter(hostel__in=listings).values_list(
+        'hostel_id', 'facility_id'
+    ):
+        listings[hostel_id].facilities.add(facility_id)
+    for hostel_id, landmark_id, distance in HostelLandmarkDistance.objects.filter(hostel__in=listings).values_list(
+        'hostel_id', 'landmark_id', 'distance_km'
+    ):
+        listings[hostel_id].landmarks[landmark_id] = distance
+    return listings
+
+
+def accepts(search, listing):
+    """Check a candidate against the filters the index does not decide exactly"""
+    params = search.params
+    query = params.get('q', '').lower()
+    if query and query not in listing.text:
+        return False
+
+    max_distance = decimal_param(params, 'max_distance')
+    if search.landmark_id:
+        distance = listing.landmarks.get(search.landmark_id)
+        if distance is None or (max_distance is not None and distance > max_distance):
+            return False
+    else:
+        landmark = params.get('landmark', '').lower()
+        if landmark and landmark not in listing.nearby_landmark:
+            return False
+        if max_distance is not None and (listing.landmark_distance is None or listing.landmark_distance > max_distance):
+            return False
+
+    min_price, max_price = decimal_param(params, 'min_price'), decimal_param(params, 'max_price')
+    if min_price is not None or max_price is not None:
+        if not any(
+            (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+            for price in listing.prices
+        ):
+            return False
+
+    min_rating = params.get('min_rating')
+    if min_rating and (listing.rating is None or listing.rating < int(min_rating)):
+        return False
+    return True
+
+
+def candidate_searches(listings):
+    """Map each hostel to the active searches whose every indexed predicate it satisfies"""
+    hostel_terms = {pk: listing.terms() for pk, listing in listings.items()}
+    values_by_key = defaultdict(set)
+    for terms in hostel_terms.values():
+        for key, value in terms:
+            values_by_key[key].add(value)
+
+    # One index lookup for every term any of the hostels satisfies
+    postings = defaultdict(set)
+    lookup = reduce(or_, (Q(key=key, value__in=values) for key, values in values_by_key.items()))
+    for key, value, search_id in SavedSearchTerm.objects.filter(lookup, saved_search__is_active=True).values_list(
+        'key', 'value', 'saved_search_id'
+    ):
+        postings[(key, value)].add(search_id)
+
+    satisfied = {}
+    for pk, terms in hostel_terms.items():
+        keys = defaultdict(set)
+        for term in terms:
+            for search_id in postings.get(term, ()):
+                keys[search_id].add(term[0])
+        satisfied[pk] = keys
+
+    # Searches without indexed predicates (text query only) are candidates for every hostel
+    hit_ids = set().union(*(keys.keys() for keys in satisfied.values()))
+    searches = list(SavedSearch.objects.filter(Q(pk__in=hit_ids) | Q(predicate_count=0), is_active=True))
+    return {
+        pk: [search for search in searches if len(keys.get(search.pk, ())) == search.predicate_count]
+        for pk, keys in satisfied.items()
+    }
+
+
+def match_hostels(hostel_ids, batch_size=1000):
+    """Alert saved searches about the given hostels; return the number of new matches"""
+    listings = load_listings(list(hostel_ids))
+    if not listings:
+        return 0
+
+    found = {
+        (search, pk)
+        for pk, searches in candidate_searches(listings).items()
+        for search in searches
+        if accepts(search, listings[pk])
+    }
+    if not found:
+        return 0
+
+    with transaction.atomic():
+        known = set(
+            SavedSearchMatch.objects.filter(
+                saved_search__in={search.pk for search, _ in found}, hostel__in={pk for _, pk in found}
+            ).values_list('saved_search_id', 'hostel_id')
+        )
+        new = sorted(
+            ((search, pk) for search, pk in found if (search.pk, pk) not in known),
+            key=lambda match: (match[0].pk, listings[match[1]].name),
+        )
+        if not new:
+            return 0
+        SavedSearchMatch.objects.bulk_create(
+            [SavedSearchMatch(saved_search=search, hostel_id=pk) for search, pk in new],
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+
+        by_search = defaultdict(list)
+        for search, pk in new:
+            by_search[search].append(listings[pk].name)
+        Notification.objects.bulk_create(
+            [notification(search, names) for search, names in by_search.items()],
+            batch_size=batch_size,
+        )
+    return len(new)
+
+
+def notification(search, names):
+    shown = ', '.join(f'"{name}"' for name in names[:NOTIFICATION_HOSTELS])
+    more = len(names) - NOTIFICATION_HOSTELS
+    return Notification(
+        user_id=search.user_id,
+        title=f'New hostels for "{search.name}"',
+        message=f'{shown} {f"and {more} more " if more > 0 else ""}now match{"es" if len(names) == 1 else ""} your saved search.',
+        notification_type='info',
+    )
+
+
+def match_after_commit(hostel_ids):
+    hostel_ids = list(hostel_ids)
+
+    def run():
+        try:
+            match_hostels(hostel_ids)
+        except Exception:
+            # Alerts must never break the write that triggered them
+            logger.exception('Saved search matching failed for %d hostels', len(hostel_ids))
+
+    transaction.on_commit(run)
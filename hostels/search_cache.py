@@ -0,0 +1,87 @@
+"""
+Cached hostel list results.
+
+HostelListView filters with ``saved_searches.canonical_params``, so equal
+searches written differently (facility order, ``15000`` and ``15000.00``,
+stray whitespace) have one canonical form. Each canonical search and sort
+caches its ordered hostel ids for ``SEARCH_CACHE_TIMEOUT`` seconds, and
+each page is a slice of that list: only the page's rows are loaded, with
+the view's own annotations.
+
+Prices are keyed as searched, not by price band: filtering a banded id
+list down to the exact prices would leave pages short and the cached count
+wrong, so nearby prices do not share an entry.
+
+The key includes the version token of the page cache ``listings`` tag,
+which every hostel, review, room type and image change replaces (see
+hostels.page_cache), so a change expires every cached search at once.
+
+At most ``SEARCH_CACHE_MAX_IDS`` ids are kept; pages beyond them are
+queried directly, as is every page when ``SEARCH_CACHE_TIMEOUT`` is 0. A hostel appears once, at its first position, even when
+a sort across room types returns it once per room type.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import page_cache
+
+
+def cache_key(params, sort):
+    (version,) = page_cache.tag_versions([page_cache.LISTINGS_TAG])
+    search = json.dumps([params, sort], sort_keys=True)
+    return f'hostel-list:{hashlib.sha1(f"{version}|{search}".encode()).hexdigest()}'
+
+
+def first_ids(queryset, limit):
+    """Up to ``limit`` distinct ids of ``queryset``, in its order"""
+    ids = []
+    seen = set()
+    # Ids only: the card prefetches are for the page's rows
+    for pk in queryset.prefetch_related(None).values_list('pk', flat=True).iterator():
+        if pk not in seen:
+            seen.add(pk)
+            ids.append(pk)
+            if len(ids) == limit:
+                break
+    return ids
+
+
+class CachedResults:
+    """The results of a list queryset as a cached id list, for Paginator.
+
+    Slicing loads only the sliced rows, in the cached order.
+    """
+
+    def __init__(self, queryset, params, sort):
+        self.queryset = queryset
+        key = cache_key(params, sort)
+        entry = cache.get(key)
+        if entry is None:
+            limit = settings.SEARCH_CACHE_MAX_IDS
+            ids = first_ids(queryset, limit + 1)
+            # One id past the limit tells whether the list is complete
+            count = len(ids) if len(ids) <= limit else queryset.count()
+            entry = {'ids': ids[:limit], 'count': count}
+            cache.set(key, entry, settings.SEARCH_CACHE_TIMEOUT)
+        self.ids = entry['ids']
+        self.total = entry['count']
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        stop = self.total if index.stop is None else index.stop
+        if stop > len(self.ids):
+            return list(self.queryset[index])
+        ids = self.ids[index]
+        rows = {hostel.pk: hostel for hostel in self.queryset.order_by().filter(pk__in=ids)}
+        # Hostels delisted since the list was cached are left out
+        return [rows[pk] for pk in ids if pk in rows]
@@ -0,0 +1,143 @@
+"""
+"Similar hostels" recommendations.
+
+Every listed hostel is encoded as a feature vector: its facilities as a
+bitset, the log of its lowest room price, its gender type one-hot, its
+position in km and its approved-review rating. Each part is scaled so
+that one unit of distance means roughly the same difference everywhere:
+``LOCATION_SCALE_KM`` apart, one facility more or less, and so on.
+
+``rebuild`` finds each hostel's ``NEIGHBOURS`` nearest vectors with NumPy,
+one block of rows against the whole matrix at a time, and stores them in
+SimilarHostel, which the detail page reads with one indexed query.
+Missing prices, positions and ratings are filled with the average, so a
+hostel is neither pulled towards nor pushed from others by what it lacks.
+"""
+import math
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Min, Q
+
+from .models import Hostel, HostelFacility, SimilarHostel
+
+# Neighbours stored per hostel; the detail page shows the first few still listed
+NEIGHBOURS = 12
+
+# Weight of one differing facility
+FACILITY_WEIGHT = 0.5
+# Weight of one standard deviation of log price
+PRICE_WEIGHT = 1.0
+# Different gender types are this far apart
+GENDER_WEIGHT = 1.5
+# Hostels this far apart count as one unit
+LOCATION_SCALE_KM = 3.0
+# Weight of a full star of rating
+RATING_WEIGHT = 0.5
+
+GENDER_TYPES = [value for value, _ in Hostel._meta.get_field('gender_type').choices]
+KM_PER_DEGREE = 111.2
+
+
+def listed_hostels():
+    return (
+        Hostel.objects.searchable().order_by('pk')
+        .annotate(
+            lowest_price=Min('room_types__price'),
+            rating=Avg('reviews__rating', filter=Q(reviews__is_approved=True)),
+        )
+        .values_list('pk', 'gender_type', 'latitude', 'longitude', 'lowest_price', 'rating')
+    )
+
+
+def filled(values):
+    """Float column with missing values replaced by the column mean"""
+    column = np.array([np.nan if value is None else float(value) for value in values])
+    known = ~np.isnan(column)
+    column[~known] = column[known].mean() if known.any() else 0.0
+    return column
+
+
+def feature_matrix(rows, facility_rows):
+    """``(hostel ids, matrix)`` for ``listed_hostels()`` rows and ``(hostel, facility)`` pairs"""
+    ids = [row[0] for row in rows]
+    index = {pk: position for position, pk in enumerate(ids)}
+    _, genders, latitudes, longitudes, prices, ratings = zip(*rows)
+
+    facility_columns = {}
+    pairs = [(index[hostel], facility_columns.setdefault(facility, len(facility_columns)))
+             for hostel, facility in facility_rows if hostel in index]
+    facilities = np.zeros((len(ids), len(facility_columns)))
+    if pairs:
+        facilities[tuple(np.array(pairs).T)] = 1.0
+
+    log_price = np.log(np.maximum(filled(prices), 1.0))
+    price = (log_price - log_price.mean()) / (log_price.std() or 1.0)
+
+    gender = np.zeros((len(ids), len(GENDER_TYPES)))
+    for position, value in enumerate(genders):
+        if value in GENDER_TYPES:
+            gender[position, GENDER_TYPES.index(value)] = 1.0
+
+    latitude, longitude = filled(latitudes), filled(longitudes)
+    # Equirectangular km from the centroid; plenty within a city, and centred
+    # so the squared norms in nearest() stay small
+    y = (latitude - latitude.mean()) * KM_PER_DEGREE
+    x = (longitude - longitude.mean()) * KM_PER_DEGREE * math.cos(math.radians(latitude.mean()))
+
+    matrix = np.hstack([
+        facilities * FACILITY_WEIGHT,
+        price[:, np.newaxis] * PRICE_WEIGHT,
+        # One-hot vectors of different types are sqrt(2) apart
+        gender * GENDER_WEIGHT / math.sqrt(2),
+        np.column_stack([x, y]) / LOCATION_SCALE_KM,
+        filled(ratings)[:, np.newaxis] * RATING_WEIGHT,
+    ])
+    return ids, matrix
+
+
+def nearest(matrix, k, block_size=256):
+    """Yield ``(row, neighbour rows, distances)`` for each row, nearest first.
+
+    Memory peaks at one ``block_size`` x ``len(matrix)`` distance matrix.
+    """
+    k = min(k, len(matrix) - 1)
+    if k < 1:
+        return
+    squared_norms = (matrix ** 2).sum(axis=1)
+    for start in range(0, len(matrix), block_size):
+        block = matrix[start:start + block_size]
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab for the whole block at once
+        distances = squared_norms[start:start + len(block), np.newaxis] + squared_norms - 2 * block @ matrix.T
+        np.maximum(distances, 0, out=distances)
+        distances[np.arange(len(block)), np.arange(start, start + len(block))] = np.inf
+
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        candidate_distances = np.take_along_axis(distances, candidates, axis=1)
+        order = np.argsort(candidate_distances, axis=1)
+        neighbours = np.take_along_axis(candidates, order, axis=1)
+        neighbour_distances = np.sqrt(np.take_along_axis(candidate_distances, order, axis=1))
+        for offset in range(len(block)):
+            yield start + offset, neighbours[offset], neighbour_distances[offset]
+
+
+def rebuild(k=NEIGHBOURS, block_size=256):
+    """Recompute every hostel's neighbours; return the number of rows stored"""
+    rows = list(listed_hostels())
+    if not rows:
+        SimilarHostel.objects.all().delete()
+        return 0
+    ids, matrix = feature_matrix(rows, HostelFacility.objects.values_list('hostel_id', 'facility_id'))
+
+    similar = [
+        SimilarHostel(
+            hostel_id=ids[row], similar_id=ids[neighbour], rank=rank,
+            score=round(1 / (1 + float(distance)), 4),
+        )
+        for row, neighbours, distances in nearest(matrix, k, block_size)
+        for rank, (neighbour, distance) in enumerate(zip(neighbours.tolist(), distances.tolist()), start=1)
+    ]
+    with transaction.atomic():
+        SimilarHostel.objects.all().delete()
+        SimilarHostel.objects.bulk_create(similar, batch_size=2000)
+    return len(similar)
@@ -0,0 +1,135 @@
+"""
+Unique slug allocation.
+
+A slug that is already taken gets the next free numeric suffix
+(``green-hostel``, ``green-hostel-2``, ``green-hostel-3``...). The suffix is
+found with a single aggregate query instead of probing candidates one by
+one. On PostgreSQL a transaction-scoped advisory lock keyed on the base
+slug serializes concurrent allocations of the same base, so two requests
+creating "Green Hostel" at once cannot both pick the same slug.
+"""
+import hashlib
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Count, IntegerField, Max, Q, Value
+from django.db.models.functions import Cast, NullIf, Substr
+from django.utils.text import slugify
+
+# Room left at the end of the field for a "-<n>" suffix
+SUFFIX_RESERVE = 10
+
+SUFFIXED_SLUG = re.compile(r'(.+)-([0-9]+)')
+
+
+def base_slug(value, max_length):
+    """Slugify ``value`` and trim it so a numeric suffix still fits"""
+    base = slugify(value)[:max_length - SUFFIX_RESERVE].strip('-')
+    return base or 'item'
+
+
+def lock_slug_bases(model, bases, using):
+    """Take PostgreSQL advisory locks on the given bases until the transaction ends.
+
+    A no-op on other databases and outside a transaction, where the lock
+    would be released as soon as it is taken.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql' or not connection.in_atomic_block:
+        return
+    with connection.cursor() as cursor:
+        # Sorted, so concurrent bulk allocations lock in the same order
+        for base in sorted(set(bases)):
+            key = f'{model._meta.db_table}.slug:{base}'
+            lock_id = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big', signed=True)
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [lock_id])
+
+
+def allocate_slug(instance, value, field='slug', using=None):
+    """Return a free slug for ``instance`` derived from ``value``.
+
+    Call inside the transaction that saves the instance; on PostgreSQL
+    that is what keeps the allocation race-safe.
+    """
+    model = type(instance)
+    using = using or instance._state.db or 'default'
+    base = base_slug(value, model._meta.get_field(field).max_length)
+    lock_slug_bases(model, [base], using)
+
+    siblings = model._base_manager.using(using).filter(
+        **{f'{field}__startswith': base, f'{field}__regex': rf'^{base}(-[0-9]+)?$'}
+    )
+    if instance.pk is not None:
+        siblings = siblings.exclude(pk=instance.pk)
+    state = siblings.aggregate(
+        base_taken=Count('pk', filter=Q(**{field: base})),
+        # NullIf keeps the bare base ('' suffix) from failing the cast
+        max_suffix=Max(
+            Cast(NullIf(Substr(field, len(base) + 2), Value('')), IntegerField()),
+            filter=~Q(**{field: base}),
+        ),
+    )
+    if not state['base_taken']:
+        return base
+    return f"{base}-{max(state['max_suffix'] or 1, 1) + 1}"
+
+
+def assign_unique_slugs(instances, source='name', field='slug', using='default', batch_size=500):
+    """Give every unsaved instance without a slug a unique one, for bulk_create().
+
+    Existing slugs are read with one query per ``batch_size`` distinct bases,
+    and instances sharing a base within the batch get consecutive suffixes.
+    Every slug assigned is checked against those already taken or assigned,
+    so a suffixed slug cannot collide with another base in the batch
+    ("green" twice and "green-2"). Call inside the transaction that inserts
+    the instances.
+    """
+    if not instances:
+        return instances
+    model = type(instances[0])
+    max_length = model._meta.get_field(field).max_length
+
+    pending = {}
+    for instance in instances:
+        if not getattr(instance, field):
+            pending.setdefault(base_slug(getattr(instance, source), max_length), []).append(instance)
+
+    # Slugs in the database under the bases read so far, and those assigned in this batch
+    used = set()
+    bases = list(pending)
+    for start in range(0, len(bases), batch_size):
+        chunk = bases[start:start + batch_size]
+        lock_slug_bases(model, chunk, using)
+
+        max_suffix = dict.fromkeys(chunk, 1)
+        taken = (
+            model._base_manager.using(using)
+            .filter(reduce(or_, (Q(**{f'{field}__startswith': base}) for base in chunk)))
+            .values_list(field, flat=True)
+        )
+        for slug in taken:
+            used.add(slug)
+            match = SUFFIXED_SLUG.fullmatch(slug)
+            if match and match.group(1) in max_suffix:
+                base = match.group(1)
+                max_suffix[base] = max(max_suffix[base], int(match.group(2)))
+
+        # Bare bases first, so "Green 2" keeps green-2 rather than a second "Green" taking it
+        for base in chunk:
+            if base not in used:
+                used.add(base)
+                setattr(pending[base][0], field, base)
+        for base in chunk:
+            suffix = max_suffix[base]
+            for instance in pending[base]:
+                if getattr(instance, field):
+                    continue
+                suffix += 1
+                while f'{base}-{suffix}' in used:
+                    suffix += 1
+                slug = f'{base}-{suffix}'
+                used.add(slug)
+                setattr(instance, field, slug)
+    return instances
@@ -0,0 +1,102 @@
+"""
+Test helpers for catching N+1 query patterns.
+
+``QueryShapeGuard`` fingerprints every query by its normalized SQL and the
+project line that issued it, and fails when one fingerprint runs more than
+``max_repeats`` times. ``NPlusOneGuardMixin`` applies the guard to every
+request made through ``self.client`` in a Django ``TestCase`` (this also
+works for TestCase classes collected by pytest).
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.test import Client
+
+from .instrumentation import QueryRecorder, normalize_sql
+
+DEFAULT_MAX_REPEATS = 3
+
+
+class RepeatedQueriesError(AssertionError):
+    """Raised when the same query shape runs too many times"""
+
+
+class QueryShapeGuard:
+    """Context manager failing when one query shape repeats more than max_repeats times"""
+
+    def __init__(self, max_repeats=DEFAULT_MAX_REPEATS, using=DEFAULT_DB_ALIAS, raise_errors=True, label=None):
+        self.max_repeats = max_repeats
+        self.raise_errors = raise_errors
+        self.label = label
+        self.recorder = QueryRecorder(using=using, capture_stack=True)
+
+    def __enter__(self):
+        self.recorder.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.raise_errors and self.violations():
+            raise RepeatedQueriesError(self.format_violations())
+
+    def violations(self):
+        """Query shapes that ran more than max_repeats times, worst first"""
+        groups = {}
+        for query in self.recorder.queries:
+            site = query['site'] or query['template']
+            key = (normalize_sql(query['sql']), site)
+            group = groups.setdefault(key, {
+                'sql': key[0], 'site': site, 'templates': set(), 'count': 0,
+            })
+            group['count'] += 1
+            if query['template']:
+                group['templates'].add(query['template'])
+
+        found = [group for group in groups.values() if group['count'] > self.max_repeats]
+        for group in found:
+            group['templates'] = sorted(group['templates'])
+        return sorted(found, key=lambda group: group['count'], reverse=True)
+
+    def format_violations(self):
+        lines = [
+            f"{self.label + ': ' if self.label else ''}"
+            f"query shapes repeated more than {self.max_repeats} times "
+            f"({self.recorder.count} queries in total)"
+        ]
+        for group in self.violations():
+            lines.append(f"  {group['count']}x at {group['site'] or 'unknown'}")
+            if group['templates']:
+                lines.append(f"     from {', '.join(group['templates'][:5])}")
+            lines.append(f"     {group['sql'][:300]}")
+        return '\n'.join(lines)
+
+
+class GuardedClient(Client):
+    """Test client that wraps every request in a QueryShapeGuard"""
+
+    def __init__(self, *args, max_repeats=DEFAULT_MAX_REPEATS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_repeats = max_repeats
+
+    def request(self, **request):
+        label = f"{request.get('REQUEST_METHOD', 'GET')} {request.get('PATH_INFO', '')}"
+        with QueryShapeGuard(self.max_repeats, label=label):
+            return super().request(**request)
+
+
+class NPlusOneGuardMixin:
+    """TestCase mixin failing any client request that repeats a query shape.
+
+    Set ``max_query_repeats`` on the test class to change the limit, or
+    ``guard_client_requests = False`` to only use ``assertNoRepeatedQueries``.
+    """
+    max_query_repeats = DEFAULT_MAX_REPEATS
+    guard_client_requests = True
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        if self.guard_client_requests:
+            self.client = GuardedClient(max_repeats=self.max_query_repeats)
+
+    def assertNoRepeatedQueries(self, max_repeats=None, using=DEFAULT_DB_ALIAS):
+        return QueryShapeGuard(
+            self.max_query_repeats if max_repeats is None else max_repeats, using=using
+        )
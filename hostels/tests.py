@@ -0,0 +1,741 @@
+"""
+Tests for the hostels app.
+
+Query shape tests: the main pages must not run one query per listed hostel.
+Every request made through ``self.client`` runs under QueryShapeGuard
+(hostels.testing) and fails when a query shape repeats more than
+``max_query_repeats`` times. The pages list more hostels than that, so a
+per-hostel query anywhere in a view or template fails the test.
+"""
+import io
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import QueryDict
+from django.db import IntegrityError
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import bulk_actions, ranking, saved_searches, search_cache, similarity
+from .events import EventBuffer
+from .importer import HostelImporter
+from .slugs import allocate_slug, assign_unique_slugs
+from .models import (
+    ContactReveal, Facility, Favorite, FeaturedPlan, FeaturedRequest, Hostel, HostelFacility, HostelImage,
+    HostelSubscription, HostelView, Locality, MapCluster, Report, Review, RoomType, SavedSearch, SavedSearchMatch,
+    SimilarHostel, User,
+)
+from .testing import NPlusOneGuardMixin, QueryShapeGuard, RepeatedQueriesError
+from .throttling import TokenBucket, client_ip
+from .views import HostelListView, RevealContactView
+
+HOSTEL_COUNT = 8
+
+
+def create_hostel(owner, name='Test Hostel', **fields):
+    """A listed hostel in Johar Town, Lahore"""
+    return Hostel.objects.create(**{
+        'owner': owner,
+        'name': name,
+        'address': 'House 1, Johar Town, Lahore',
+        'description': 'A hostel for tests',
+        'contact_email': 'hostel@example.com',
+        'contact_phone': '+923001234567',
+        'latitude': '31.469700',
+        'longitude': '74.272800',
+        'is_verified': True,
+        **fields,
+    })
+
+
+# Cached pages would hide the queries being guarded; events are written
+# within the request instead of from a timer thread
+@override_settings(
+    PAGE_CACHE_ENABLED=False, SEARCH_CACHE_TIMEOUT=0, REQUEST_TIMING_ENABLED=False, EVENT_BUFFER_SIZE=1,
+)
+class QueryShapeTests(NPlusOneGuardMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        cls.admin = User.objects.create_user('admin', 'admin@example.com', 'password', role='admin', is_staff=True)
+        students = [
+            User.objects.create_user(f'student{i}', f'student{i}@example.com', 'password', role='student')
+            for i in range(2)
+        ]
+        facilities = [Facility.objects.create(name=f'Facility {i}') for i in range(5)]
+        plan = FeaturedPlan.objects.create(name='Weekly', duration_type='1_week', duration_days=7, price=1000)
+
+        for i in range(HOSTEL_COUNT):
+            hostel = Hostel.objects.create(
+                owner=cls.owner,
+                name=f'Test Hostel {i}',
+                address=f'House {i}, Johar Town, Lahore',
+                description='A hostel for query shape tests',
+                contact_email='hostel@example.com',
+                contact_phone='+923001234567',
+                latitude='31.469700',
+                longitude='74.272800',
+                nearby_landmark='University of the Punjab',
+                landmark_distance='1.50',
+                # Every other hostel is pending, for the admin review page
+                is_verified=i % 2 == 0,
+                is_featured=i < 2,
+            )
+            RoomType.objects.create(hostel=hostel, type='single', price=10000 + i, available_rooms=2)
+            RoomType.objects.create(hostel=hostel, type='double', price=8000 + i, available_rooms=3)
+            HostelFacility.objects.bulk_create(
+                [HostelFacility(hostel=hostel, facility=facility) for facility in facilities]
+            )
+            HostelImage.objects.create(hostel=hostel, image=f'hostel_images/test-{i}.jpg', is_primary=True)
+            for rating, student in enumerate(students, start=3):
+                Review.objects.create(
+                    hostel=hostel, user=student, rating=rating, review_text='Fine', is_approved=True,
+                )
+            Report.objects.create(hostel=hostel, reporter=students[0], report_type='spam', description='Spam')
+            FeaturedRequest.objects.create(
+                hostel=hostel, plan=plan, owner=cls.owner,
+                contact_name='Owner', contact_phone='+923001234567', contact_email='owner@example.com',
+            )
+        cls.student = students[0]
+        Favorite.objects.bulk_create([Favorite(user=cls.student, hostel=hostel) for hostel in Hostel.objects.all()])
+        cls.hostel = Hostel.objects.filter(is_verified=True).order_by('name').first()
+
+    def test_guard_fails_on_repeated_queries(self):
+        with self.assertRaises(RepeatedQueriesError):
+            with QueryShapeGuard(max_repeats=self.max_query_repeats):
+                for hostel in Hostel.objects.all():
+                    hostel.room_types.count()
+
+    def test_guard_allows_prefetched_rows(self):
+        with self.assertNoRepeatedQueries():
+            for hostel in Hostel.objects.for_cards():
+                hostel.room_types.count()
+                hostel.min_price
+                hostel.average_rating
+
+    def test_home(self):
+        response = self.client.get(reverse('hostels:home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['featured_hostels']), HOSTEL_COUNT // 2)
+
+    def test_hostel_list(self):
+        for sort in HostelListView.sorts:
+            with self.subTest(sort=sort):
+                response = self.client.get(reverse('hostels:hostel_list'), {'sort': sort})
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['hostels'])
+
+    def test_hostel_list_cards(self):
+        response = self.client.get(reverse('hostels:hostel_list'), {'sort': 'price_low'})
+        hostel = response.context['hostels'][0]
+        self.assertEqual(hostel.min_price, 8000)
+        self.assertEqual(hostel.average_rating, 3.5)
+        self.assertEqual(hostel.rating_count, 2)
+
+    def test_hostel_detail(self):
+        response = self.client.get(self.hostel.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['rating_distribution'], {1: 0, 2: 0, 3: 1, 4: 1, 5: 0})
+
+    def test_search_by_location(self):
+        response = self.client.get(reverse('hostels:search_by_location'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['popular_areas'])
+
+    def test_reviews_list(self):
+        response = self.client.get(reverse('hostels:reviews_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['reviews']), HOSTEL_COUNT * 2)
+        self.assertEqual(response.context['rating_distribution'][4], HOSTEL_COUNT)
+
+    def test_favorites(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('hostels:favorites'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['favorites']), HOSTEL_COUNT)
+        self.assertContains(response, '₨8000')
+
+    def test_saved_searches(self):
+        self.client.force_login(self.student)
+        for price in range(8000, 8000 + HOSTEL_COUNT):
+            SavedSearch.objects.create(user=self.student, name=f'Under {price}', params={'max_price': str(price)})
+        response = self.client.get(reverse('hostels:saved_searches'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_owner_dashboard(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('hostels:owner_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_dashboard(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('hostels:admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_hostels(self):
+        self.client.force_login(self.admin)
+        for status in ('all', 'verified', 'pending', 'featured'):
+            with self.subTest(status=status):
+                response = self.client.get(reverse('hostels:admin_hostels'), {'status': status})
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_listings(self):
+        self.client.force_login(self.admin)
+        for name in ('admin_users', 'admin_reviews', 'reports', 'admin_featured_requests', 'admin_featured_plans'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(f'hostels:{name}'))
+                self.assertEqual(response.status_code, 200)
+
+    def test_pending_hostels(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('hostels:pending_hostels'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['hostels']), HOSTEL_COUNT // 2)
+
+
+class BulkActionTests(TestCase):
+
+    def test_deleting_owners_refreshes_their_hostels(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_hostel(owner)
+        self.assertEqual(Locality.objects.get(name='Johar Town').hostel_count, 1)
+        self.assertTrue(MapCluster.objects.exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(bulk_actions.delete_users([owner.pk]), 1)
+        self.assertFalse(Hostel.objects.exists())
+        self.assertEqual(set(Locality.objects.values_list('hostel_count', flat=True)), {0})
+        self.assertFalse(MapCluster.objects.exists())
+
+
+class CanonicalParamsTests(SimpleTestCase):
+
+    def canonical(self, query):
+        return saved_searches.canonical_params(QueryDict(query))
+
+    def test_round_numbers_stay_fixed_point(self):
+        params = self.canonical('max_price=15000&min_price=20&max_distance=2.50')
+        self.assertEqual(params, {'min_price': '20', 'max_price': '15000', 'max_distance': '2.5'})
+        self.assertEqual(saved_searches.describe(params), 'under ₨15000')
+
+    def test_equal_numbers_are_equal(self):
+        self.assertEqual(self.canonical('max_price=15000.00'), self.canonical('max_price=1.5e4'))
+
+    def test_non_finite_numbers_are_dropped(self):
+        self.assertEqual(self.canonical('max_price=NaN&min_price=Infinity&max_distance=abc'), {})
+
+
+class RankScoreTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        cls.scored = create_hostel(cls.owner, name='Scored Hostel')
+        ranking.rebuild()
+
+    def test_new_hostel_is_scored_like_a_rebuild(self):
+        seeded = create_hostel(self.owner, name='New Hostel').rank_score
+        self.assertGreater(seeded, 0)
+        ranking.rebuild()
+        self.assertAlmostEqual(Hostel.objects.get(name='New Hostel').rank_score, seeded, places=3)
+
+    def test_featuring_adds_the_boost(self):
+        scored = Hostel.objects.get(pk=self.scored.pk)
+        initial = scored.rank_score
+        scored.is_featured = True
+        scored.save()
+        featured = Hostel.objects.get(pk=self.scored.pk).rank_score
+        self.assertAlmostEqual(featured, initial + ranking.FEATURED_BOOST)
+
+        bulk_actions.change_hostels([self.scored.pk], {'is_featured': False})
+        self.assertAlmostEqual(Hostel.objects.get(pk=self.scored.pk).rank_score, initial)
+        # Already unfeatured: no second deduction
+        bulk_actions.change_hostels([self.scored.pk], {'is_featured': False})
+        self.assertAlmostEqual(Hostel.objects.get(pk=self.scored.pk).rank_score, initial)
+
+
+@override_settings(SUBSCRIPTION_GATED_SEARCH=True)
+class SubscriptionListingTests(TestCase):
+
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hostel = create_hostel(owner)
+        self.today = timezone.now().date()
+        self.subscription = HostelSubscription.objects.create(
+            hostel=self.hostel, status='active', auto_renew=False,
+            subscription_end_date=self.today - timedelta(days=1),
+        )
+
+    def listed_counts(self):
+        return (
+            Locality.objects.get(name='Johar Town').hostel_count,
+            sum(MapCluster.objects.filter(zoom=10).values_list('hostel_count', flat=True)),
+        )
+
+    def process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('process_subscriptions', stdout=io.StringIO())
+
+    def test_expiring_delists(self):
+        HostelSubscription.objects.filter(pk=self.subscription.pk).update(
+            subscription_end_date=self.today + timedelta(days=30)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_actions.refresh_listing(bulk_actions.listing_state([self.hostel.pk]))
+        self.assertEqual(self.listed_counts(), (1, 1))
+
+        HostelSubscription.objects.filter(pk=self.subscription.pk).update(
+            subscription_end_date=self.today - timedelta(days=1)
+        )
+        self.process()
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, 'expired')
+        self.assertEqual(self.listed_counts(), (0, 0))
+
+    def test_renewing_relists(self):
+        HostelSubscription.objects.filter(pk=self.subscription.pk).update(auto_renew=True)
+        self.assertEqual(self.listed_counts(), (0, 0))
+        self.process()
+        self.assertEqual(self.listed_counts(), (1, 1))
+
+    def test_admin_actions_refresh_listing(self):
+        subscriptions = HostelSubscription.objects.filter(pk=self.subscription.pk)
+        subscriptions.update(subscription_end_date=self.today + timedelta(days=30), status='expired')
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_actions.change_subscriptions(subscriptions, relisted=True, status='active')
+        self.assertEqual(self.listed_counts(), (1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_actions.change_subscriptions(subscriptions, status='expired')
+        self.assertEqual(self.listed_counts(), (0, 0))
+
+
+@override_settings(PAGE_CACHE_ENABLED=False, REQUEST_TIMING_ENABLED=False, EVENT_BUFFER_SIZE=1)
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        cls.hostel = create_hostel(cls.owner)
+
+    def get(self, **headers):
+        return self.client.get(self.hostel.get_absolute_url(), **headers)
+
+    def test_not_modified_records_the_view(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(HostelView.objects.filter(hostel=self.hostel).count(), 2)
+
+    def test_owner_views_are_not_recorded(self):
+        self.client.force_login(self.owner)
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertFalse(HostelView.objects.exists())
+
+    def test_writes_change_the_etag(self):
+        student = User.objects.create_user('student', 'student@example.com', 'password', role='student')
+        etags = [self.get()['ETag']]
+        for write in (
+            lambda: Review.objects.create(hostel=self.hostel, user=student, rating=5, review_text='Quiet'),
+            lambda: RoomType.objects.create(hostel=self.hostel, type='single', price=12000, available_rooms=2),
+            lambda: Hostel.objects.get(pk=self.hostel.pk).save(),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+            response = self.get(HTTP_IF_NONE_MATCH=etags[-1])
+            self.assertEqual(response.status_code, 200)
+            etags.append(response['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etags[-1]).status_code, 304)
+
+    def test_etag_differs_per_visitor(self):
+        anonymous = self.get()
+        self.client.force_login(self.owner)
+        signed_in = self.get()
+        self.assertNotEqual(anonymous['ETag'], signed_in['ETag'])
+        self.assertIn('private', signed_in['Cache-Control'])
+        self.assertIn('public', anonymous['Cache-Control'])
+
+    def test_search_api_follows_the_listings(self):
+        url = reverse('hostels:search_api')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_hostel(self.owner, name='New Hostel')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SlugTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+
+    def assign(self, *names):
+        hostels = [Hostel(owner=self.owner, name=name) for name in names]
+        return [hostel.slug for hostel in assign_unique_slugs(hostels)]
+
+    def test_taken_slugs_get_the_next_suffix(self):
+        create_hostel(self.owner, name='Green')
+        create_hostel(self.owner, name='Green', slug='green-4')
+        self.assertEqual(self.assign('Green', 'Green'), ['green-5', 'green-6'])
+        self.assertEqual(allocate_slug(Hostel(owner=self.owner), 'Green'), 'green-5')
+
+    def test_suffixes_do_not_collide_with_other_bases(self):
+        self.assertEqual(self.assign('Green', 'Green', 'Green 2'), ['green', 'green-3', 'green-2'])
+        self.assertEqual(self.assign('Green 2', 'Green', 'Green'), ['green-2', 'green', 'green-3'])
+
+    def test_bases_across_read_batches(self):
+        hostels = [Hostel(owner=self.owner, name=name) for name in ('Green', 'Green', 'Green 2')]
+        assign_unique_slugs(hostels, batch_size=1)
+        slugs = [hostel.slug for hostel in hostels]
+        self.assertEqual(len(set(slugs)), 3)
+
+
+class RoomTypeTests(TestCase):
+
+    def test_price_changes_refresh_clusters_and_alerts(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        student = User.objects.create_user('student', 'student@example.com', 'password', role='student')
+        search = SavedSearch.objects.create(user=student, name='Cheap', params={'max_price': '9000'})
+        with self.captureOnCommitCallbacks(execute=True):
+            hostel = create_hostel(owner)
+            room = RoomType.objects.create(hostel=hostel, type='single', price=12000, available_rooms=2)
+        self.assertEqual(MapCluster.objects.get(zoom=16).min_price, 12000)
+        self.assertFalse(SavedSearchMatch.objects.exists())
+
+        room.price = 8500
+        with self.captureOnCommitCallbacks(execute=True):
+            room.save()
+        self.assertEqual(MapCluster.objects.get(zoom=16).min_price, 8500)
+        self.assertTrue(SavedSearchMatch.objects.filter(saved_search=search, hostel=hostel).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            room.delete()
+        self.assertIsNone(MapCluster.objects.get(zoom=16).min_price)
+
+
+class ImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+
+    def row(self, name, owner='owner', rooms='single:12000:2;double:9000:3', facilities='WiFi;Laundry'):
+        return (
+            f'{owner},{name},"House 1, Johar Town, Lahore",A hostel for tests,hostel@example.com,+923001234567,'
+            f'31.469700,74.272800,{rooms},{facilities}\n'
+        )
+
+    def csv(self, *rows):
+        header = 'owner,name,address,description,contact_email,contact_phone,latitude,longitude,rooms,facilities\n'
+        return io.StringIO(header + ''.join(rows))
+
+    def test_invalid_rows_are_reported_by_line(self):
+        stream = self.csv(
+            self.row('Green Hostel'),
+            self.row('Unknown Owner Hostel', owner='nobody'),
+            self.row(''),
+            self.row('Twin Rooms Hostel', rooms='single:12000:2;single:9000:3'),
+            self.row('Green Hostel', facilities='wifi'),
+        )
+        report = HostelImporter(chunk_size=2).run(stream, 'csv')
+
+        self.assertEqual((report.rows, report.valid, report.created, report.rooms), (5, 2, 2, 4))
+        self.assertEqual([line for line, _ in report.errors], [3, 4, 5])
+        self.assertIn('Unknown hostel owner "nobody"', report.errors[0][1])
+        self.assertTrue(report.errors[1][1].startswith('name:'))
+        self.assertEqual(report.errors[2][1], 'Each room type may only be listed once')
+        self.assertEqual(
+            sorted(Hostel.objects.values_list('slug', flat=True)), ['green-hostel', 'green-hostel-2'],
+        )
+        # Facility names are matched case-insensitively
+        self.assertEqual(Facility.objects.filter(name__iexact='wifi').count(), 1)
+        self.assertEqual(report.facilities, 3)
+
+    def test_unreadable_ndjson_lines_are_reported(self):
+        stream = io.StringIO(
+            '{"owner": "owner", "name": "Blue Hostel", "address": "House 2, Johar Town, Lahore", '
+            '"description": "A hostel for tests", "contact_email": "hostel@example.com", '
+            '"contact_phone": "+923001234567", "latitude": "31.4697", "longitude": "74.2728", '
+            '"rooms": [{"type": "single", "price": "12000", "available_rooms": "2"}]}\n'
+            '{"name": \n'
+            '["not", "an", "object"]\n'
+        )
+        report = HostelImporter().run(stream, 'ndjson')
+        self.assertEqual((report.rows, report.created, report.rooms), (3, 1, 1))
+        self.assertEqual([line for line, _ in report.errors], [2, 3])
+        self.assertTrue(all(message.startswith('Unreadable row') for _, message in report.errors))
+
+    def test_failed_chunk_is_retried_row_by_row(self):
+        class FailingImporter(HostelImporter):
+            def insert(self, records):
+                if any(hostel.name == 'Broken Hostel' for hostel, _, _ in records):
+                    raise IntegrityError('broken row')
+                super().insert(records)
+
+        stream = self.csv(self.row('Green Hostel'), self.row('Broken Hostel'), self.row('Blue Hostel'))
+        report = FailingImporter(chunk_size=10).run(stream, 'csv')
+
+        self.assertEqual((report.valid, report.created, report.rooms), (3, 2, 4))
+        self.assertEqual(report.errors, [(3, 'Database error: broken row')])
+        self.assertEqual(
+            sorted(Hostel.objects.values_list('slug', flat=True)), ['blue-hostel', 'green-hostel'],
+        )
+        self.assertEqual(RoomType.objects.count(), 4)
+
+    def test_dry_run_and_resume(self):
+        stream = self.csv(self.row('Green Hostel'), self.row('Blue Hostel'))
+        report = HostelImporter(dry_run=True).run(stream, 'csv')
+        self.assertEqual((report.valid, report.created), (2, 0))
+        self.assertFalse(Hostel.objects.exists())
+
+        lines = []
+        stream.seek(0)
+        report = HostelImporter(chunk_size=1).run(stream, 'csv', start_after=2, progress=lines.append)
+        self.assertEqual(list(Hostel.objects.values_list('name', flat=True)), ['Blue Hostel'])
+        self.assertEqual(lines, [3])
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket('test', capacity=3, refill_rate=0.5)
+
+    def test_burst_then_refusal(self):
+        self.assertEqual([self.bucket.consume('a') for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(self.bucket.consume('a'), 2, places=1)
+        # Other clients have their own bucket
+        self.assertEqual(self.bucket.consume('b'), 0)
+
+    def test_refill(self):
+        for _ in range(3):
+            self.bucket.consume('a')
+        available, updated = cache.get('ratelimit:test:a')
+        cache.set('ratelimit:test:a', (available, updated - 4))
+        self.assertEqual([self.bucket.consume('a') for _ in range(2)], [0, 0])
+        self.assertGreater(self.bucket.consume('a'), 0)
+
+    @override_settings(NUM_PROXIES=1)
+    def test_client_ip_trusts_only_our_proxies(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 203.0.113.7')
+        self.assertEqual(client_ip(request), '203.0.113.7')
+        with self.settings(NUM_PROXIES=0):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+
+@override_settings(REQUEST_TIMING_ENABLED=False, EVENT_BUFFER_SIZE=1)
+class ContactRevealTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_reveals_are_rate_limited(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        hostel = create_hostel(owner)
+        url = reverse('hostels:reveal_contact', args=[hostel.slug])
+        burst = RevealContactView.bucket.capacity
+        for _ in range(burst):
+            self.assertEqual(self.client.post(url).status_code, 200)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(ContactReveal.objects.filter(hostel=hostel).count(), burst)
+        self.assertEqual(Hostel.objects.get(pk=hostel.pk).total_contact_reveals, burst)
+
+
+# A long max age, so only a full buffer or flush() writes
+@override_settings(EVENT_BUFFER_SIZE=3, EVENT_BUFFER_MAX_AGE=3600)
+class EventBufferTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        cls.hostel = create_hostel(cls.owner)
+
+    def setUp(self):
+        self.buffer = EventBuffer(HostelView, counter='total_views')
+        self.addCleanup(self.buffer.flush)
+
+    def view_count(self):
+        return Hostel.objects.get(pk=self.hostel.pk).total_views
+
+    def test_full_buffer_is_flushed(self):
+        for _ in range(2):
+            self.buffer.add(hostel_id=self.hostel.pk, ip_address='127.0.0.1')
+        self.assertFalse(HostelView.objects.exists())
+        self.assertIsNotNone(self.buffer.timer)
+
+        self.buffer.add(hostel_id=self.hostel.pk, ip_address='127.0.0.1')
+        self.assertEqual(HostelView.objects.filter(hostel=self.hostel).count(), 3)
+        self.assertEqual(self.view_count(), 3)
+        self.assertIsNone(self.buffer.timer)
+        self.assertEqual(self.buffer.flush(), 0)
+
+    def test_events_of_deleted_hostels_and_users_are_dropped(self):
+        gone = create_hostel(self.owner, name='Gone Hostel')
+        student = User.objects.create_user('student', 'student@example.com', 'password', role='student')
+        self.buffer.add(hostel_id=gone.pk, ip_address='127.0.0.1')
+        self.buffer.add(hostel_id=self.hostel.pk, user=student, ip_address='127.0.0.1')
+        gone.delete()
+        student.delete()
+
+        with self.assertLogs('hostels.events', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 1)
+        view = HostelView.objects.get()
+        self.assertEqual((view.hostel_id, view.user_id), (self.hostel.pk, None))
+        self.assertEqual(self.view_count(), 1)
+
+
+class SimilarityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        wifi, laundry, gym = (Facility.objects.create(name=name) for name in ('WiFi', 'Laundry', 'Gym'))
+        cls.hostels = {}
+        for name, gender, price, latitude, facilities in (
+            ('Green', 'male', 12000, '31.469700', [wifi, laundry]),
+            ('Olive', 'male', 12500, '31.470000', [wifi, laundry]),
+            ('Rose', 'female', 30000, '31.520000', [gym]),
+        ):
+            hostel = create_hostel(owner, name=name, gender_type=gender, latitude=latitude)
+            RoomType.objects.create(hostel=hostel, type='single', price=price, available_rooms=1)
+            HostelFacility.objects.bulk_create(HostelFacility(hostel=hostel, facility=f) for f in facilities)
+            cls.hostels[name] = hostel
+        cls.pending = create_hostel(owner, name='Pending', is_verified=False)
+
+    def neighbours(self, name):
+        return list(
+            SimilarHostel.objects.filter(hostel=self.hostels[name]).values_list('similar__name', flat=True)
+        )
+
+    def test_nearest_first(self):
+        self.assertEqual(similarity.rebuild(k=2), 6)
+        self.assertEqual(self.neighbours('Green'), ['Olive', 'Rose'])
+        scores = SimilarHostel.objects.filter(hostel=self.hostels['Green']).values_list('score', flat=True)
+        self.assertGreater(*scores)
+        # Only listed hostels are neighbours
+        self.assertFalse(SimilarHostel.objects.filter(similar=self.pending).exists())
+
+    def test_rebuild_replaces_rows(self):
+        similarity.rebuild(k=2)
+        Hostel.objects.filter(pk=self.hostels['Olive'].pk).update(is_verified=False)
+        self.assertEqual(similarity.rebuild(k=2), 2)
+        self.assertEqual(self.neighbours('Green'), ['Rose'])
+
+
+@override_settings(PAGE_CACHE_ENABLED=True, REQUEST_TIMING_ENABLED=False, EVENT_BUFFER_SIZE=1)
+class PageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password', role='student')
+        cls.hostel = create_hostel(cls.owner)
+
+    def setUp(self):
+        cache.clear()
+
+    def cached(self, url):
+        return self.client.get(url).get('X-Page-Cache')
+
+    def assertExpires(self, url, write):
+        self.client.get(url)
+        self.assertEqual(self.cached(url), 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertEqual(self.cached(url), 'miss')
+
+    def test_hostel_writes_expire_listings(self):
+        url = reverse('hostels:hostel_list')
+        self.assertExpires(url, lambda: create_hostel(self.owner, name='New Hostel'))
+        self.assertExpires(url, lambda: Hostel.objects.get(name='New Hostel').delete())
+
+    def test_review_and_room_writes_expire_the_hostel_page(self):
+        url = self.hostel.get_absolute_url()
+        self.assertExpires(url, lambda: Review.objects.create(
+            hostel=self.hostel, user=self.student, rating=4, review_text='Clean', is_approved=True,
+        ))
+        self.assertExpires(url, lambda: RoomType.objects.create(
+            hostel=self.hostel, type='single', price=12000, available_rooms=2,
+        ))
+
+    def test_hits_record_views_and_answer_conditional_requests(self):
+        url = self.hostel.get_absolute_url()
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url)
+        self.assertEqual((response['X-Page-Cache'], response.status_code), ('hit', 200))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(HostelView.objects.filter(hostel=self.hostel).count(), 3)
+
+    def test_key_ignores_parameter_order_and_tracking(self):
+        url = reverse('hostels:hostel_list')
+        self.assertEqual(self.cached(f'{url}?gender=male&sort=price_low'), 'miss')
+        self.assertEqual(self.cached(f'{url}?sort=price_low&gender=male&utm_source=mail'), 'hit')
+
+    def test_signed_in_visitors_are_not_cached(self):
+        self.client.force_login(self.student)
+        self.assertIsNone(self.cached(self.hostel.get_absolute_url()))
+
+
+@override_settings(
+    PAGE_CACHE_ENABLED=False, SEARCH_CACHE_TIMEOUT=60, REQUEST_TIMING_ENABLED=False, EVENT_BUFFER_SIZE=1,
+)
+class SearchCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password', role='owner')
+        cls.hostels = []
+        for i, prices in enumerate(([9000, 20000], [12000], [15000])):
+            hostel = create_hostel(cls.owner, name=f'Test Hostel {i}')
+            for room_type, price in zip(('single', 'double'), prices):
+                RoomType.objects.create(hostel=hostel, type=room_type, price=price, available_rooms=1)
+            cls.hostels.append(hostel)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query=''):
+        response = self.client.get(f"{reverse('hostels:hostel_list')}?{query}")
+        return [hostel.name for hostel in response.context['hostels']], response.context['paginator'].count
+
+    def entry(self, query, sort):
+        return cache.get(search_cache.cache_key(saved_searches.canonical_params(QueryDict(query)), sort))
+
+    def test_equal_searches_share_an_entry(self):
+        self.search('max_price=15000&sort=price_low')
+        self.assertEqual(len(self.entry('max_price=1.5e4&sort=price_low', 'price_low')['ids']), 3)
+        self.assertIsNone(self.entry('max_price=15000', 'rating'))
+
+    def test_cached_until_the_listings_change(self):
+        self.assertEqual(self.search('sort=price_low')[1], 3)
+        # A write that skips invalidation: the cached ids are kept, but delisted rows are left out
+        Hostel.objects.filter(pk=self.hostels[1].pk).update(is_verified=False)
+        self.assertEqual(self.search('sort=price_low'), (['Test Hostel 0', 'Test Hostel 2'], 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_hostel(self.owner, name='New Hostel')
+        names, count = self.search('sort=price_low')
+        self.assertEqual(count, 3)
+        self.assertNotIn('Test Hostel 1', names)
+
+    def test_price_sort_lists_each_hostel_once(self):
+        self.assertEqual(
+            self.search('sort=price_low'), (['Test Hostel 0', 'Test Hostel 1', 'Test Hostel 2'], 3),
+        )
+
+    @override_settings(SEARCH_CACHE_MAX_IDS=2)
+    def test_results_past_the_limit_are_queried(self):
+        self.assertEqual(
+            self.search('sort=price_low'), (['Test Hostel 0', 'Test Hostel 1', 'Test Hostel 2'], 3),
+        )
+        entry = self.entry('sort=price_low', 'price_low')
+        self.assertEqual(entry, {'ids': [hostel.pk for hostel in self.hostels[:2]], 'count': 3})
@@ -0,0 +1,81 @@
+"""
+Token-bucket rate limiting backed by the Django cache.
+
+Each client gets a bucket of ``capacity`` tokens that refills at
+``refill_rate`` tokens per second; a request spends one token and is
+refused when the bucket is empty. The bucket is a single cache entry, so
+limits are shared between processes when the cache is (Redis, Memcached)
+and per process with the default local-memory cache. Reads and writes are
+not atomic: under heavy concurrency a client can get a few requests more
+than its burst, which is fine for throttling scrapers.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class TokenBucket:
+    def __init__(self, name, capacity, refill_rate, cache_alias='default'):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def consume(self, key, tokens=1):
+        """Spend ``tokens`` from ``key``'s bucket.
+
+        Returns 0 when the request is allowed, otherwise the number of
+        seconds until enough tokens are available.
+        """
+        cache_key = f'ratelimit:{self.name}:{key}'
+        now = time.time()
+        state = self.cache.get(cache_key)
+        if state is None:
+            available = self.capacity
+        else:
+            available, updated = state
+            available = min(self.capacity, available + (now - updated) * self.refill_rate)
+
+        if available < tokens:
+            return (tokens - available) / self.refill_rate
+
+        # Expire once the bucket would be full again; a missing entry means full
+        timeout = math.ceil(self.capacity / self.refill_rate) + 1
+        self.cache.set(cache_key, (available - tokens, now), timeout)
+        return 0
+
+
+def client_ip(request):
+    """The client address as seen by the outermost trusted proxy.
+
+    Clients can send any X-Forwarded-For value, so only the last
+    ``NUM_PROXIES`` hops, appended by our own proxies, are trusted.
+    """
+    remote_addr = request.META.get('REMOTE_ADDR') or '127.0.0.1'
+    if not settings.NUM_PROXIES:
+        return remote_addr
+    hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    if not hops:
+        return remote_addr
+    return hops[-min(settings.NUM_PROXIES, len(hops))]
+
+
+def forwarded_ip(request):
+    """The first X-Forwarded-For hop, else the peer address; for logging only, it can be forged"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR') or '127.0.0.1'
+
+
+def client_key(request):
+    """Rate-limit key: the user for signed-in requests, the IP address otherwise"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
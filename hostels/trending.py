@@ -0,0 +1,89 @@
+"""
+Trending hostels from exponentially decayed view and reveal counts.
+
+A hostel's trending score is the sum of its events, each worth its weight
+halved every ``TRENDING_HALF_LIFE_HOURS``. Decaying every score as time
+passes would mean rewriting every row; instead each event is stored
+scaled up by ``2 ** (hours since TRENDING_EPOCH / half-life)``. All
+stored scores then share the same decay factor at any moment, so ordering
+by the stored column is ordering by the decayed score, and each event
+flush only adds its own increments (``add_events``).
+
+The stored scores double every half-life. Long before they overflow
+(about 1000 half-lives), move ``TRENDING_EPOCH`` forward and run
+``rebuild_trending``, which recomputes them from the event tables.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import ContactReveal, Hostel, HostelView
+
+VIEW_WEIGHT = 1.0
+# One contact reveal shows as much interest as this many views
+REVEAL_WEIGHT = 5.0
+# Events older than this many half-lives count for less than 0.01%
+WINDOW_HALF_LIVES = 14
+
+
+def epoch():
+    return timezone.make_aware(datetime.fromisoformat(settings.TRENDING_EPOCH))
+
+
+def growth(timestamp):
+    """``2 ** (half-lives from the epoch to timestamp)``"""
+    hours = (timestamp - epoch()).total_seconds() / 3600
+    return 2.0 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def current_score(stored, now=None):
+    """A stored trending_score decayed to ``now``, in events"""
+    return stored / growth(now or timezone.now())
+
+
+def add_events(events, event_weight):
+    """Add flushed events to their hostels' scores in one UPDATE"""
+    increments = defaultdict(float)
+    for event in events:
+        increments[event.hostel_id] += event_weight * growth(event.timestamp)
+    if not increments:
+        return
+    Hostel.objects.filter(pk__in=increments).update(
+        trending_score=F('trending_score') + Case(
+            *(When(pk=pk, then=Value(increment)) for pk, increment in increments.items()),
+            default=Value(0.0), output_field=FloatField(),
+        )
+    )
+
+
+def hourly_scores(model, event_weight, since, scores):
+    """Add ``model`` events since ``since`` to ``scores``, hour by hour"""
+    hourly = (
+        model.objects.filter(timestamp__gte=since).order_by()
+        .annotate(hour=TruncHour('timestamp')).values_list('hostel_id', 'hour')
+        .annotate(events=Count('pk'))
+    )
+    for hostel_id, hour, events in hourly:
+        # Within an hour the events are spread evenly, so weigh them at its middle
+        scores[hostel_id] += events * event_weight * growth(hour + timedelta(minutes=30))
+
+
+def rebuild(batch_size=1000):
+    """Recompute every trending_score from recent events; return the number of hostels trending"""
+    since = timezone.now() - timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS * WINDOW_HALF_LIVES)
+    scores = defaultdict(float)
+    hourly_scores(HostelView, VIEW_WEIGHT, since, scores)
+    hourly_scores(ContactReveal, REVEAL_WEIGHT, since, scores)
+    with transaction.atomic():
+        Hostel.objects.exclude(trending_score=0).update(trending_score=0)
+        Hostel.objects.bulk_update(
+            [Hostel(pk=pk, trending_score=score) for pk, score in scores.items()],
+            ['trending_score'],
+            batch_size=batch_size,
+        )
+    return len(scores)
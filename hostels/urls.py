@@ -63,6 +63,9 @@ urlpatterns = [
     path('favorites/', views.FavoritesView.as_view(), name='favorites'),
     path('favorites/add/<slug:slug>/', views.AddToFavoritesView.as_view(), name='add_to_favorites'),
     path('favorites/remove/<slug:slug>/', views.RemoveFromFavoritesView.as_view(), name='remove_from_favorites'),
+    path('saved-searches/', views.SavedSearchesView.as_view(), name='saved_searches'),
+    path('saved-searches/add/', views.SaveSearchView.as_view(), name='save_search'),
+    path('saved-searches/<int:pk>/delete/', views.DeleteSavedSearchView.as_view(), name='delete_saved_search'),
 
     # Review system
     path('reviews/add/<slug:slug>/', views.AddReviewView.as_view(), name='add_review'),
@@ -83,6 +86,9 @@ urlpatterns = [
     path('admin-dashboard/analytics/', views.AdminAnalyticsView.as_view(), name='admin_analytics'),
     path('admin-dashboard/reports/', views.ReportsView.as_view(), name='reports'),
     path('admin-dashboard/export/', admin_views.ExportDataView.as_view(), name='export_data'),
+    path('admin-dashboard/hostels/import/', admin_views.ImportHostelsView.as_view(), name='import_hostels'),
+    path('admin-dashboard/hostels/import/<uuid:job_id>/', admin_views.ImportHostelsView.as_view(),
+         name='import_hostels_job'),
 
     # Featured ads system
     path('featured/request/<slug:slug>/', views.FeaturedRequestView.as_view(), name='request_featured'),
@@ -99,6 +105,8 @@ urlpatterns = [
     # API endpoints for AJAX requests
     path('api/geocode/', views.GeocodeView.as_view(), name='geocode'),
     path('api/search/', views.SearchAPIView.as_view(), name='search_api'),
+    path('api/locations/', views.LocationAutocompleteView.as_view(), name='location_autocomplete'),
+    path('api/map/', views.MapClustersView.as_view(), name='map_clusters'),
 
     # Admin API endpoints
     path('api/admin/approve-hostel/<uuid:hostel_id>/',
@@ -119,6 +127,9 @@ urlpatterns = [
     path('api/admin/bulk-user-action/',
          admin_views.BulkUserActionView.as_view(),
          name='bulk_user_action'),
+    path('api/admin/bulk-action/<uuid:job_id>/',
+         admin_views.BulkActionStatusView.as_view(),
+         name='bulk_action_status'),
     path('api/admin/delete-hostel/<uuid:hostel_id>/',
          admin_views.DeleteHostelView.as_view(),
          name='delete_hostel'),
@@ -4,20 +4,34 @@ from django.contrib.auth.views import LoginView as AuthLoginView, LogoutView as
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
+from django.conf import settings
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Q, Count, Avg
-from django.urls import reverse_lazy
+from django.db import DatabaseError, transaction
+from django.db.models import Q, Count, Avg, F
+from django.db.models.functions import Greatest
+from django.urls import reverse, reverse_lazy
 from django.views import View
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from decimal import Decimal
+import logging
+import math
 import requests
 import json
 
-from .models import Hostel, User, Review, Category, RoomType, Facility, ContactReveal, Favorite, Item, HostelImage, Report, FeaturedPlan, FeaturedRequest, FeaturedHistory
+from .models import Hostel, User, Review, Category, RoomType, Facility, ContactReveal, Favorite, Item, HostelImage, Report, FeaturedPlan, FeaturedRequest, FeaturedHistory, Landmark, SavedSearch, SimilarHostel, CoView
+from . import coviews, events, page_cache
+from .conditional import (
+    hostel_etag, hostel_last_modified, listings_etag, listings_last_modified, record_hostel_view, revalidated,
+)
+from .bulk_actions import filter_hostels, filter_users
+from .localities import top_localities
+from .throttling import TokenBucket, client_key, forwarded_ip
 from .forms import UserRegistrationForm, UserProfileForm, HostelForm, ReportForm, FeaturedRequestForm, FeaturedPlanForm, FeaturedRequestReviewForm
 
+logger = logging.getLogger(__name__)
+
 # Dashboard views
 class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'hostels/dashboard/main.html'
@@ -30,44 +44,6 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         })
         return context
 
-class OwnerDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
-    template_name = 'hostels/owner/dashboard.html'
-
-    def test_func(self):
-        return self.request.user.role == 'owner'
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        user = self.request.user
-
-        # Get hostels with prefetch for optimization
-        hostels = user.hostels.all().select_related().prefetch_related(
-            'featured_requests', 'contact_reveals'
-        ).order_by('-created_at')
-
-        # Calculate featured hostels count
-        featured_count = sum(1 for hostel in hostels if hostel.is_currently_featured)
-
-        # Get pending featured requests
-        pending_requests = FeaturedRequest.objects.filter(
-            owner=user,
-            status='pending'
-        ).select_related('hostel', 'plan')
-
-        # Calculate total contact reveals across all hostels
-        total_reveals = sum(hostel.contact_reveals_count for hostel in hostels)
-
-        context.update({
-            'hostels': hostels,
-            'total_hostels': hostels.count(),
-            'verified_hostels': hostels.filter(is_verified=True).count(),
-            'pending_hostels': hostels.filter(is_verified=False).count(),
-            'featured_hostels': featured_count,
-            'total_contact_reveals': total_reveals,
-            'pending_featured_requests': pending_requests,
-        })
-        return context
-
 class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     template_name = 'hostels/dashboard/admin.html'
 
@@ -90,115 +66,168 @@ class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
 
 
 class HomeView(TemplateView):
-    """Home page with search and featured hostels"""
+    """Home page with search, featured and trending hostels"""
     template_name = 'hostels/home.html'
+    trending_count = 6
+    page_cache_tags = (page_cache.LISTINGS_TAG,)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Featured hostels section - show actual featured hostels
-        context['featured_hostels'] = Hostel.objects.filter(
-            is_featured=True, is_verified=True, is_active=True
-        ).order_by('-created_at')[:6]
+        featured_hostels = list(Hostel.objects.searchable().filter(
+            is_featured=True
+        ).for_cards().order_by('-created_at')[:6])
 
         # If we don't have enough featured hostels, fill with recent ones
-        if context['featured_hostels'].count() < 6:
-            featured_count = context['featured_hostels'].count()
-            additional_hostels = Hostel.objects.filter(
-                is_verified=True, is_active=True
-            ).exclude(
-                id__in=context['featured_hostels'].values_list('id', flat=True)
-            ).order_by('-created_at')[:6-featured_count]
-
-            context['featured_hostels'] = list(context['featured_hostels']) + list(additional_hostels)
+        if len(featured_hostels) < 6:
+            additional_hostels = Hostel.objects.searchable().exclude(
+                id__in=[hostel.pk for hostel in featured_hostels]
+            ).for_cards().order_by('-created_at')[:6 - len(featured_hostels)]
+            featured_hostels += additional_hostels
+        context['featured_hostels'] = featured_hostels
+
+        # Kept current as view and reveal events are flushed (hostels.trending)
+        # The price is a subquery rather than an aggregate, so no GROUP BY stops
+        # the top hostels being read straight from the trending index
+        from django.db.models import OuterRef, Subquery
+        cheapest = RoomType.objects.filter(hostel=OuterRef('pk')).order_by('price').values('price')[:1]
+        context['trending_hostels'] = list(
+            Hostel.objects.searchable().filter(trending_score__gt=0)
+            .annotate(lowest_price=Subquery(cheapest))
+            .order_by('-trending_score')[:self.trending_count]
+        )
 
         context['facilities'] = Facility.objects.all()
         return context
 
 
+# Hostels are rated by their approved reviews only
+APPROVED_RATING = Avg('reviews__rating', filter=Q(reviews__is_approved=True))
+
+
 class HostelListView(ListView):
     """List/grid view of hostels with filters"""
     model = Hostel
     template_name = 'hostels/hostel_list.html'
     context_object_name = 'hostels'
     paginate_by = 12
+    page_cache_tags = (page_cache.LISTINGS_TAG,)
+    sorts = ('featured', 'price_low', 'price_high', 'distance', 'rating', 'newest')
 
     def get_queryset(self):
-        queryset = Hostel.objects.filter(is_verified=True, is_active=True)
+        from .saved_searches import canonical_params
+
+        # Normalized, so equal searches share cached results (hostels.search_cache)
+        params = self.search_params = canonical_params(self.request.GET)
+        queryset = Hostel.objects.searchable()
 
         # Search query
-        query = self.request.GET.get('q')
+        query = params.get('q')
         if query:
             queryset = queryset.filter(
                 Q(name__icontains=query) | Q(address__icontains=query) | Q(nearby_landmark__icontains=query)
             )
 
-        # Landmark proximity filter
-        landmark = self.request.GET.get('landmark')
-        if landmark:
-            queryset = queryset.filter(nearby_landmark__icontains=landmark)
-
         # Distance filter
-        max_distance = self.request.GET.get('max_distance')
-        if max_distance:
-            try:
-                max_distance = Decimal(max_distance)
+        max_distance = params.get('max_distance')
+        try:
+            max_distance = Decimal(max_distance) if max_distance else None
+        except (ValueError, TypeError, ArithmeticError):
+            max_distance = None
+
+        # Landmark proximity filter: a known Landmark is searched by measured
+        # distance (one range scan on the precomputed distance table), anything
+        # else falls back to the owner-entered landmark and distance
+        self.landmark = Landmark.resolve(params.get('landmark'))
+        if self.landmark is not None:
+            # One filter() call, so both conditions apply to the same distance row
+            distance_filter = {'landmark_distances__landmark': self.landmark}
+            if max_distance is not None:
+                distance_filter['landmark_distances__distance_km__lte'] = float(max_distance)
+            queryset = queryset.filter(**distance_filter).annotate(
+                landmark_km=F('landmark_distances__distance_km')
+            )
+        else:
+            landmark = params.get('landmark')
+            if landmark:
+                queryset = queryset.filter(nearby_landmark__icontains=landmark)
+            if max_distance is not None:
                 queryset = queryset.filter(landmark_distance__lte=max_distance)
-            except (ValueError, TypeError):
-                pass
+
+        # Filters and sorts across room types or facilities can repeat a hostel
+        needs_distinct = False
 
         # Price range filter
-        min_price = self.request.GET.get('min_price')
-        max_price = self.request.GET.get('max_price')
+        min_price = params.get('min_price')
+        max_price = params.get('max_price')
+        needs_distinct |= bool(min_price or max_price)
         if min_price:
             queryset = queryset.filter(room_types__price__gte=min_price)
         if max_price:
             queryset = queryset.filter(room_types__price__lte=max_price)
 
         # Facilities filter
-        facilities = self.request.GET.getlist('facilities')
+        facilities = params.get('facilities')
         if facilities:
             queryset = queryset.filter(hostel_facilities__facility__id__in=facilities)
+            needs_distinct = True
 
         # Room type filter
-        room_type = self.request.GET.get('room_type')
+        room_type = params.get('room_type')
         if room_type:
             queryset = queryset.filter(room_types__type=room_type)
+            needs_distinct = True
 
         # Gender type filter
-        gender_type = self.request.GET.get('gender_type')
+        gender_type = params.get('gender_type')
         if gender_type:
             queryset = queryset.filter(gender_type=gender_type)
 
         # Rating filter
-        min_rating = self.request.GET.get('min_rating')
+        min_rating = params.get('min_rating')
         if min_rating:
-            try:
-                min_rating = int(min_rating)
-                queryset = queryset.annotate(avg_rating=Avg('reviews__rating')).filter(avg_rating__gte=min_rating)
-            except (ValueError, TypeError):
-                pass
+            queryset = queryset.annotate(avg_rating=APPROVED_RATING).filter(avg_rating__gte=int(min_rating))
 
         # Sorting
         sort_by = self.request.GET.get('sort', 'featured')
+        self.sort = sort_by = sort_by if sort_by in self.sorts else 'newest'
         if sort_by == 'featured':
-            queryset = queryset.order_by('-is_featured', '-created_at')
+            # Precomputed relevance, featured hostels first (hostels.ranking)
+            queryset = queryset.order_by('-rank_score', '-created_at')
         elif sort_by == 'price_low':
             queryset = queryset.order_by('room_types__price')
+            needs_distinct = True
         elif sort_by == 'price_high':
             queryset = queryset.order_by('-room_types__price')
+            needs_distinct = True
         elif sort_by == 'distance':
-            queryset = queryset.filter(landmark_distance__isnull=False).order_by('landmark_distance')
+            if self.landmark is not None:
+                queryset = queryset.order_by('landmark_km')
+            else:
+                queryset = queryset.filter(landmark_distance__isnull=False).order_by('landmark_distance')
         elif sort_by == 'rating':
-            queryset = queryset.annotate(avg_rating=Avg('reviews__rating')).order_by('-avg_rating')
+            queryset = queryset.annotate(avg_rating=APPROVED_RATING).order_by(F('avg_rating').desc(nulls_last=True))
         else:  # newest
             queryset = queryset.order_by('-created_at')
 
-        return queryset.distinct()
+        # Without DISTINCT the default order is a scan of hostels_hostel_rank_idx
+        if needs_distinct:
+            queryset = queryset.distinct()
+        return queryset.for_cards()
+
+    def paginate_queryset(self, queryset, page_size):
+        """Paginate the cached id list of this search; only the page's rows are loaded"""
+        from .search_cache import CachedResults
+
+        if not settings.SEARCH_CACHE_TIMEOUT:
+            return super().paginate_queryset(queryset, page_size)
+        return super().paginate_queryset(CachedResults(queryset, self.search_params, self.sort), page_size)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['facilities'] = Facility.objects.all()
         context['room_types'] = RoomType.ROOM_TYPE_CHOICES
+        context['landmark'] = self.landmark
 
         # Add rating filter options
         context['rating_options'] = [
@@ -211,44 +240,35 @@ class HostelListView(ListView):
         return context
 
 
+@method_decorator(
+    revalidated(hostel_etag, hostel_last_modified, per_user=True, not_modified=record_hostel_view), name='get'
+)
 class HostelDetailView(DetailView):
     """Detailed view of a single hostel"""
     model = Hostel
     template_name = 'hostels/hostel_detail.html'
     context_object_name = 'hostel'
+    similar_count = 4
+    page_cache_tags = ('hostel:{slug}',)
 
     def get_queryset(self):
         return Hostel.objects.filter(is_active=True)
 
     def get_context_data(self, **kwargs):
         from django.db.models import Min, Max
-        from .models import HostelView
 
         context = super().get_context_data(**kwargs)
 
         # Track the hostel view (but don't track owner's own views)
         if not (self.request.user.is_authenticated and self.request.user == self.object.owner):
-            # Get client IP address
-            x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip_address = x_forwarded_for.split(',')[0].strip()
-            else:
-                ip_address = self.request.META.get('REMOTE_ADDR', '127.0.0.1')
-
-            # Get user agent
-            user_agent = self.request.META.get('HTTP_USER_AGENT', '')
-
-            # Create view record
-            HostelView.objects.create(
-                hostel=self.object,
-                user=self.request.user if self.request.user.is_authenticated else None,
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
+            # Record the view; written in the next batch (hostels.events)
+            events.record_hostel_view(self.request, self.object.pk)
+            # Recorded again whenever the page is served from the cache (hostels.page_cache)
+            self.request.viewed_hostel_id = self.object.pk
 
         room_types = self.object.room_types.all().order_by('price')
         context['room_types'] = room_types
-        context['facilities'] = self.object.hostel_facilities.all()
+        context['facilities'] = self.object.hostel_facilities.select_related('facility')
         context['images'] = self.object.images.all()
 
         # Review and rating data
@@ -286,43 +306,73 @@ class HostelDetailView(DetailView):
                 user=self.request.user, hostel=self.object
             ).exists()
 
+        # Precomputed nightly (hostels.similarity); skips neighbours delisted since
+        context['similar_hostels'] = list(
+            SimilarHostel.objects.filter(hostel=self.object, similar__is_active=True, similar__is_verified=True)
+            .select_related('similar')
+            .annotate(lowest_price=Min('similar__room_types__price'))
+            .order_by('rank')[:self.similar_count]
+        )
+
+        # Counted from viewing sessions (hostels.coviews)
+        context['also_viewed'] = list(
+            CoView.objects.filter(
+                hostel=self.object, sessions__gte=coviews.MIN_SESSIONS,
+                other__is_active=True, other__is_verified=True,
+            )
+            .select_related('other')
+            .order_by('-sessions')[:self.similar_count]
+        )
+
         return context
 
 
 class RevealContactView(View):
     """AJAX view to reveal contact information and track it"""
+    bucket = TokenBucket(
+        'contact-reveal',
+        capacity=settings.CONTACT_REVEAL_BURST,
+        refill_rate=settings.CONTACT_REVEAL_PER_MINUTE / 60,
+    )
 
     def post(self, request, slug):
         # Allow both AJAX and regular requests
+        retry_after = self.bucket.consume(client_key(request))
+        if retry_after:
+            response = JsonResponse({
+                'success': False,
+                'error': 'Too many requests. Please try again later.'
+            }, status=429)
+            response['Retry-After'] = math.ceil(retry_after)
+            return response
+
         try:
-            hostel = get_object_or_404(Hostel, slug=slug, is_active=True)
+            contact = Hostel.get_contact_details(slug)
+            if contact is None:
+                return JsonResponse({'success': False, 'error': 'Hostel not found'}, status=404)
 
-            # Track the contact reveal
-            ContactReveal.objects.create(
-                hostel=hostel,
+            # Track the contact reveal; written in the next batch (hostels.events)
+            events.contact_reveals.add(
+                hostel_id=contact['id'],
                 user=request.user if request.user.is_authenticated else None,
                 ip_address=self.get_client_ip(request)
             )
 
             return JsonResponse({
                 'success': True,
-                'contact_email': hostel.contact_email,
-                'contact_phone': hostel.contact_phone,
-                'whatsapp_number': hostel.whatsapp_number,
+                'contact_email': contact['contact_email'],
+                'contact_phone': contact['contact_phone'],
+                'whatsapp_number': contact['whatsapp_number'],
             })
         except Exception as e:
+            logger.exception('Contact reveal failed for %s', slug)
             return JsonResponse({
                 'success': False,
                 'error': 'Failed to load contact information'
             }, status=500)
 
     def get_client_ip(self, request):
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return forwarded_ip(request)
 
 
 # Authentication Views
@@ -369,7 +419,6 @@ class OwnerDashboardView(OwnerRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         from django.utils import timezone
-        from django.db.models import Count, Q
         from datetime import timedelta
 
         context = super().get_context_data(**kwargs)
@@ -396,34 +445,34 @@ class OwnerDashboardView(OwnerRequiredMixin, TemplateView):
             start_date = None
             period_name = "All Time"
 
+        # One query for the whole portfolio: featured state and event counts
+        # are annotated, primary images come from a single prefetch.
+        hostels = list(
+            user_hostels.with_featured_state()
+            .with_event_counts(since=start_date)
+            .prefetch_related('images')
+            .order_by('-created_at')
+        )
+
         # Basic stats
-        context['hostels'] = user_hostels
-        context['total_hostels'] = user_hostels.count()
-        context['verified_hostels'] = user_hostels.filter(is_verified=True).count()
+        context['hostels'] = hostels
+        context['total_hostels'] = len(hostels)
+        context['verified_hostels'] = sum(1 for hostel in hostels if hostel.is_verified)
+        context['featured_hostels'] = sum(1 for hostel in hostels if hostel.is_currently_featured)
 
         # Time-filtered analytics
-        if start_date:
-            context['total_views'] = sum(h.views.filter(timestamp__gte=start_date).count() for h in user_hostels)
-            context['total_contact_reveals'] = sum(h.contact_reveals.filter(timestamp__gte=start_date).count() for h in user_hostels)
-        else:
-            context['total_views'] = sum(h.views_count for h in user_hostels)
-            context['total_contact_reveals'] = sum(h.contact_reveals_count for h in user_hostels)
+        context['total_views'] = sum(hostel.period_views for hostel in hostels)
+        context['total_contact_reveals'] = sum(hostel.period_reveals for hostel in hostels)
 
         # Add individual hostel analytics
-        hostel_analytics = []
-        for hostel in user_hostels:
-            if start_date:
-                views_count = hostel.views.filter(timestamp__gte=start_date).count()
-                reveals_count = hostel.contact_reveals.filter(timestamp__gte=start_date).count()
-            else:
-                views_count = hostel.views_count
-                reveals_count = hostel.contact_reveals_count
-
-            hostel_analytics.append({
+        hostel_analytics = [
+            {
                 'hostel': hostel,
-                'views_count': views_count,
-                'reveals_count': reveals_count,
-            })
+                'views_count': hostel.period_views,
+                'reveals_count': hostel.period_reveals,
+            }
+            for hostel in hostels
+        ]
 
         context['hostel_analytics'] = hostel_analytics
         context['time_filter'] = time_filter
@@ -432,7 +481,77 @@ class OwnerDashboardView(OwnerRequiredMixin, TemplateView):
         return context
 
 
-class AddHostelView(OwnerRequiredMixin, CreateView):
+class HostelFormsetsMixin:
+    """Save a hostel with its image and room type formsets in one transaction.
+
+    Each formset is applied with one bulk INSERT, one bulk UPDATE and one
+    DELETE, so the number of statements doesn't grow with the number of rows.
+    """
+
+    def formsets_valid(self, *formsets):
+        # Validate every formset so all errors are reported at once
+        valid = all([formset.is_valid() for formset in formsets])
+        for formset in formsets:
+            label = formset.model._meta.verbose_name.capitalize()
+            for index, errors in enumerate(formset.errors, start=1):
+                for field, field_errors in errors.items():
+                    name = '' if field == '__all__' else f'{field.replace("_", " ")}: '
+                    messages.error(self.request, f'{label} {index}: {name}{" ".join(field_errors)}')
+            for error in formset.non_form_errors():
+                messages.error(self.request, f'{label}: {error}')
+        return valid
+
+    def save_hostel(self, form, image_formset, room_formset):
+        """Return (images saved, room types saved, room types deleted)"""
+        with transaction.atomic():
+            self.object = form.save()
+            images_saved, _ = self.save_images(image_formset)
+            rooms_saved, rooms_deleted = self.apply_formset(room_formset)
+            # Written in bulk, without RoomType.save()
+            if rooms_saved or rooms_deleted:
+                RoomType.rooms_changed([self.object.pk])
+        return images_saved, rooms_saved, rooms_deleted
+
+    def save_images(self, formset):
+        formset.instance = self.object
+        formset.save(commit=False)
+        saved = formset.new_objects + [image for image, _ in formset.changed_objects]
+        primaries = [image for image in saved if image.is_primary]
+        if not primaries:
+            return self.apply_formset(formset, collected=True)
+
+        # One primary image per hostel: the last one submitted wins
+        for image in primaries[:-1]:
+            image.is_primary = False
+        HostelImage.objects.filter(hostel=self.object, is_primary=True).update(is_primary=False)
+        return self.apply_formset(formset, collected=True, update_fields=('is_primary',))
+
+    def apply_formset(self, formset, collected=False, update_fields=()):
+        """Write a validated inline formset; return (rows saved, rows deleted)"""
+        if not collected:
+            formset.instance = self.object
+            formset.save(commit=False)
+
+        model = formset.model
+        if formset.new_objects:
+            model.objects.bulk_create(formset.new_objects)
+
+        changed = [obj for obj, _ in formset.changed_objects]
+        if changed:
+            fields = sorted(set(update_fields).union(*(fields for _, fields in formset.changed_objects)))
+            for obj in changed:
+                # bulk_update() skips pre_save(); run it so uploads are stored
+                for name in fields:
+                    setattr(obj, name, model._meta.get_field(name).pre_save(obj, add=False))
+            model.objects.bulk_update(changed, fields)
+
+        deleted = [obj.pk for obj in formset.deleted_objects]
+        if deleted:
+            model.objects.filter(pk__in=deleted).delete()
+        return len(formset.new_objects) + len(changed), len(deleted)
+
+
+class AddHostelView(OwnerRequiredMixin, HostelFormsetsMixin, CreateView):
     model = Hostel
     form_class = HostelForm
     template_name = 'hostels/owner/add_hostel.html'
@@ -456,72 +575,36 @@ class AddHostelView(OwnerRequiredMixin, CreateView):
         return context
 
     def form_valid(self, form):
-        try:
-            from .forms import HostelImageFormSet, RoomTypeFormSet
-            context = self.get_context_data()
-            image_formset = context['image_formset']
-            room_formset = context['room_formset']
-
-            # Validate the main form first
-            if not form.is_valid():
-                messages.error(self.request, 'Please correct the errors in the hostel form.')
-                return self.form_invalid(form)
-
-            # Set owner and save the hostel
-            form.instance.owner = self.request.user
-            self.object = form.save()
+        context = self.get_context_data()
+        image_formset = context['image_formset']
+        room_formset = context['room_formset']
 
-            # Handle formsets with error catching
-            images_saved = 0
-            rooms_saved = 0
-
-            # Try to save images if formset is valid
-            try:
-                if image_formset.is_valid():
-                    images = image_formset.save(commit=False)
-                    for image in images:
-                        if hasattr(image, 'image') and image.image:
-                            image.hostel = self.object
-                            image.save()
-                            images_saved += 1
-                elif image_formset.errors:
-                    print("Image formset errors:", image_formset.errors)
-            except Exception as e:
-                print(f"Error saving images: {e}")
-
-            # Try to save room types if formset is valid
-            try:
-                if room_formset.is_valid():
-                    rooms = room_formset.save(commit=False)
-                    for room in rooms:
-                        if hasattr(room, 'type') and room.type and hasattr(room, 'price') and room.price:
-                            room.hostel = self.object
-                            room.save()
-                            rooms_saved += 1
-                elif room_formset.errors:
-                    print("Room formset errors:", room_formset.errors)
-            except Exception as e:
-                print(f"Error saving rooms: {e}")
-
-            success_msg = f'Hostel "{self.object.name}" added successfully!'
-            if images_saved:
-                success_msg += f' Added {images_saved} images.'
-            if rooms_saved:
-                success_msg += f' Added {rooms_saved} room types.'
-
-            messages.success(self.request, success_msg)
-            return redirect(self.get_success_url())
+        if not self.formsets_valid(image_formset, room_formset):
+            return self.form_invalid(form)
 
-        except Exception as e:
-            messages.error(self.request, f'An error occurred while saving: {str(e)}')
+        form.instance.owner = self.request.user
+        try:
+            images_saved, rooms_saved, _ = self.save_hostel(form, image_formset, room_formset)
+        except DatabaseError:
+            logger.exception('Failed to add hostel "%s"', form.instance.name)
+            messages.error(self.request, 'An error occurred while saving. Nothing was saved, please try again.')
             return self.form_invalid(form)
 
+        success_msg = f'Hostel "{self.object.name}" added successfully!'
+        if images_saved:
+            success_msg += f' Added {images_saved} images.'
+        if rooms_saved:
+            success_msg += f' Added {rooms_saved} room types.'
+
+        messages.success(self.request, success_msg)
+        return redirect(self.get_success_url())
+
     def form_invalid(self, form):
         messages.error(self.request, 'Please correct the errors below.')
         return super().form_invalid(form)
 
 
-class EditHostelView(OwnerRequiredMixin, UpdateView):
+class EditHostelView(OwnerRequiredMixin, HostelFormsetsMixin, UpdateView):
     model = Hostel
     form_class = HostelForm
     template_name = 'hostels/owner/edit_hostel.html'
@@ -555,74 +638,30 @@ class EditHostelView(OwnerRequiredMixin, UpdateView):
         return context
 
     def form_valid(self, form):
-        try:
-            from .forms import HostelImageFormSet, RoomTypeFormSet
-            context = self.get_context_data()
-            image_formset = context['image_formset']
-            room_formset = context['room_formset']
+        context = self.get_context_data()
+        image_formset = context['image_formset']
+        room_formset = context['room_formset']
 
-            # Validate the main form first
-            if not form.is_valid():
-                messages.error(self.request, 'Please correct the errors in the hostel form.')
-                return self.form_invalid(form)
+        if not self.formsets_valid(image_formset, room_formset):
+            return self.form_invalid(form)
 
-            # Save the hostel
-            self.object = form.save()
+        try:
+            images_saved, rooms_saved, rooms_deleted = self.save_hostel(form, image_formset, room_formset)
+        except DatabaseError:
+            logger.exception('Failed to update hostel %s', self.object.pk)
+            messages.error(self.request, 'An error occurred while saving. No changes were made, please try again.')
+            return self.form_invalid(form)
 
-            # Handle formsets with error catching
-            images_saved = 0
-            rooms_saved = 0
-            rooms_deleted = 0
-
-            # Try to save images if formset is valid
-            try:
-                if image_formset.is_valid():
-                    images = image_formset.save(commit=False)
-                    for image in images:
-                        if hasattr(image, 'image') and image.image:
-                            image.hostel = self.object
-                            image.save()
-                            images_saved += 1
-                    # Handle deleted images
-                    for obj in image_formset.deleted_objects:
-                        obj.delete()
-                elif image_formset.errors:
-                    print("Image formset errors:", image_formset.errors)
-            except Exception as e:
-                print(f"Error saving images: {e}")
-
-            # Try to save room types if formset is valid
-            try:
-                if room_formset.is_valid():
-                    rooms = room_formset.save(commit=False)
-                    for room in rooms:
-                        if hasattr(room, 'type') and room.type and hasattr(room, 'price') and room.price:
-                            room.hostel = self.object
-                            room.save()
-                            rooms_saved += 1
-                    # Handle deleted room types
-                    for obj in room_formset.deleted_objects:
-                        obj.delete()
-                        rooms_deleted += 1
-                elif room_formset.errors:
-                    print("Room formset errors:", room_formset.errors)
-            except Exception as e:
-                print(f"Error saving rooms: {e}")
-
-            success_msg = f'Hostel "{self.object.name}" updated successfully!'
-            if images_saved:
-                success_msg += f' Updated {images_saved} images.'
-            if rooms_saved:
-                success_msg += f' Updated {rooms_saved} room types.'
-            if rooms_deleted:
-                success_msg += f' Removed {rooms_deleted} room types.'
-
-            messages.success(self.request, success_msg)
-            return redirect(self.get_success_url())
+        success_msg = f'Hostel "{self.object.name}" updated successfully!'
+        if images_saved:
+            success_msg += f' Updated {images_saved} images.'
+        if rooms_saved:
+            success_msg += f' Updated {rooms_saved} room types.'
+        if rooms_deleted:
+            success_msg += f' Removed {rooms_deleted} room types.'
 
-        except Exception as e:
-            messages.error(self.request, f'An error occurred while saving: {str(e)}')
-            return self.form_invalid(form)
+        messages.success(self.request, success_msg)
+        return redirect(self.get_success_url())
 
 
 class DeleteHostelView(OwnerRequiredMixin, DeleteView):
@@ -640,15 +679,22 @@ class FavoritesView(LoginRequiredMixin, ListView):
     context_object_name = 'favorites'
 
     def get_queryset(self):
-        return self.request.user.favorites.all()
+        from django.db.models import Prefetch
+        # The cards show prices, rooms, facilities and an image of each hostel
+        return self.request.user.favorites.prefetch_related(
+            Prefetch('hostel', queryset=Hostel.objects.for_cards())
+        )
 
 
 class AddToFavoritesView(LoginRequiredMixin, View):
     def post(self, request, slug):
         hostel = get_object_or_404(Hostel, slug=slug)
-        favorite, created = Favorite.objects.get_or_create(
-            user=request.user, hostel=hostel
-        )
+        with transaction.atomic():
+            favorite, created = Favorite.objects.get_or_create(
+                user=request.user, hostel=hostel
+            )
+            if created:
+                Hostel.objects.filter(pk=hostel.pk).update(total_favorites=F('total_favorites') + 1)
 
         if created:
             messages.success(request, f'{hostel.name} added to favorites!')
@@ -661,11 +707,56 @@ class AddToFavoritesView(LoginRequiredMixin, View):
 class RemoveFromFavoritesView(LoginRequiredMixin, View):
     def post(self, request, slug):
         hostel = get_object_or_404(Hostel, slug=slug)
-        Favorite.objects.filter(user=request.user, hostel=hostel).delete()
+        with transaction.atomic():
+            deleted, _ = Favorite.objects.filter(user=request.user, hostel=hostel).delete()
+            if deleted:
+                Hostel.objects.filter(pk=hostel.pk).update(
+                    # Never below zero, even if the counter has drifted
+                    total_favorites=Greatest(F('total_favorites') - deleted, 0)
+                )
         messages.success(request, f'{hostel.name} removed from favorites!')
         return redirect('hostels:favorites')
 
 
+class SavedSearchesView(LoginRequiredMixin, ListView):
+    template_name = 'hostels/student/saved_searches.html'
+    context_object_name = 'saved_searches'
+
+    def get_queryset(self):
+        return self.request.user.saved_searches.select_related('landmark')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['notifications'] = self.request.user.notifications.all()[:10]
+        return context
+
+
+class SaveSearchView(LoginRequiredMixin, View):
+    """Save the hostel list filters the student is looking at"""
+
+    def post(self, request):
+        from django.http import QueryDict
+        from .saved_searches import canonical_params, describe
+
+        params = canonical_params(QueryDict(request.POST.get('query', '')))
+        name = request.POST.get('name', '').strip()[:100] or describe(params)
+        search = request.user.saved_searches.filter(params=params).first()
+        if search is not None:
+            messages.info(request, f'You already saved this search as "{search.name}".')
+        else:
+            SavedSearch.objects.create(user=request.user, name=name, params=params)
+            messages.success(request, f'Search "{name}" saved. We\'ll notify you when new hostels match it.')
+        return redirect('hostels:saved_searches')
+
+
+class DeleteSavedSearchView(LoginRequiredMixin, View):
+    def post(self, request, pk):
+        search = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+        search.delete()
+        messages.success(request, f'Saved search "{search.name}" deleted.')
+        return redirect('hostels:saved_searches')
+
+
 # Admin Views
 class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
@@ -713,7 +804,9 @@ class PendingHostelsView(AdminRequiredMixin, ListView):
     context_object_name = 'hostels'
 
     def get_queryset(self):
-        return Hostel.objects.filter(is_verified=False, is_active=True)
+        return Hostel.objects.filter(is_verified=False, is_active=True).select_related('owner').prefetch_related(
+            'images', 'room_types', 'hostel_facilities__facility'
+        )
 
 
 class AdminHostelListView(AdminRequiredMixin, ListView):
@@ -724,26 +817,9 @@ class AdminHostelListView(AdminRequiredMixin, ListView):
 
     def get_queryset(self):
         queryset = Hostel.objects.select_related('owner').prefetch_related('images')
-
-        # Apply filters
-        status = self.request.GET.get('status')
-        if status == 'verified':
-            queryset = queryset.filter(is_verified=True)
-        elif status == 'pending':
-            queryset = queryset.filter(is_verified=False)
-        elif status == 'featured':
-            queryset = queryset.filter(is_featured=True)
-        elif status == 'inactive':
-            queryset = queryset.filter(is_active=False)
-
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(owner__username__icontains=search) |
-                Q(address__icontains=search)
-            )
-
+        queryset = filter_hostels(
+            queryset, status=self.request.GET.get('status'), search=self.request.GET.get('search')
+        )
         return queryset.order_by('-created_at')
 
     def get_context_data(self, **kwargs):
@@ -760,22 +836,9 @@ class AdminUserListView(AdminRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        queryset = User.objects.all()
-
-        # Apply filters
-        role = self.request.GET.get('role')
-        if role in ['student', 'owner', 'admin']:
-            queryset = queryset.filter(role=role)
-
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search)
-            )
-
+        queryset = filter_users(
+            User.objects.all(), role=self.request.GET.get('role'), search=self.request.GET.get('search')
+        )
         return queryset.order_by('-date_joined')
 
     def get_context_data(self, **kwargs):
@@ -937,25 +1000,89 @@ class DeleteReportView(AdminRequiredMixin, View):
 
 # API Views
 class GeocodeView(View):
-    """Geocode address using Google Maps API"""
+    """Geocode an address against the offline gazetteer (hostels.geocoding)"""
 
     def post(self, request):
-        if not request.is_ajax():
+        from .geocoding import geocode
+
+        if request.headers.get('x-requested-with') != 'XMLHttpRequest':
             return JsonResponse({'error': 'Invalid request'}, status=400)
 
         address = request.POST.get('address')
         if not address:
             return JsonResponse({'error': 'Address is required'}, status=400)
 
-        # Mock geocoding - replace with actual Google Maps API call
-        # This is a placeholder for the actual implementation
+        place = geocode(address)
+        if place is None:
+            return JsonResponse({'error': 'Address not found'}, status=404)
+
         return JsonResponse({
-            'latitude': 31.5204,  # Lahore coordinates as example
-            'longitude': 74.3587,
-            'formatted_address': address
+            'latitude': float(place.latitude),
+            'longitude': float(place.longitude),
+            'formatted_address': place.formatted_address,
+            'match_type': place.kind,
         })
 
 
+class MapClustersView(View):
+    """API endpoint for map markers, pre-clustered per zoom level (hostels.map_clusters)"""
+    max_results = 1000
+
+    def get(self, request):
+        from . import map_clusters
+        from .models import MapCluster
+
+        try:
+            west, south, east, north = (float(value) for value in request.GET['bbox'].split(','))
+            zoom = int(request.GET['zoom'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'bbox=west,south,east,north and zoom are required'}, status=400)
+        if west > east or south > north:
+            return JsonResponse({'error': 'Invalid bbox'}, status=400)
+
+        if zoom > map_clusters.MAX_ZOOM:
+            # Close enough for individual markers: a range scan on the latitude/longitude index
+            hostels = map_clusters.clustered_hostels().filter(
+                latitude__range=(south, north), longitude__range=(west, east)
+            ).values_list('latitude', 'longitude', 'lowest_price', 'name', 'slug')[:self.max_results]
+            clusters = [
+                {
+                    'latitude': float(latitude),
+                    'longitude': float(longitude),
+                    'count': 1,
+                    'min_price': float(price) if price is not None else None,
+                    'hostel': {'name': name, 'url': reverse('hostels:hostel_detail', kwargs={'slug': slug})},
+                }
+                for latitude, longitude, price, name, slug in hostels
+            ]
+            return JsonResponse({'zoom': zoom, 'clusters': clusters})
+
+        zoom = max(zoom, map_clusters.MIN_ZOOM)
+        min_x, min_y = map_clusters.cell_of(north, west, zoom)
+        max_x, max_y = map_clusters.cell_of(south, east, zoom)
+        cells = MapCluster.objects.filter(
+            zoom=zoom, cell_x__range=(min_x, max_x), cell_y__range=(min_y, max_y)
+        ).select_related('hostel').only(
+            'hostel_count', 'latitude_sum', 'longitude_sum', 'min_price', 'hostel__name', 'hostel__slug'
+        )[:self.max_results]
+
+        clusters = [
+            {
+                'latitude': cluster.latitude,
+                'longitude': cluster.longitude,
+                'count': cluster.hostel_count,
+                'min_price': float(cluster.min_price) if cluster.min_price is not None else None,
+                'hostel': {
+                    'name': cluster.hostel.name,
+                    'url': cluster.hostel.get_absolute_url(),
+                } if cluster.hostel else None,
+            }
+            for cluster in cells
+        ]
+        return JsonResponse({'zoom': zoom, 'clusters': clusters})
+
+
+@method_decorator(revalidated(listings_etag, listings_last_modified), name='get')
 class SearchAPIView(View):
     """API endpoint for autocomplete search"""
 
@@ -964,9 +1091,8 @@ class SearchAPIView(View):
         if len(query) < 2:
             return JsonResponse({'results': []})
 
-        hostels = Hostel.objects.filter(
-            Q(name__icontains=query) | Q(address__icontains=query),
-            is_verified=True, is_active=True
+        hostels = Hostel.objects.searchable().filter(
+            Q(name__icontains=query) | Q(address__icontains=query)
         )[:10]
 
         results = [
@@ -1459,18 +1585,43 @@ class SearchByLocationView(TemplateView):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Search by Location'
 
-        # Get popular locations based on hostel counts
-        from django.db.models import Count
-        popular_locations = Hostel.objects.filter(is_active=True).values(
-            'address'
-        ).annotate(
-            hostel_count=Count('id')
-        ).order_by('-hostel_count')[:10]
-
-        context['popular_locations'] = popular_locations
+        # Top localities from the precomputed index (hostels.localities)
+        context['popular_cities'] = top_localities('city', 6)
+        context['popular_universities'] = top_localities('landmark', 6)
+        context['popular_areas'] = top_localities('area', 8)
         return context
 
 
+class LocationAutocompleteView(View):
+    """API endpoint for location autocomplete, most listed localities first"""
+
+    def get(self, request):
+        from django.utils.text import slugify
+        from .models import Locality
+
+        key = slugify(request.GET.get('q', ''))
+        if len(key) < 2:
+            return JsonResponse({'results': []})
+
+        localities = Locality.objects.filter(key__startswith=key, hostel_count__gt=0).order_by('-hostel_count', 'name')
+        kind = request.GET.get('kind')
+        if kind in dict(Locality.KIND_CHOICES):
+            localities = localities.filter(kind=kind)
+
+        results = [
+            {
+                'name': locality.name,
+                'kind': locality.kind,
+                'city': locality.city,
+                'hostel_count': locality.hostel_count,
+                'url': locality.get_absolute_url()
+            }
+            for locality in localities[:10]
+        ]
+
+        return JsonResponse({'results': results})
+
+
 class ReviewsListView(ListView):
     """Reviews and ratings page"""
     model = Review
@@ -1481,25 +1632,27 @@ class ReviewsListView(ListView):
     def get_queryset(self):
         return Review.objects.filter(is_approved=True).select_related(
             'hostel', 'user'
-        ).order_by('-created_at')
+        ).prefetch_related('hostel__images').order_by('-created_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Reviews & Ratings'
 
-        # Get some statistics
-        reviews = self.get_queryset()
-        total_reviews = reviews.count()
+        # Get some statistics in one aggregate
+        stats = Review.objects.filter(is_approved=True).aggregate(
+            total=Count('pk'),
+            avg_rating=Avg('rating'),
+            **{f'rating_{i}': Count('pk', filter=Q(rating=i)) for i in range(1, 6)}
+        )
+        total_reviews = stats['total']
         context['total_reviews'] = total_reviews
-        context['average_rating'] = reviews.aggregate(
-            avg_rating=Avg('rating')
-        )['avg_rating'] or 0
+        context['average_rating'] = stats['avg_rating'] or 0
 
         # Rating distribution with percentages
         rating_distribution = {}
         rating_data = []
         for i in range(5, 0, -1):  # 5 to 1 stars (reverse order for better display)
-            count = reviews.filter(rating=i).count()
+            count = stats[f'rating_{i}']
             percentage = (count * 100 / total_reviews) if total_reviews > 0 else 0
             rating_distribution[i] = count
             rating_data.append({